@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from redis.exceptions import RedisError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# the only user fields kept in the cache, never the password hash
+CACHED_USER_FIELDS = (
+    "id",
+    "username",
+    "email",
+    "first_name",
+    "last_name",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+)
+
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def user_cache_record(user):
+    record = {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.concrete_fields
+        if field.attname in CACHED_USER_FIELDS
+    }
+    # what the token's revoke claim is compared with
+    record["password_digest"] = get_md5_hash_password(user.password)
+    return record
+
+
+def user_from_cache_record(record):
+    # the other fields are deferred: reading one queries it, and save()
+    # only writes the loaded fields
+    User = get_user_model()
+    names = [
+        field.attname
+        for field in User._meta.concrete_fields
+        if field.attname in CACHED_USER_FIELDS
+    ]
+    return User.from_db(DEFAULT_DB_ALIAS, names, [record[name] for name in names])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without a query per request: a minimal record of the
+    token's user (CACHED_USER_FIELDS and a digest of the password hash) is
+    cached for AUTH_USER_CACHE_SECONDS and dropped whenever the user is saved
+    or deleted (see authentication.models). QuerySet.update() sends no
+    post_save, call invalidate_cached_user() after changing users that way,
+    e.g. a bulk deactivation, or it applies once the entry expires.
+    With the per-process local memory cache, other workers only see a change
+    once their copy expires, use Redis to invalidate everywhere. The user is
+    read from the database while Redis is unreachable.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+        key = user_cache_key(user_id)
+        try:
+            record = cache.get(key)
+        except RedisError:
+            return super().get_user(validated_token)
+        if record is None:
+            user = super().get_user(validated_token)
+            try:
+                cache.set(
+                    key, user_cache_record(user), settings.AUTH_USER_CACHE_SECONDS
+                )
+            except RedisError:
+                pass
+            return user
+
+        # same checks as JWTAuthentication.get_user, on the cached record
+        if api_settings.CHECK_USER_IS_ACTIVE and not record["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if (
+                validated_token.get(api_settings.REVOKE_TOKEN_CLAIM)
+                != record["password_digest"]
+            ):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user_from_cache_record(record)
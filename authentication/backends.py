@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.utils.crypto import salted_hmac
+
+from .hashing import hash_password, verify_password
+
+UserModel = get_user_model()
+
+
+def verified_login_key(user, password):
+    # the stored hash is part of the digest, a password change invalidates it
+    digest = salted_hmac(
+        "authentication.verified-login",
+        f"{user.pk}:{user.password}:{password}",
+        algorithm="sha256",
+    ).hexdigest()
+    return f"auth:verified:{digest}"
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend with a global limit on concurrent hashes (see authentication.hashing).
+    A successful login is remembered for VERIFIED_LOGIN_CACHE_SECONDS under a
+    keyed digest of the credentials, the same credentials again within that
+    time skip the hash.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # as slow as a wrong password, usernames can't be probed by timing
+            hash_password(password)
+            return None
+
+        key = verified_login_key(user, password)
+        if cache.get(key) is None:
+            valid, must_update = verify_password(password, user.password)
+            if not valid:
+                return None
+            if must_update:
+                user.password = hash_password(password)
+                user.save(update_fields=["password"])
+                key = verified_login_key(user, password)
+            cache.set(key, True, settings.VERIFIED_LOGIN_CACHE_SECONDS)
+
+        return user if self.user_can_authenticate(user) else None
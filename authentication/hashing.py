@@ -0,0 +1,145 @@
+"""
+A global limit on the password hashes in flight.
+
+A PBKDF2 hash is 100-300 ms of pure CPU. gunicorn runs sync workers, one
+request at a time each, so a login storm hashing inline occupies every
+worker and starves search and booking traffic. Handing the hash to a thread
+wouldn't help: the worker would still wait for it.
+
+Instead every hash takes one of PASSWORD_HASHING_CONCURRENCY slots shared by
+all the worker processes, a sorted set of leases in Redis. When they are all
+taken the login fails right away with a 503, the worker is free for the next
+request. A worker that dies mid-hash loses its lease after
+PASSWORD_HASHING_TIMEOUT seconds.
+"""
+
+import logging
+import threading
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.utils.translation import gettext_lazy as _
+from redis.exceptions import RedisError
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger(__name__)
+
+SLOTS_KEY = "auth:hashing-slots"
+
+# KEYS[1]: slots key. ARGV: limit, lease (ms), token. Returns 1 when acquired.
+ACQUIRE_SLOT_SCRIPT = """
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[3])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+_acquire_script = None
+
+# hashes in flight in this process, when the cache isn't Redis
+_local_in_flight = 0
+_local_lock = threading.Lock()
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("Too many sign-ins right now, try again in a moment.")
+    default_code = "hashing_busy"
+    # sent as Retry-After
+    wait = 1
+
+
+def _redis_client():
+    return caches["default"]._cache.get_client(SLOTS_KEY, write=True)
+
+
+def _acquire_redis(token, limit, lease_ms):
+    global _acquire_script
+
+    client = _redis_client()
+    if _acquire_script is None:
+        _acquire_script = client.register_script(ACQUIRE_SLOT_SCRIPT)
+    return bool(
+        _acquire_script(
+            keys=[cache.make_and_validate_key(SLOTS_KEY)],
+            args=[limit, lease_ms, token],
+            client=client,
+        )
+    )
+
+
+def _release_redis(token):
+    _redis_client().zrem(cache.make_and_validate_key(SLOTS_KEY), token)
+
+
+@contextmanager
+def _local_slot(limit):
+    # same limit per process on a non-Redis cache (development and tests)
+    global _local_in_flight
+    with _local_lock:
+        if _local_in_flight >= limit:
+            raise HashingBusy()
+        _local_in_flight += 1
+    try:
+        yield
+    finally:
+        with _local_lock:
+            _local_in_flight -= 1
+
+
+@contextmanager
+def hashing_slot():
+    """
+    Holds one of the shared hashing slots for the duration of the block.
+    Raises HashingBusy when all of them are taken. Fails open: the hash runs
+    without a slot when Redis is unreachable.
+    """
+    limit = settings.PASSWORD_HASHING_CONCURRENCY
+    if not isinstance(caches["default"], RedisCache):
+        with _local_slot(limit):
+            yield
+        return
+
+    token = uuid.uuid4().hex
+    lease_ms = settings.PASSWORD_HASHING_TIMEOUT * 1000
+    try:
+        acquired = _acquire_redis(token, limit, lease_ms)
+    except RedisError as e:
+        logger.warning("Hashing slots unavailable, hashing anyway: %s", e)
+        acquired = None
+
+    if acquired is None:
+        yield
+        return
+    if not acquired:
+        raise HashingBusy()
+    try:
+        yield
+    finally:
+        try:
+            _release_redis(token)
+        except RedisError:
+            pass  # the lease expires on its own
+
+
+def hash_password(raw_password):
+    with hashing_slot():
+        return make_password(raw_password)
+
+
+def verify_password(raw_password, encoded):
+    """Returns (valid, must_update): must_update when the hasher settings changed."""
+    outdated = []
+    with hashing_slot():
+        valid = check_password(raw_password, encoded, outdated.append)
+    return valid, bool(outdated)
@@ -0,0 +1,77 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.authentication import (
+    CachedJWTAuthentication,
+    invalidate_cached_user,
+)
+
+
+class WhoAmIView(APIView):
+    # nothing but authentication, so the numbers are the auth overhead
+    permission_classes = [IsAuthenticated]
+    throttle_classes = []
+
+    def get(self, request):
+        return Response({"id": request.user.id})
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark JWT authentication with a User query per request and with "
+        "the cached user. Prints requests/sec, p50 latency and queries/request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--username", help="Defaults to the first active user")
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True).order_by("id")
+        if options["username"]:
+            users = users.filter(username=options["username"])
+        user = users.first()
+        if user is None:
+            raise CommandError("No active user to authenticate as.")
+
+        token = str(AccessToken.for_user(user))
+        invalidate_cached_user(user.pk)
+        for label, authentication in (
+            ("database", JWTAuthentication),
+            ("cached", CachedJWTAuthentication),
+        ):
+            self.run_mode(label, authentication, token, options["requests"])
+
+    def run_mode(self, label, authentication, token, requests):
+        view = WhoAmIView.as_view(authentication_classes=[authentication])
+        factory = APIRequestFactory()
+
+        latencies = []
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(requests):
+                request_started = time.perf_counter()
+                response = view(
+                    factory.get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+                ).render()
+                latencies.append(time.perf_counter() - request_started)
+                if response.status_code != 200:
+                    raise CommandError(f"{label}: HTTP {response.status_code}")
+            elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{label:>9}: {requests / elapsed:8.1f} req/s  "
+            f"p50 {statistics.median(latencies) * 1000:6.3f} ms  "
+            f"queries/request {len(queries) / requests:.2f}"
+        )
@@ -0,0 +1,149 @@
+import multiprocessing
+import queue
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from authentication.views import LoginView
+from inventory.views import RoomSearchAPIView
+
+INLINE_BACKEND = "django.contrib.auth.backends.ModelBackend"
+LIMITED_BACKEND = "authentication.backends.CachedModelBackend"
+
+
+class BenchLoginView(LoginView):
+    throttle_classes = []
+
+
+class BenchRoomSearchAPIView(RoomSearchAPIView):
+    throttle_classes = []
+
+
+def serve(requests, results, search_params, credentials):
+    """One sync worker: takes a request from the shared queue, answers it, repeat."""
+    factory = APIRequestFactory()
+    login = BenchLoginView.as_view()
+    search = BenchRoomSearchAPIView.as_view()
+    try:
+        while (request := requests.get()) is not None:
+            kind, queued_at = request
+            if kind == "login":
+                response = login(factory.post("/api/auth/login/", credentials))
+            else:
+                response = search(factory.get("/api/search/", search_params))
+                response.render()
+            # the latency includes the wait for a free worker
+            results.put((kind, response.status_code, time.time() - queued_at))
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark a login storm the way gunicorn runs the app: --workers "
+        "forked processes serve one request at a time from a shared queue, "
+        "fed --login-rate logins/sec and a search every 50ms. Compares inline "
+        "hashing, the shared hashing slots and the slots with the "
+        "verified-login cache. Prints logins/sec, rejected (503) logins and "
+        "the search p50/p99 latency, queueing included. Needs the Redis cache "
+        "for the slots to be shared."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--login-rate", type=float, default=100)
+        parser.add_argument("--seconds", type=float, default=10)
+
+    def handle(self, *args, **options):
+        if not isinstance(caches["default"], RedisCache):
+            self.stderr.write(
+                "The cache isn't Redis: the hashing slots are per process here."
+            )
+
+        user = User.objects.create_user(username="bench-login-storm")
+        user.set_password("bench-password")
+        user.save()
+        try:
+            for label, backend, cache_seconds in (
+                ("inline", INLINE_BACKEND, 0),
+                ("slots", LIMITED_BACKEND, 0),
+                ("slots+cache", LIMITED_BACKEND, 300),
+            ):
+                cache.clear()
+                with override_settings(
+                    AUTHENTICATION_BACKENDS=[backend],
+                    VERIFIED_LOGIN_CACHE_SECONDS=cache_seconds,
+                ):
+                    self.run_mode(label, options)
+        finally:
+            user.delete()
+
+    def run_mode(self, label, options):
+        check_in = date.today() + timedelta(days=30)
+        search_params = {
+            "check_in": check_in.isoformat(),
+            "check_out": (check_in + timedelta(days=2)).isoformat(),
+        }
+        credentials = {"username": "bench-login-storm", "password": "bench-password"}
+
+        context = multiprocessing.get_context("fork")
+        requests, results = context.Queue(), context.Queue()
+        # the workers open their own connections after the fork
+        connections.close_all()
+        workers = [
+            context.Process(
+                target=serve, args=(requests, results, search_params, credentials)
+            )
+            for _ in range(options["workers"])
+        ]
+        for worker in workers:
+            worker.start()
+
+        login_every, search_every = 1 / options["login_rate"], 0.05
+        started = time.monotonic()
+        next_login = next_search = started
+        sent = 0
+        while (now := time.monotonic()) < started + options["seconds"]:
+            if now >= next_login:
+                requests.put(("login", time.time()))
+                next_login += login_every
+                sent += 1
+            if now >= next_search:
+                requests.put(("search", time.time()))
+                next_search += search_every
+                sent += 1
+            time.sleep(max(0, min(next_login, next_search) - time.monotonic()))
+
+        statuses, latencies = [], []
+        for _ in range(sent):
+            try:
+                kind, status_code, latency = results.get(timeout=60)
+            except queue.Empty:
+                break
+            if kind == "login":
+                statuses.append(status_code)
+            else:
+                latencies.append(latency)
+
+        for _ in workers:
+            requests.put(None)
+        for worker in workers:
+            worker.join()
+
+        elapsed = time.monotonic() - started
+        latencies.sort()
+        p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+        self.stdout.write(
+            f"{label:>11}: {statuses.count(200) / elapsed:8.1f} logins/s  "
+            f"rejected {statuses.count(503):5d}  "
+            f"search p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+            f"p99 {p99 * 1000:7.1f} ms"
+        )
@@ -1,3 +1,14 @@
-from django.db import models
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_user
 
 # Create your models here.
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def drop_cached_user(sender, instance, **kwargs):
+    # deactivation and password changes apply to the next request
+    invalidate_cached_user(instance.pk)
@@ -1,6 +1,13 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
+from rest_framework_simplejwt.serializers import (
+    TokenBlacklistSerializer,
+    TokenRefreshSerializer,
+)
+
+from .hashing import hash_password
+from .tokens import CacheBlacklistRefreshToken
 
 
 class RegisterSerializer(ModelSerializer):
@@ -11,11 +18,24 @@ class RegisterSerializer(ModelSerializer):
         fields = ["username", "email", "password", "first_name", "last_name"]
 
     def create(self, validated_data):
-        # create user
-        user = User.objects.create_user(
-            username=validated_data["username"],
-            email=validated_data["email"],
-            password=validated_data["password"],
+        # create user, the password hash takes one of the shared hashing slots
+        user = User(
+            username=User.normalize_username(validated_data["username"]),
+            email=User.objects.normalize_email(validated_data["email"]),
+            password=hash_password(validated_data["password"]),
         )
+        user.save()
 
         return user
+
+
+class BlacklistingTokenRefreshSerializer(TokenRefreshSerializer):
+    """Rotates the refresh token and revokes the old one in the cache."""
+
+    token_class = CacheBlacklistRefreshToken
+
+
+class LogoutSerializer(TokenBlacklistSerializer):
+    """Revokes the refresh token in the cache."""
+
+    token_class = CacheBlacklistRefreshToken
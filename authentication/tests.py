@@ -1,3 +1,137 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from unittest.mock import patch
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+import time
+
+from authentication import backends
+from authentication.authentication import user_cache_key
+from authentication.hashing import hashing_slot
+from core.throttling import gcra_take
+
 
 # Create your tests here.
+class CachedJWTAuthenticationTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="pass")
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        self.url = "/api/wishlist/"
+
+    def test_user_is_cached_until_saved(self):
+        # user + wishlist items
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        # wishlist items only
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        # the password hash stays out of the shared cache
+        self.assertNotIn("password", cache.get(user_cache_key(self.user.pk)))
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class AuthThrottleTest(APITestCase):
+    def test_login_attempts_are_rate_limited_per_ip(self):
+        cache.clear()
+        credentials = {"username": "nobody", "password": "wrong"}
+        for _ in range(5):
+            response = self.client.post(
+                "/api/auth/login/", credentials, REMOTE_ADDR="10.0.0.5"
+            )
+            self.assertEqual(response.status_code, 401)
+
+        response = self.client.post(
+            "/api/auth/login/", credentials, REMOTE_ADDR="10.0.0.5"
+        )
+        self.assertEqual(response.status_code, 429)
+        # one request every 12s after the burst
+        self.assertLessEqual(int(response["Retry-After"]), 12)
+
+        # other callers have their own allowance
+        response = self.client.post(
+            "/api/auth/login/", credentials, REMOTE_ADDR="10.0.0.6"
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+class GCRALeaseTest(APITestCase):
+    def test_only_spent_lease_requests_are_charged(self):
+        cache.clear()
+        key = "throttle:test:lease"
+        # 60/minute: one request a second, bursts of 60
+        granted, _ = gcra_take(key, 1000, 59000, wanted=3)
+        self.assertEqual(granted, 3)
+        # the lease isn't charged, only this request
+        self.assertAlmostEqual(cache.get(key) - time.time() * 1000, 1000, delta=200)
+
+        # two leased requests were spent, they are charged with the next one
+        gcra_take(key, 1000, 59000, wanted=3, spent=2)
+        self.assertAlmostEqual(cache.get(key) - time.time() * 1000, 4000, delta=200)
+
+
+class RefreshTokenBlacklistTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username="tester", password="pass")
+
+    def post(self, url, data):
+        # 5 requests: within the auth rate limit of this address
+        return self.client.post(url, data, REMOTE_ADDR="10.0.1.1")
+
+    def test_rotated_and_logged_out_tokens_are_refused(self):
+        response = self.post(
+            "/api/auth/login/", {"username": "tester", "password": "pass"}
+        )
+        refresh = response.data["refresh"]
+
+        response = self.post("/api/auth/refresh/", {"refresh": refresh})
+        self.assertEqual(response.status_code, 200)
+        rotated = response.data["refresh"]
+
+        # the old one was revoked by the rotation
+        response = self.post("/api/auth/refresh/", {"refresh": refresh})
+        self.assertEqual(response.status_code, 401)
+
+        response = self.post("/api/auth/logout/", {"refresh": rotated})
+        self.assertEqual(response.status_code, 200)
+        response = self.post("/api/auth/refresh/", {"refresh": rotated})
+        self.assertEqual(response.status_code, 401)
+
+
+class LoginHashingTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username="tester", password="pass")
+
+    def log_in(self, password="pass"):
+        return self.client.post(
+            "/api/auth/login/",
+            {"username": "tester", "password": password},
+            REMOTE_ADDR="10.0.2.1",
+        )
+
+    def test_repeated_login_skips_hashing(self):
+        with patch.object(
+            backends, "verify_password", wraps=backends.verify_password
+        ) as verify:
+            self.assertEqual(self.log_in().status_code, 200)
+            self.assertEqual(self.log_in().status_code, 200)
+            self.assertEqual(self.log_in("wrong").status_code, 401)
+        # the second login came from the cache
+        self.assertEqual(verify.call_count, 2)
+
+    @override_settings(PASSWORD_HASHING_CONCURRENCY=1)
+    def test_full_hashing_slots_fail_fast(self):
+        # another worker holds the only slot
+        with hashing_slot():
+            response = self.log_in()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
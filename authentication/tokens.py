@@ -0,0 +1,44 @@
+import time
+
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+def blacklist_key(jti):
+    return f"auth:blacklist:{jti}"
+
+
+def blacklist_jti(jti, exp):
+    """
+    Revokes a token id until the token expires, then the key goes away with it.
+    Returns False when it was already revoked.
+    """
+    return cache.add(blacklist_key(jti), True, max(int(exp - time.time()), 1))
+
+
+def is_blacklisted(jti):
+    return cache.get(blacklist_key(jti)) is not None
+
+
+class CacheBlacklistRefreshToken(RefreshToken):
+    """
+    RefreshToken revoked through the cache (Redis) instead of the
+    token_blacklist app's tables: one key per revoked token, expiring with it.
+    """
+
+    def verify(self, *args, **kwargs):
+        self.check_blacklist()
+        super().verify(*args, **kwargs)
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        # add() is atomic: of two concurrent rotations of the same token,
+        # only one gets a new refresh token
+        if not blacklist_jti(self.payload[api_settings.JTI_CLAIM], self.payload["exp"]):
+            raise TokenError(_("Token is blacklisted"))
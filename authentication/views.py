@@ -1,6 +1,11 @@
 from django.contrib.auth.models import User
 from rest_framework.generics import CreateAPIView
 from rest_framework.permissions import AllowAny
+from rest_framework_simplejwt.views import (
+    TokenBlacklistView,
+    TokenObtainPairView,
+    TokenRefreshView,
+)
 
 from .serializers import RegisterSerializer
 
@@ -9,3 +14,18 @@ class RegisterView(CreateAPIView):
     permission_classes = [AllowAny]
     serializer_class = RegisterSerializer
     queryset = User.objects.all()
+    throttle_scope = "auth"
+
+
+class LoginView(TokenObtainPairView):
+    throttle_scope = "auth"
+
+
+class RefreshView(TokenRefreshView):
+    throttle_scope = "auth"
+
+
+class LogoutView(TokenBlacklistView):
+    """Revokes the given refresh token (the access token expires on its own)."""
+
+    throttle_scope = "auth"
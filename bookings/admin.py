@@ -1,8 +1,20 @@
+from django.conf import settings
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Max
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils import timezone
 from django.utils.html import format_html
 from django.utils.safestring import SafeText
 
-from .models import Booking
+from core.paginator import EstimatedCountPaginator
+from .exports import stream_csv
+from .models import Booking, BookingExport
+from .outbox import record_status_changes
+from .services import bulk_cancel_bookings
+from .tasks import export_bookings
 
 
 # Register your models here.
@@ -18,13 +30,24 @@ class BookingAdmin(admin.ModelAdmin):
         "is_refunded",
     ]
     list_filter = ["status", "is_refunded", "created_at"]
-    search_fields = ["user__username", "room__room_number", "stripe_payment_intent_id"]
-    actions = ["mark_as_confirmed", "export_to_csv"]
+    list_select_related = ["user", "room__room_type"]
+    date_hierarchy = "created_at"
+    ordering = ["-id"]
+    search_fields = ["user__username", "room__number", "stripe_payment_intent_id"]
+    # no exact COUNT(*) on a table with millions of rows
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = [
+        "mark_as_confirmed",
+        "cancel_bookings",
+        "export_to_csv",
+        "export_to_ndjson",
+    ]
 
     def user_link(self, obj) -> SafeText:
         return format_html(
             '<a href="/admin/auth/user/{}/change/">{}</a>',
-            obj.user.id,
+            obj.user_id,
             obj.user.username,
         )
 
@@ -50,33 +73,133 @@ class BookingAdmin(admin.ModelAdmin):
 
     # Bulk action (Mark Confirmed)
     def mark_as_confirmed(self, request, queryset):
-        updated = queryset.update(status="CONFIRMED")
+        with transaction.atomic():
+            changed = list(
+                queryset.exclude(status=Booking.Status.CONFIRMED)
+                .select_for_update()
+                .values_list("id", "user_id", "room_id", "status")
+            )
+            updated = Booking.objects.filter(id__in=[row[0] for row in changed]).update(
+                status=Booking.Status.CONFIRMED, updated_at=timezone.now()
+            )
+            record_status_changes(changed, Booking.Status.CONFIRMED)
+
         self.message_user(request, f"{updated} bookings marked as CONFIRMED.")
 
     mark_as_confirmed.short_description = "Mark selected bookings as Confirmed"
 
+    # Bulk action (Cancel, e.g. property closed for maintenance)
+    def cancel_bookings(self, request, queryset):
+        report = bulk_cancel_bookings(queryset)
+        self.message_user(request, str(report))
+
+    cancel_bookings.short_description = "Cancel selected bookings (refund per policy)"
+
+    def queue_export(self, request, queryset, export_format) -> None:
+        # a "select all" selection can be millions of rows, only its filters
+        # are stored and the task evaluates them
+        whole_changelist = request.POST.get("select_across") == "1"
+        export = BookingExport.objects.create(
+            requested_by=request.user,
+            format=export_format,
+            whole_changelist=whole_changelist,
+            changelist_filters=request.GET.urlencode() if whole_changelist else "",
+            booking_ids=(
+                [] if whole_changelist else list(queryset.values_list("id", flat=True))
+            ),
+            max_booking_id=Booking.objects.aggregate(Max("id"))["id__max"],
+        )
+        transaction.on_commit(lambda: export_bookings.delay(export.id))
+
+        self.message_user(
+            request,
+            format_html(
+                'Export is running in the background, <a href="{}">download it here</a> when done.',
+                reverse("admin:bookings_bookingexport_change", args=[export.id]),
+            ),
+        )
+
     # Bulk action (Export to CSV)
     def export_to_csv(self, request, queryset):
-        import csv
-        from django.http import HttpResponse
+        # bounded count, we only need to know if we are above the limit
+        limit = settings.BOOKING_EXPORT_STREAMING_LIMIT
+        if queryset.order_by()[: limit + 1].count() > limit:
+            return self.queue_export(request, queryset, BookingExport.Format.CSV)
 
-        response = HttpResponse(content_type="text/csv")
+        response = StreamingHttpResponse(stream_csv(queryset), content_type="text/csv")
         response["Content-Disposition"] = 'attachment; filename="bookings.csv"'
-        writer = csv.writer(response)
-
-        writer.writerow(["ID", "User", "Room", "Price", "Status"])
-
-        for booking in queryset:
-            writer.writerow(
-                [
-                    booking.id,
-                    booking.user.username,
-                    booking.room,
-                    booking.total_price,
-                    booking.status,
-                ]
-            )
-
         return response
 
     export_to_csv.short_description = "Export selected to CSV"
+
+    # Bulk action (Export to NDJSON)
+    def export_to_ndjson(self, request, queryset):
+        return self.queue_export(request, queryset, BookingExport.Format.NDJSON)
+
+    export_to_ndjson.short_description = "Export selected to NDJSON (background)"
+
+
+@admin.register(BookingExport)
+class BookingExportAdmin(admin.ModelAdmin):
+    list_display = [
+        "id",
+        "format",
+        "status",
+        "row_count",
+        "requested_by",
+        "created_at",
+        "finished_at",
+        "download_link",
+    ]
+    list_filter = ["status", "format"]
+    list_select_related = ["requested_by"]
+    exclude = [
+        "booking_ids",
+        "whole_changelist",
+        "changelist_filters",
+        "max_booking_id",
+    ]
+    readonly_fields = [
+        "requested_by",
+        "format",
+        "status",
+        "file",
+        "row_count",
+        "error",
+        "created_at",
+        "finished_at",
+        "download_link",
+    ]
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                "<int:export_id>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="bookings_bookingexport_download",
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, export_id):
+        export = get_object_or_404(BookingExport, id=export_id)
+        if not self.has_view_permission(request, export) or not export.file:
+            raise Http404("Export file is not available.")
+
+        return FileResponse(
+            export.file.open("rb"),
+            as_attachment=True,
+            filename=export.file.name.rsplit("/", 1)[-1],
+        )
+
+    def download_link(self, obj) -> SafeText | str:
+        if obj.status != BookingExport.Status.DONE or not obj.file:
+            return "-"
+        return format_html(
+            '<a href="{}">Download</a>',
+            reverse("admin:bookings_bookingexport_download", args=[obj.id]),
+        )
+
+    download_link.short_description = "File"
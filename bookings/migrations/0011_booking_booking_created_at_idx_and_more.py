@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-19 08:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0010_bookingexport"),
+        ("inventory", "0007_property_phone_number"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(fields=["-created_at"], name="booking_created_at_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["status", "-created_at"], name="booking_status_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-19 09:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0012_outboxevent"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="booking",
+            name="stripe_payment_intent_id",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=200, null=True
+            ),
+        ),
+    ]
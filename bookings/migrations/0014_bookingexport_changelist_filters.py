@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0013_booking_stripe_payment_intent_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bookingexport",
+            name="changelist_filters",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="bookingexport",
+            name="max_booking_id",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="bookingexport",
+            name="whole_changelist",
+            field=models.BooleanField(default=False),
+        ),
+    ]
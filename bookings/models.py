@@ -2,10 +2,9 @@ from django.db import models
 from django.db.models import Model, TextChoices
 from django.conf import settings
 from django.contrib.postgres.constraints import ExclusionConstraint
-from django.contrib.postgres.fields import RangeOperators, DateRangeField
+from django.contrib.postgres.fields import ArrayField, RangeOperators, DateRangeField
 from django.utils.translation import gettext_lazy as _
 
-
 from inventory.models import Room
 
 
@@ -27,6 +26,7 @@ class Booking(Model):
         max_length=20, choices=Status.choices, default=Status.PENDING
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     total_price = models.DecimalField(
         max_digits=10, decimal_places=2, null=True, blank=True
     )
@@ -39,7 +39,9 @@ class Booking(Model):
     )
     penalty_applied = models.BooleanField(default=False)
     # payment
-    stripe_payment_intent_id = models.CharField(max_length=200, null=True, blank=True)
+    stripe_payment_intent_id = models.CharField(
+        max_length=200, null=True, blank=True, db_index=True
+    )
 
     class Meta:
         # constraints from the database itself
@@ -53,8 +55,85 @@ class Booking(Model):
                 condition=models.Q(status__in=["PENDING", "CONFIRMED"]),
             ),
         ]
+        indexes = [
+            # keyset pagination of a user's booking history
+            models.Index(fields=["user", "-id"], name="booking_user_id_desc_idx"),
+            # admin changelist filters / date hierarchy
+            models.Index(fields=["-created_at"], name="booking_created_at_idx"),
+            models.Index(
+                fields=["status", "-created_at"], name="booking_status_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Booking number ({self.id}) for {self.room}"
 
 
+class BookingExport(Model):
+    """Background export of a (large) admin selection of bookings."""
+
+    class Status(TextChoices):
+        PENDING = "PENDING", _("Pending")
+        RUNNING = "RUNNING", _("Running")
+        DONE = "DONE", _("Done")
+        FAILED = "FAILED", _("Failed")
+
+    class Format(TextChoices):
+        CSV = "csv", _("CSV (gzip)")
+        NDJSON = "ndjson", _("NDJSON (gzip)")
+
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="booking_exports",
+    )
+    format = models.CharField(max_length=10, choices=Format.choices)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    # the rows ticked in the changelist, at most a page of them
+    booking_ids = ArrayField(models.BigIntegerField(), default=list)
+    # "select all": the changelist query string, evaluated by the task
+    whole_changelist = models.BooleanField(default=False)
+    changelist_filters = models.TextField(blank=True)
+    # bookings made after the export was requested are left out
+    max_booking_id = models.BigIntegerField(null=True, blank=True)
+    file = models.FileField(upload_to="exports/", blank=True)
+    row_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Bookings export ({self.id}) - {self.get_format_display()}"
+
+
+class OutboxEvent(Model):
+    """
+    A booking status change, written in the same transaction as the change.
+    Relayed to the consumers in `BOOKING_OUTBOX_CONSUMERS` by `bookings.tasks.relay_outbox`.
+    """
+
+    booking_id = models.BigIntegerField()
+    user_id = models.BigIntegerField()
+    room_id = models.BigIntegerField()
+    old_status = models.CharField(max_length=20, blank=True)
+    new_status = models.CharField(max_length=20, choices=Booking.Status.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # the relay only ever reads undelivered events, in order
+            models.Index(
+                fields=["id"],
+                condition=models.Q(processed_at__isnull=True),
+                name="outbox_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"Booking ({self.booking_id}) {self.old_status or '-'} -> {self.new_status}"
+        )
@@ -0,0 +1,129 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+def record_status_change(booking, old_status=""):
+    """
+    Writes the outbox event of one booking.
+    Must be called inside the transaction that saves the new status.
+    """
+    OutboxEvent.objects.create(
+        booking_id=booking.id,
+        user_id=booking.user_id,
+        room_id=booking.room_id,
+        old_status=old_status or "",
+        new_status=booking.status,
+    )
+
+
+def record_status_changes(rows, new_status):
+    """
+    Bulk version for `.update()` call sites, which fire no signals.
+    rows: iterable of (booking_id, user_id, room_id, old_status).
+    """
+    rows = list(rows)
+    OutboxEvent.objects.bulk_create(
+        [
+            OutboxEvent(
+                booking_id=booking_id,
+                user_id=user_id,
+                room_id=room_id,
+                old_status=old_status,
+                new_status=new_status,
+            )
+            for booking_id, user_id, room_id, old_status in rows
+        ]
+    )
+
+
+def get_consumers():
+    return [import_string(path) for path in settings.BOOKING_OUTBOX_CONSUMERS]
+
+
+def relay_outbox(batch_size=500, max_batches=20):
+    """
+    Delivers pending events, oldest first, to every registered consumer.
+    An event is marked processed only after all consumers accepted its batch,
+    a failure rolls the batch back and it is delivered again on the next run
+    (at-least-once, consumers must be idempotent).
+    Events are in order as long as a single relay runs (see
+    bookings.tasks.relay_outbox_events), a second one waits for the row locks.
+    Returns the number of delivered events.
+    """
+    consumers = get_consumers()
+    delivered = 0
+
+    for _ in range(max_batches):
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update()
+                .filter(processed_at__isnull=True)
+                .order_by("id")[:batch_size]
+            )
+            if not events:
+                break
+
+            for consumer in consumers:
+                try:
+                    consumer(events)
+                except Exception:
+                    logger.exception(
+                        "Outbox consumer %s failed, batch will be retried.", consumer
+                    )
+                    raise
+
+            OutboxEvent.objects.filter(id__in=[event.id for event in events]).update(
+                processed_at=timezone.now()
+            )
+
+        delivered += len(events)
+
+    return delivered
+
+
+def prune_outbox(batch_size=5000):
+    """
+    Deletes the delivered events older than BOOKING_OUTBOX_RETENTION_DAYS,
+    a batch per statement. Returns the number of deleted events.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.BOOKING_OUTBOX_RETENTION_DAYS)
+    deleted = 0
+
+    while True:
+        # the oldest events come first in the primary key, no scan of the table
+        ids = list(
+            OutboxEvent.objects.filter(
+                processed_at__isnull=False, created_at__lt=cutoff
+            )
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += OutboxEvent.objects.filter(id__in=ids).delete()[0]
+
+
+def get_outbox_lag():
+    """Number of undelivered events and the age of the oldest one, in seconds."""
+    stats = OutboxEvent.objects.filter(processed_at__isnull=True).aggregate(
+        pending=Count("id"),
+        oldest=Min("created_at"),
+    )
+    oldest = stats["oldest"]
+
+    return {
+        "pending": stats["pending"],
+        "oldest_pending_seconds": (
+            (timezone.now() - oldest).total_seconds() if oldest else 0.0
+        ),
+    }
@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class BookingCursorPagination(CursorPagination):
+    """
+    Keyset pagination over a user's bookings.
+    Pages are fetched with `WHERE id < cursor`, so the cost stays the same
+    no matter how deep the client scrolls.
+    """
+
+    ordering = "-id"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
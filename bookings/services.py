@@ -1,16 +1,51 @@
+import hashlib
+from dataclasses import dataclass
 from decimal import Decimal
-from django.db import transaction
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    BooleanField,
+    Case,
+    Count,
+    DecimalField,
+    Max,
+    Q,
+    Value,
+    When,
+)
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from psycopg2.extras import DateRange
 from datetime import date, timedelta
 
+from core.cache_tags import cached, pricing_tag
+from core.metrics import BOOKINGS
+from core.tracing import traced
 from inventory.models import PricingRule, Room
 from bookings.models import Booking
+from bookings.outbox import record_status_change, record_status_changes
+from payments.refunds import queue_refunds
+from payments.tasks import process_refunds
 
+# bounds the life of unused entries, changes invalidate them right away
+PRICING_RULES_CACHE_SECONDS = 60 * 60
 
+
+@traced("bookings.create_booking")
 def create_booking(user, room_type_id, check_in: date, check_out: date):
+    try:
+        booking = _create_booking(user, room_type_id, check_in, check_out)
+    except ValidationError:
+        BOOKINGS.labels("no_availability").inc()
+        raise
+    except IntegrityError:
+        # the exclusion constraint caught an overlapping booking of the room
+        BOOKINGS.labels("conflict").inc()
+        raise
+    BOOKINGS.labels("created").inc()
+    return booking
+
+
+def _create_booking(user, room_type_id, check_in, check_out):
     search_range = DateRange(check_in, check_out)
 
     with transaction.atomic():
@@ -47,24 +82,58 @@ def create_booking(user, room_type_id, check_in: date, check_out: date):
             status=Booking.Status.PENDING,
             total_price=final_price,
         )
+        record_status_change(booking)
 
         return booking
 
 
-def calculate_total_price(room_type, check_in: date, check_out: date):
+@traced("bookings.get_pricing_rules")
+def get_pricing_rules(room_type_ids):
+    """
+    The rules of several room types (and the global ones) in one query,
+    to price a list of room types with `calculate_total_price(..., rules=)`.
+    Cached until one of these rules changes.
+    """
+    room_type_ids = sorted(set(room_type_ids))
+    digest = hashlib.md5(
+        ",".join(map(str, room_type_ids)).encode(), usedforsecurity=False
+    ).hexdigest()
+
+    return cached(
+        f"pricing-rules:{digest}",
+        [pricing_tag()] + [pricing_tag(room_type_id) for room_type_id in room_type_ids],
+        lambda: list(
+            PricingRule.objects.filter(
+                Q(room_type_id__in=room_type_ids) | Q(room_type__isnull=True)
+            )
+        ),
+        PRICING_RULES_CACHE_SECONDS,
+    )
+
+
+@traced("bookings.calculate_total_price")
+def calculate_total_price(room_type, check_in: date, check_out: date, rules=None):
     """
     Iterates through each day of the stay.
     Checks if any pricing rule applies to that specific day.
     Return the SUM of all daily prices.
+    `rules` can come from `get_pricing_rules()`, otherwise they are queried.
     """
 
     total_price = 0.0
     current_date = check_in
 
     # get all rules for this room type
-    rules = PricingRule.objects.filter(
-        Q(room_type=room_type) | Q(room_type__isnull=True)
-    )
+    if rules is None:
+        rules = PricingRule.objects.filter(
+            Q(room_type=room_type) | Q(room_type__isnull=True)
+        )
+    else:
+        rules = [
+            rule
+            for rule in rules
+            if rule.room_type_id is None or rule.room_type_id == room_type.id
+        ]
 
     # loop through every single night
     while current_date < check_out:
@@ -96,17 +165,15 @@ def calculate_total_price(room_type, check_in: date, check_out: date):
     return round(total_price, 2)
 
 
-def cancel_booking(booking):
-    # check on booking
-    if booking.status == Booking.Status.CANCELLED:
-        raise ValidationError(f"Booking number {booking.id} is already cancelled")
-
-    # extract check in and check out dates
-    check_in = booking.stay_range.lower
-    check_out = booking.stay_range.upper
+def calculate_refund(total_paid, check_in: date, check_out: date, now=None):
+    """
+    Cancellation policy, shared by single and bulk cancellation.
+    Cancelling less than 48 hours before check in costs one night.
+    Returns (refund_amount, has_penalty).
+    """
+    now = now or timezone.now()
 
     # calculate time difference
-    now = timezone.now()
     check_in_datetime = timezone.datetime.combine(
         check_in, timezone.datetime.min.time()
     )
@@ -115,7 +182,6 @@ def cancel_booking(booking):
 
     # define policy
     hours_left = time_until_check_in.total_seconds() / 3600
-    total_paid = booking.total_price
     refund_amount = total_paid
     has_penalty = False
 
@@ -127,12 +193,165 @@ def cancel_booking(booking):
         refund_amount = max(Decimal("0.00"), total_paid - one_night_rate)
         has_penalty = True
 
+    return refund_amount, has_penalty
+
+
+def cancel_booking(booking):
+    # check on booking
+    if booking.status == Booking.Status.CANCELLED:
+        raise ValidationError(f"Booking number {booking.id} is already cancelled")
+
+    now = timezone.now()
+    refund_amount, has_penalty = calculate_refund(
+        booking.total_price,
+        booking.stay_range.lower,
+        booking.stay_range.upper,
+        now=now,
+    )
+
     # update database
+    old_status = booking.status
     booking.status = Booking.Status.CANCELLED
     booking.cancelled_at = now
     booking.refund_amount = refund_amount
     booking.penalty_applied = has_penalty
-    booking.is_refunded = True
-    booking.save()
+
+    with transaction.atomic():
+        booking.save()
+        record_status_change(booking, old_status)
+
+        # only paid bookings have something to give back,
+        # is_refunded is set once Stripe accepted the refund
+        if (
+            old_status == Booking.Status.CONFIRMED
+            and booking.stripe_payment_intent_id
+            and refund_amount > 0
+        ):
+            queue_refunds(
+                [(booking.id, booking.stripe_payment_intent_id, refund_amount)]
+            )
+            transaction.on_commit(process_refunds.delay)
 
     return booking
+
+
+@dataclass
+class BulkCancelReport:
+    cancelled: int = 0
+    skipped: int = 0
+    penalties: int = 0
+    refund_total: Decimal = Decimal("0.00")
+    refunds_queued: int = 0
+
+    def __str__(self):
+        return (
+            f"Cancelled {self.cancelled} bookings ({self.penalties} with penalty), "
+            f"skipped {self.skipped}. Refunding {self.refund_total} "
+            f"across {self.refunds_queued} payments."
+        )
+
+
+def bulk_cancel_bookings(queryset, batch_size=500) -> BulkCancelReport:
+    """
+    Cancels every active booking of the queryset (e.g. a property closing for maintenance).
+    Refunds are computed with the same policy as `cancel_booking`, applied with
+    one UPDATE per batch, and queued as refund jobs for the rate-limited
+    refund worker.
+    """
+    report = BulkCancelReport()
+    now = timezone.now()
+    active = [Booking.Status.PENDING, Booking.Status.CONFIRMED]
+
+    ids = list(queryset.order_by("id").values_list("id", flat=True))
+
+    for start in range(0, len(ids), batch_size):
+        batch_ids = ids[start : start + batch_size]
+
+        with transaction.atomic():
+            rows = (
+                Booking.objects.select_for_update()
+                .filter(id__in=batch_ids, status__in=active)
+                .values_list(
+                    "id",
+                    "user_id",
+                    "room_id",
+                    "stay_range",
+                    "total_price",
+                    "status",
+                    "stripe_payment_intent_id",
+                )
+            )
+
+            refunds = {}
+            penalty_ids = []
+            to_refund = []
+            changes = []
+            for (
+                booking_id,
+                user_id,
+                room_id,
+                stay_range,
+                total_price,
+                status,
+                intent_id,
+            ) in rows:
+                changes.append((booking_id, user_id, room_id, status))
+                refund_amount, has_penalty = calculate_refund(
+                    total_price, stay_range.lower, stay_range.upper, now=now
+                )
+                refunds[booking_id] = refund_amount
+                if has_penalty:
+                    penalty_ids.append(booking_id)
+
+                # only paid bookings have something to give back
+                if (
+                    status == Booking.Status.CONFIRMED
+                    and intent_id
+                    and refund_amount > 0
+                ):
+                    to_refund.append((booking_id, intent_id, refund_amount))
+                    report.refund_total += refund_amount
+
+            report.skipped += len(batch_ids) - len(refunds)
+            if not refunds:
+                continue
+
+            Booking.objects.filter(id__in=refunds.keys()).update(
+                status=Booking.Status.CANCELLED,
+                cancelled_at=now,
+                updated_at=now,
+                refund_amount=Case(
+                    *[
+                        When(id=booking_id, then=Value(amount))
+                        for booking_id, amount in refunds.items()
+                    ],
+                    output_field=DecimalField(max_digits=10, decimal_places=2),
+                ),
+                penalty_applied=Case(
+                    When(id__in=penalty_ids, then=Value(True)),
+                    default=Value(False),
+                    output_field=BooleanField(),
+                ),
+            )
+            record_status_changes(changes, Booking.Status.CANCELLED)
+
+            if to_refund:
+                queue_refunds(to_refund)
+                transaction.on_commit(process_refunds.delay)
+
+        report.cancelled += len(refunds)
+        report.penalties += len(penalty_ids)
+        report.refunds_queued += len(to_refund)
+
+    return report
+
+
+def get_booking_history_state(user):
+    """
+    Cheap fingerprint of a user's booking history (count + last change).
+    Lets the list endpoint answer conditional GETs without loading any rows.
+    """
+    return Booking.objects.filter(user=user).aggregate(
+        count=Count("id"),
+        last_modified=Max("updated_at"),
+    )
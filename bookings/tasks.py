@@ -1,9 +1,17 @@
 from celery import shared_task
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
 
 
-from .models import Booking
+from core.metrics import EXPIRED_BOOKINGS_BATCH
+from .exports import write_export
+from .models import Booking, BookingExport
+from .outbox import get_outbox_lag, prune_outbox, record_status_changes, relay_outbox
+
+# a relay stops after max_batches, well within this
+OUTBOX_RELAY_LOCK_SECONDS = 5 * 60
 
 
 @shared_task
@@ -14,17 +22,74 @@ def cancel_expired_bookings():
     """
     timeout_threshold = timezone.now() - timedelta(minutes=15)
 
-    expired_bookings = Booking.objects.filter(
-        status=Booking.Status.PENDING,
-        created_at__lt=timeout_threshold,
-    )
+    with transaction.atomic():
+        expired_bookings = list(
+            Booking.objects.select_for_update(skip_locked=True)
+            .filter(
+                status=Booking.Status.PENDING,
+                created_at__lt=timeout_threshold,
+            )
+            .values_list("id", "user_id", "room_id", "status")
+        )
 
-    # get count of expired bookings
-    count = expired_bookings.count()
+        EXPIRED_BOOKINGS_BATCH.observe(len(expired_bookings))
+        if not expired_bookings:
+            return "No expired bookings found."
 
-    if count > 0:
         # use bulk update as it is faster than looping
-        expired_bookings.update(status=Booking.Status.EXPIRED)
-        return f"Cancelled {count} expired bookings."
+        Booking.objects.filter(id__in=[row[0] for row in expired_bookings]).update(
+            status=Booking.Status.EXPIRED, updated_at=timezone.now()
+        )
+        record_status_changes(expired_bookings, Booking.Status.EXPIRED)
+
+    return f"Cancelled {len(expired_bookings)} expired bookings."
+
+
+@shared_task
+def export_bookings(export_id):
+    """
+    Writes a compressed CSV/NDJSON file for a queued admin export.
+    """
+    export = BookingExport.objects.get(id=export_id)
+    export.status = BookingExport.Status.RUNNING
+    export.save(update_fields=["status"])
+
+    try:
+        export.row_count = write_export(export)
+        export.status = BookingExport.Status.DONE
+    except Exception as e:
+        export.status = BookingExport.Status.FAILED
+        export.error = str(e)
+
+    export.finished_at = timezone.now()
+    export.save(update_fields=["status", "row_count", "file", "error", "finished_at"])
+
+    return f"Export {export.id}: {export.status} ({export.row_count} rows)."
 
-    return "No expired bookings found."
+
+@shared_task
+def relay_outbox_events():
+    """
+    Delivers booking status changes from the outbox to the registered consumers.
+    The cache lock keeps a single relay, so consumers get the events in order.
+    """
+    if not cache.add("bookings:outbox-relay", 1, OUTBOX_RELAY_LOCK_SECONDS):
+        return "Another worker is relaying the outbox."
+    try:
+        delivered = relay_outbox()
+    finally:
+        cache.delete("bookings:outbox-relay")
+    lag = get_outbox_lag()
+    return (
+        f"Delivered {delivered} outbox events, {lag['pending']} pending "
+        f"(oldest {lag['oldest_pending_seconds']:.0f}s)."
+    )
+
+
+@shared_task
+def prune_outbox_events():
+    """
+    Deletes the delivered outbox events past their retention.
+    """
+    deleted = prune_outbox()
+    return f"Deleted {deleted} delivered outbox events."
@@ -1,20 +1,64 @@
 from rest_framework.test import APITestCase, override_settings
 from rest_framework import status
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta, date
 from decimal import Decimal
-from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import patch
+from django.db import connection
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from prometheus_client import REGISTRY
 from psycopg2.extras import DateRange
 
+import gzip
+import os
+import runpy
+import tempfile
+
 # Import your models
 from inventory.models import Room, RoomType, PricingRule, Property
-from bookings.models import Booking
-from bookings.tasks import cancel_expired_bookings
+from bookings.models import Booking, BookingExport, OutboxEvent
+from bookings.outbox import (
+    get_outbox_lag,
+    prune_outbox,
+    record_status_changes,
+    relay_outbox,
+)
+from bookings.services import bulk_cancel_bookings, get_pricing_rules
+from bookings.tasks import cancel_expired_bookings, export_bookings
+from payments.clients import FakeStripeClient
+from payments.models import StripeEvent
+from payments.refunds import drain_refunds
+from payments.services import (
+    CheckoutStatus,
+    process_pending_events,
+    set_checkout_status,
+    start_checkout,
+)
+from payments.tasks import prepare_checkout
+from core.db_backend.base import reset_connection_stats
+from core.routers import ReplicaRouter, is_pinned_to_primary, replica_reads
+from core.tracing import (
+    configure_tracing,
+    end_task_span,
+    inject_task_headers,
+    start_task_span,
+    tracer,
+)
+
+RELAYED_EVENTS = []
+
+
+def collect_outbox_events(events):
+    RELAYED_EVENTS.extend(events)
 
 
 @override_settings(
-    REST_FRAMEWORK={"DEFAULT_THROTTLE_CLASSES": [], "DEFAULT_THROTTLE_RATES": {}}
+    REST_FRAMEWORK={"DEFAULT_THROTTLE_CLASSES": [], "DEFAULT_THROTTLE_RATES": {}},
+    PAYMENTS_BACKEND="fake",
 )
 class MasterSystemTest(APITestCase):
     def setUp(self):
@@ -110,8 +154,7 @@ class MasterSystemTest(APITestCase):
     # ---------------------------------------------------------
     # TEST 3: PAYMENT "GOD MODE"
     # ---------------------------------------------------------
-    @patch("stripe.PaymentIntent.confirm")
-    def test_checkout_god_mode(self, mock_stripe_confirm):
+    def test_checkout_god_mode(self):
         stay_range = DateRange(date(2025, 3, 1), date(2025, 3, 5))
 
         booking = Booking.objects.create(
@@ -123,8 +166,6 @@ class MasterSystemTest(APITestCase):
             stripe_payment_intent_id="pi_test_123",
         )
 
-        mock_stripe_confirm.return_value = MagicMock(status="succeeded")
-
         url = f"/api/bookings/{booking.id}/checkout/"
         data = {"auto_confirm": True}
 
@@ -153,17 +194,30 @@ class MasterSystemTest(APITestCase):
         )
 
         mock_event = {
+            "id": "evt_test_123",
             "type": "payment_intent.succeeded",
             "data": {"object": {"id": intent_id}},
         }
         mock_construct_event.return_value = mock_event
 
         self.client.credentials()
-        response = self.client.post(self.url_webhook, {}, format="json")
-        self.assertEqual(response.status_code, 200)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(self.url_webhook, {}, format="json")
+            self.assertEqual(response.status_code, 200)
+            # stripe retry of the same event
+            response = self.client.post(self.url_webhook, {}, format="json")
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(StripeEvent.objects.count(), 1)
+
+        # the event is applied by the worker, not the webhook
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, Booking.Status.PENDING)
 
+        self.assertEqual(process_pending_events(), 1)
         booking.refresh_from_db()
         self.assertEqual(booking.status, Booking.Status.CONFIRMED)
+        self.assertEqual(process_pending_events(), 0)
 
     # ---------------------------------------------------------
     # TEST 5: CANCELLATION & REFUNDS
@@ -188,3 +242,578 @@ class MasterSystemTest(APITestCase):
         booking.refresh_from_db()
         self.assertEqual(booking.status, Booking.Status.CANCELLED)
         self.assertTrue(booking.penalty_applied)
+
+    # ---------------------------------------------------------
+    # TEST 6: BOOKING HISTORY (KEYSET PAGINATION & CONDITIONAL GET)
+    # ---------------------------------------------------------
+    def test_booking_history_pagination_and_etag(self):
+        for day in range(1, 4):
+            Booking.objects.create(
+                user=self.user,
+                room=self.room,
+                stay_range=DateRange(date(2025, 5, day), date(2025, 5, day + 1)),
+                total_price=Decimal("100.00"),
+                status=Booking.Status.CONFIRMED,
+            )
+
+        response = self.client.get(self.url_list, {"page_size": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNotNone(response.data["next"])
+
+        # nothing changed -> 304
+        etag = response["ETag"]
+        response = self.client.get(
+            self.url_list, {"page_size": 2}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+        # a status change invalidates the ETag
+        Booking.objects.filter(user=self.user).first().save()
+        response = self.client.get(
+            self.url_list, {"page_size": 2}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    # ---------------------------------------------------------
+    # TEST 7: BACKGROUND BOOKINGS EXPORT
+    # ---------------------------------------------------------
+    def test_background_export_writes_compressed_csv(self):
+        booking = Booking.objects.create(
+            user=self.user,
+            room=self.room,
+            stay_range=DateRange(date(2025, 6, 1), date(2025, 6, 3)),
+            total_price=Decimal("200.00"),
+            status=Booking.Status.CONFIRMED,
+        )
+        export = BookingExport.objects.create(
+            requested_by=self.admin,
+            format=BookingExport.Format.CSV,
+            booking_ids=[booking.id],
+        )
+
+        with tempfile.TemporaryDirectory() as media_root:
+            with self.settings(MEDIA_ROOT=media_root):
+                export_bookings(export.id)
+
+                export.refresh_from_db()
+                self.assertEqual(export.status, BookingExport.Status.DONE)
+                self.assertEqual(export.row_count, 1)
+
+                with gzip.open(export.file.path, "rt") as fh:
+                    lines = fh.read().splitlines()
+
+        self.assertEqual(lines[0], "ID,User,Room,Price,Status")
+        self.assertTrue(lines[1].startswith(f"{booking.id},tester,"))
+
+    def test_select_all_export_stores_changelist_filters(self):
+        bookings = [
+            Booking.objects.create(
+                user=self.user,
+                room=self.room,
+                stay_range=DateRange(date(2025, 6, day), date(2025, 6, day + 1)),
+                total_price=Decimal("100.00"),
+                status=status,
+            )
+            for day, status in (
+                (10, Booking.Status.CONFIRMED),
+                (12, Booking.Status.PENDING),
+            )
+        ]
+
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks():
+            response = self.client.post(
+                "/admin/bookings/booking/?status__exact=CONFIRMED",
+                {
+                    "action": "export_to_ndjson",
+                    "select_across": "1",
+                    "index": 0,
+                    "_selected_action": [bookings[0].id],
+                },
+            )
+        self.assertEqual(response.status_code, 302)
+
+        export = BookingExport.objects.get()
+        self.assertTrue(export.whole_changelist)
+        self.assertEqual(export.booking_ids, [])
+        self.assertEqual(export.changelist_filters, "status__exact=CONFIRMED")
+
+        with tempfile.TemporaryDirectory() as media_root:
+            with self.settings(MEDIA_ROOT=media_root):
+                export_bookings(export.id)
+                export.refresh_from_db()
+                with gzip.open(export.file.path, "rt") as fh:
+                    lines = fh.read().splitlines()
+
+        self.assertEqual(export.row_count, 1)
+        self.assertIn(f'"ID": {bookings[0].id}', lines[0])
+
+    # ---------------------------------------------------------
+    # TEST 8: ADMIN CHANGELIST
+    # ---------------------------------------------------------
+    def test_admin_changelist_uses_estimated_paginator(self):
+        for day in range(1, 4):
+            Booking.objects.create(
+                user=self.user,
+                room=self.room,
+                stay_range=DateRange(date(2025, 7, day), date(2025, 7, day + 1)),
+                total_price=Decimal("100.00"),
+            )
+
+        self.client.force_login(self.admin)
+        response = self.client.get("/admin/bookings/booking/")
+
+        self.assertEqual(response.status_code, 200)
+        # small table -> exact count
+        self.assertEqual(response.context["cl"].result_count, 3)
+
+    # ---------------------------------------------------------
+    # TEST 9: BULK CANCELLATION (PROPERTY CLOSURE)
+    # ---------------------------------------------------------
+    def test_bulk_cancel_applies_refund_policy(self):
+        today = timezone.now().date()
+        other_room = Room.objects.create(number="102", room_type=self.room_type)
+
+        far = Booking.objects.create(
+            user=self.user,
+            room=self.room,
+            stay_range=DateRange(
+                today + timedelta(days=10), today + timedelta(days=12)
+            ),
+            total_price=Decimal("200.00"),
+            status=Booking.Status.CONFIRMED,
+            stripe_payment_intent_id="pi_far",
+        )
+        soon = Booking.objects.create(
+            user=self.user,
+            room=other_room,
+            stay_range=DateRange(today + timedelta(days=1), today + timedelta(days=5)),
+            total_price=Decimal("400.00"),
+            status=Booking.Status.PENDING,
+        )
+        expired = Booking.objects.create(
+            user=self.user,
+            room=self.room,
+            stay_range=DateRange(today + timedelta(days=1), today + timedelta(days=2)),
+            total_price=Decimal("100.00"),
+            status=Booking.Status.EXPIRED,
+        )
+
+        report = bulk_cancel_bookings(Booking.objects.all(), batch_size=2)
+
+        self.assertEqual(report.cancelled, 2)
+        self.assertEqual(report.skipped, 1)
+        self.assertEqual(report.penalties, 1)
+        # only the paid booking goes to stripe
+        self.assertEqual(report.refunds_queued, 1)
+        self.assertEqual(report.refund_total, Decimal("200.00"))
+
+        far.refresh_from_db()
+        soon.refresh_from_db()
+        expired.refresh_from_db()
+        self.assertEqual(far.status, Booking.Status.CANCELLED)
+        self.assertEqual(far.refund_amount, Decimal("200.00"))
+        self.assertFalse(far.penalty_applied)
+        self.assertEqual(soon.refund_amount, Decimal("300.00"))
+        self.assertTrue(soon.penalty_applied)
+        self.assertEqual(expired.status, Booking.Status.EXPIRED)
+
+        # the refund is issued by the refund worker, not the cancellation
+        self.assertFalse(far.is_refunded)
+        self.assertEqual(far.refund_job.amount, Decimal("200.00"))
+        drain_refunds(client=FakeStripeClient())
+        far.refresh_from_db()
+        self.assertTrue(far.is_refunded)
+
+    # ---------------------------------------------------------
+    # TEST 10: TRANSACTIONAL OUTBOX
+    # ---------------------------------------------------------
+    @override_settings(
+        BOOKING_OUTBOX_CONSUMERS=["bookings.tests.collect_outbox_events"]
+    )
+    def test_status_changes_are_relayed_from_outbox(self):
+        RELAYED_EVENTS.clear()
+        data = {
+            "room_type_slug": self.room_type.slug,
+            "check_in": "2025-09-01",
+            "check_out": "2025-09-03",
+        }
+        response = self.client.post(self.url_create, data, format="json")
+        booking_id = response.data["id"]
+
+        # bulk .update() paths write events too
+        Booking.objects.filter(id=booking_id).update(
+            created_at=timezone.now() - timedelta(minutes=20)
+        )
+        cancel_expired_bookings()
+
+        self.assertEqual(get_outbox_lag()["pending"], 2)
+        self.assertEqual(relay_outbox(), 2)
+
+        self.assertEqual(
+            [(e.booking_id, e.old_status, e.new_status) for e in RELAYED_EVENTS],
+            [
+                (booking_id, "", Booking.Status.PENDING),
+                (booking_id, Booking.Status.PENDING, Booking.Status.EXPIRED),
+            ],
+        )
+        self.assertFalse(OutboxEvent.objects.filter(processed_at__isnull=True).exists())
+
+        # delivered events are pruned after the retention, pending ones never
+        record_status_changes(
+            [(booking_id, self.user.id, self.room.id, Booking.Status.EXPIRED)],
+            Booking.Status.CANCELLED,
+        )
+        OutboxEvent.objects.update(created_at=timezone.now() - timedelta(days=30))
+        self.assertEqual(prune_outbox(), 2)
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+
+    # ---------------------------------------------------------
+    # TEST 11: READ REPLICA ROUTING & READ-YOUR-WRITES
+    # ---------------------------------------------------------
+    @patch("core.routers.replica_is_healthy", side_effect=lambda alias: alias == "r1")
+    @patch("core.routers.get_replicas", return_value=["r0", "r1"])
+    def test_reads_are_routed_to_healthy_replicas(self, mock_replicas, mock_health):
+        router = ReplicaRouter()
+
+        # outside of a replica block everything stays on the primary
+        self.assertIsNone(router.db_for_read(Booking))
+
+        with replica_reads():
+            # the test itself runs inside a transaction -> primary
+            self.assertIsNone(router.db_for_read(Booking))
+
+            with patch("core.routers.connections") as mock_connections:
+                mock_connections.__getitem__.return_value.in_atomic_block = False
+                self.assertEqual(router.db_for_read(Booking), "r1")
+        self.assertEqual(router.db_for_write(Booking), "default")
+
+        # a write pins the user to the primary
+        self.assertFalse(is_pinned_to_primary(self.user))
+        data = {
+            "room_type_slug": self.room_type.slug,
+            "check_in": "2025-10-01",
+            "check_out": "2025-10-03",
+        }
+        response = self.client.post(self.url_create, data, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(is_pinned_to_primary(self.user))
+
+    # ---------------------------------------------------------
+    # TEST 12: CONNECTION STATS
+    # ---------------------------------------------------------
+    def test_connection_checkouts_are_counted(self):
+        reset_connection_stats()
+
+        # what close_if_unusable_or_obsolete() does when a request ends
+        connection.checked_out = False
+        Booking.objects.count()
+        Booking.objects.count()
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get("/api/health/db/")
+        self.assertEqual(response.status_code, 200)
+        stats = response.data["databases"]["default"]
+        self.assertEqual(stats["checkouts"], 1)
+        self.assertEqual(stats["reused"], 1)
+        self.assertEqual(stats["open_connections"], 1)
+
+    # ---------------------------------------------------------
+    # TEST 13: ASYNC CHECKOUT
+    # ---------------------------------------------------------
+    def test_checkout_creates_intent_in_background(self):
+        booking = Booking.objects.create(
+            user=self.user,
+            room=self.room,
+            stay_range=DateRange(date(2025, 11, 1), date(2025, 11, 3)),
+            total_price=Decimal("200.00"),
+            status=Booking.Status.PENDING,
+        )
+        url = f"/api/bookings/{booking.id}/checkout/"
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(url, {}, format="json")
+            self.assertEqual(response.status_code, 202)
+            # a second click doesn't queue another task
+            response = self.client.post(url, {}, format="json")
+            self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(callbacks), 1)
+
+        prepare_checkout(booking.id)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        booking.refresh_from_db()
+        self.assertTrue(
+            response.data["client_secret"].startswith(booking.stripe_payment_intent_id)
+        )
+
+    def test_failed_checkout_can_be_retried(self):
+        booking = Booking.objects.create(
+            user=self.user,
+            room=self.room,
+            stay_range=DateRange(date(2025, 11, 5), date(2025, 11, 7)),
+            total_price=Decimal("200.00"),
+            status=Booking.Status.PENDING,
+        )
+        url = f"/api/bookings/{booking.id}/checkout/"
+        set_checkout_status(booking.id, CheckoutStatus.FAILED, error="Stripe is down")
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 400)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(url, {}, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(callbacks), 1)
+
+        prepare_checkout(booking.id)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_checkout_not_stuck_processing(self):
+        booking = Booking.objects.create(
+            user=self.user,
+            room=self.room,
+            stay_range=DateRange(date(2025, 11, 9), date(2025, 11, 11)),
+            total_price=Decimal("200.00"),
+            status=Booking.Status.PENDING,
+        )
+        url = f"/api/bookings/{booking.id}/checkout/"
+
+        # the broker is down
+        with patch.object(prepare_checkout, "delay", side_effect=OSError("refused")):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(url, {}, format="json")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 400)
+
+        # an unexpected error in the task
+        self.assertTrue(start_checkout(booking.id))
+        with patch(
+            "payments.tasks.create_payment_intent", side_effect=RuntimeError("boom")
+        ):
+            prepare_checkout.apply(args=[booking.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(start_checkout(booking.id))
+
+    # ---------------------------------------------------------
+    # TEST 14: CACHED PRICING RULES (TAG INVALIDATION)
+    # ---------------------------------------------------------
+    def test_pricing_rules_cache_invalidated_on_change(self):
+        self.assertEqual(get_pricing_rules([self.room_type.id]), [self.weekend_rule])
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                get_pricing_rules([self.room_type.id]), [self.weekend_rule]
+            )
+
+        # a rule of this room type, then a change to a global one
+        summer = PricingRule.objects.create(
+            name="Summer",
+            room_type=self.room_type,
+            price_multiplier=Decimal("1.50"),
+            start_date=date(2030, 7, 1),
+            end_date=date(2030, 8, 31),
+        )
+        self.assertCountEqual(
+            get_pricing_rules([self.room_type.id]), [self.weekend_rule, summer]
+        )
+        self.weekend_rule.price_multiplier = Decimal("1.30")
+        self.weekend_rule.save()
+        rules = {rule.id: rule for rule in get_pricing_rules([self.room_type.id])}
+        self.assertEqual(rules[self.weekend_rule.id].price_multiplier, Decimal("1.30"))
+
+        # moving a rule invalidates its old scope too
+        other = RoomType.objects.create(
+            name="Single",
+            slug="single",
+            base_price=Decimal("50.00"),
+            capacity=1,
+            property=self.property,
+        )
+        self.assertEqual(get_pricing_rules([other.id]), [self.weekend_rule])
+        self.weekend_rule.room_type = self.room_type  # global -> specific
+        self.weekend_rule.save()
+        self.assertEqual(get_pricing_rules([other.id]), [])
+
+        summer.room_type = other
+        summer.save()
+        self.assertEqual(get_pricing_rules([self.room_type.id]), [self.weekend_rule])
+
+        # bookings aren't cached, saving one bumps nothing
+        booking = Booking.objects.create(
+            user=self.user,
+            room=Room.objects.get(id=self.room.id),
+            stay_range=DateRange(date(2030, 9, 1), date(2030, 9, 3)),
+            total_price=Decimal("200.00"),
+        )
+        booking = Booking.objects.get(id=booking.id)
+        with self.assertNumQueries(1):
+            booking.save(update_fields=["stripe_payment_intent_id", "updated_at"])
+
+    # ---------------------------------------------------------
+    # TEST 15: PROMETHEUS METRICS
+    # ---------------------------------------------------------
+    @override_settings(METRICS_CELERY_QUEUES=[], METRICS_TOKEN="scrape-token")
+    def test_metrics_exposition(self):
+        def sample(name, **labels):
+            return REGISTRY.get_sample_value(name, labels) or 0
+
+        created = sample("bookings_total", outcome="created")
+        unavailable = sample("bookings_total", outcome="no_availability")
+        requests = sample(
+            "http_request_duration_seconds_count", method="POST", route="api/book/"
+        )
+
+        data = {
+            "room_type_slug": self.room_type.slug,
+            "check_in": "2030-03-01",
+            "check_out": "2030-03-03",
+        }
+        response = self.client.post(self.url_create, data, format="json")
+        self.assertEqual(response.status_code, 201)
+        # the only room is taken now
+        response = self.client.post(self.url_create, data, format="json")
+        self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(sample("bookings_total", outcome="created"), created + 1)
+        self.assertEqual(
+            sample("bookings_total", outcome="no_availability"), unavailable + 1
+        )
+        self.assertEqual(
+            sample(
+                "http_request_duration_seconds_count", method="POST", route="api/book/"
+            ),
+            requests + 2,
+        )
+        self.assertGreater(sample("http_request_db_queries_sum", route="api/book/"), 0)
+
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-token")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'bookings_total{outcome="created"}', response.content)
+
+    def test_gunicorn_config_prepares_metrics_dir_before_preload(self):
+        # gunicorn reads its config before loading a preloaded app, whose
+        # histograms open their files in the directory right away
+        config = settings.BASE_DIR / "gunicorn.conf.py"
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = os.path.join(tmp, "prometheus")
+            os.makedirs(directory)
+            open(os.path.join(directory, "histogram_1.db"), "w").close()
+            with patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": directory}):
+                os.environ.pop("GUNICORN_METRICS_DIR_RESET", None)
+                runpy.run_path(str(config))
+                self.assertEqual(os.listdir(directory), [])
+
+                # a HUP reload keeps the files of the running processes
+                open(os.path.join(directory, "histogram_2.db"), "w").close()
+                runpy.run_path(str(config))
+                self.assertEqual(os.listdir(directory), ["histogram_2.db"])
+
+    # ---------------------------------------------------------
+    # TEST 16: TRACING (REQUEST -> SERVICES -> SQL -> CELERY)
+    # ---------------------------------------------------------
+    @override_settings(TRACING_TRUSTED_NETWORKS=["10.1.0.0/16"])
+    def test_request_trace_continues_into_tasks(self):
+        exporter = InMemorySpanExporter()
+        configure_tracing(exporter)
+        trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+        # a sampled untrusted caller: a new trace, linked to the caller's
+        traceparent = f"00-{trace_id}-00f067aa0ba902b7-01"
+        response = self.client.get(
+            self.url_list, HTTP_TRACEPARENT=traceparent, REMOTE_ADDR="192.0.2.7"
+        )
+        self.assertEqual(response.status_code, 200)
+        trace.get_tracer_provider().force_flush()
+        self.assertFalse(
+            [
+                span
+                for span in exporter.get_finished_spans()
+                if format(span.context.trace_id, "032x") == trace_id
+            ]
+        )
+
+        # a sampled trusted caller: recorded whatever TRACING_SAMPLE_RATIO is
+        data = {
+            "room_type_slug": self.room_type.slug,
+            "check_in": "2030-04-01",
+            "check_out": "2030-04-03",
+        }
+        response = self.client.post(
+            self.url_create,
+            data,
+            format="json",
+            HTTP_TRACEPARENT=traceparent,
+            REMOTE_ADDR="10.1.2.3",
+        )
+        self.assertEqual(response.status_code, 201)
+        trace.get_tracer_provider().force_flush()
+
+        spans = [
+            span
+            for span in exporter.get_finished_spans()
+            if format(span.context.trace_id, "032x") == trace_id
+        ]
+        names = {span.name for span in spans}
+        self.assertIn("POST api/book/", names)
+        self.assertIn("bookings.create_booking", names)
+        self.assertIn("bookings.calculate_total_price", names)
+        self.assertIn("db SELECT", names)
+
+        # the task queued inside the request joins its trace
+        headers = {}
+        with tracer.start_as_current_span(
+            "checkout", context=propagate.extract({"traceparent": traceparent})
+        ) as parent:
+            inject_task_headers(headers)
+        task = SimpleNamespace(
+            name="payments.tasks.prepare_checkout",
+            request=SimpleNamespace(**headers),
+        )
+        start_task_span("task-1", task)
+        end_task_span("task-1", "SUCCESS")
+        trace.get_tracer_provider().force_flush()
+
+        task_span = next(
+            span
+            for span in exporter.get_finished_spans()
+            if span.name == "celery payments.tasks.prepare_checkout"
+        )
+        self.assertEqual(task_span.parent.span_id, parent.get_span_context().span_id)
+
+    # ---------------------------------------------------------
+    # TEST 17: PREBUILT OPENAPI SCHEMA
+    # ---------------------------------------------------------
+    def test_schema_served_from_build_file(self):
+        with tempfile.NamedTemporaryFile(suffix=".yaml") as schema:
+            schema.write(b"openapi: 3.0.3\n")
+            schema.flush()
+            with override_settings(OPENAPI_SCHEMA_FILE=schema.name):
+                response = self.client.get("/api/schema/")
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response["Content-Type"], "application/vnd.oai.openapi"
+                )
+                self.assertEqual(
+                    b"".join(response.streaming_content), b"openapi: 3.0.3\n"
+                )
+
+    def test_json_schema_served_from_build_file(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as schema:
+            schema.write(b'{"openapi": "3.0.3"}')
+            schema.flush()
+            with override_settings(OPENAPI_JSON_SCHEMA_FILE=schema.name):
+                response = self.client.get("/api/schema/", {"format": "json"})
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response["Content-Type"], "application/vnd.oai.openapi+json"
+                )
+                self.assertEqual(
+                    b"".join(response.streaming_content), b'{"openapi": "3.0.3"}'
+                )
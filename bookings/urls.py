@@ -6,6 +6,7 @@ from .views import (
     BookingListAPIView,
     BookingRetrieveAPIView,
     BookingCreateAPIView,
+    OutboxLagAPIView,
 )
 
 urlpatterns = [
@@ -26,4 +27,5 @@ urlpatterns = [
         BookingCancelAPIView.as_view(),
         name="cancel-booking",
     ),
+    path("outbox/lag/", OutboxLagAPIView.as_view(), name="outbox-lag"),
 ]
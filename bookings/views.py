@@ -1,32 +1,47 @@
+from django.db import transaction
 from django.db.models.manager import BaseManager
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema, inline_serializer
 
 
-import stripe
+import hashlib
 
 from core import settings
+from core.routers import ReplicaReadMixin
 from .services import (
     cancel_booking,
     create_booking,
+    get_booking_history_state,
 )
 from .models import Booking
+from .outbox import get_outbox_lag, record_status_change
 from .serializers import (
     BookingCreateSerializer,
     BookingDetailSerializer,
 )
+from .pagination import BookingCursorPagination
 from inventory.models import RoomType
-from payments.services import create_payment_intent
+from payments.clients import get_stripe_client
+from payments.services import (
+    CheckoutStatus,
+    create_payment_intent,
+    get_checkout_status,
+    start_checkout,
+)
+from payments.tasks import queue_checkout
 
 
 # Create your views here.
 class BookingCreateAPIView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = "book"
     serializer_class = BookingCreateSerializer
 
     @extend_schema(
@@ -83,13 +98,22 @@ class BookingCheckoutAPIView(APIView):
                 )
             },
         ),
-        responses={200: "Stripe Client Secret"},
-        description="Generates a Payment Intent. Send 'auto_confirm': true to pay immediately.",
+        responses={
+            200: "Stripe Client Secret",
+            202: "Payment Intent is being created, poll with GET",
+        },
+        description=(
+            "Starts the checkout: the Payment Intent is created in the background, "
+            "poll GET on the same URL for the client secret. "
+            "Send 'auto_confirm': true to pay immediately."
+        ),
     )
     def post(self, request, booking_id):
         # get booking
         try:
-            booking = Booking.objects.get(id=booking_id, user=request.user)
+            booking = Booking.objects.select_related("user").get(
+                id=booking_id, user=request.user
+            )
         except Booking.DoesNotExist:
             return Response({"error": "Booking not found."}, status=400)
 
@@ -99,68 +123,132 @@ class BookingCheckoutAPIView(APIView):
         elif booking.status == Booking.Status.CANCELLED:
             return Response({"error": "Booking is already cancelled"}, status=200)
 
-        # create stripe intent
-        try:
-            client_secret = create_payment_intent(booking)
+        # NOTE: auto payment for testing only
+        # --- #
+        if request.data.get("auto_confirm") is True:
+            return self.auto_confirm(booking)
+        # --- #
 
-            # NOTE: auto payment for testing only
-            # --- #
-            if request.data.get("auto_confirm") is True:
-                stripe.api_key = settings.STRIPE_SECRET_KEY
+        # the Stripe round trip runs in a worker, not in this request
+        if start_checkout(booking.id):
+            transaction.on_commit(lambda: queue_checkout(booking.id))
+        return self.checkout_response(booking.id)
 
-                intent = stripe.PaymentIntent.confirm(
-                    booking.stripe_payment_intent_id,
-                    payment_method="pm_card_visa",  # Force Visa Card
-                    return_url="http://localhost:8000/payment-complete",  # Required by Stripe
-                )
+    @extend_schema(
+        request=None,
+        responses={
+            200: "Stripe Client Secret",
+            202: "Still processing",
+            404: "No checkout started",
+        },
+        description="Checkout status of a booking, started by POST on the same URL.",
+    )
+    def get(self, request, booking_id):
+        if not Booking.objects.filter(id=booking_id, user=request.user).exists():
+            return Response({"error": "Booking not found."}, status=400)
+        return self.checkout_response(booking_id)
 
-                if intent.status == "succeeded":
-                    # Update DB immediately
-                    booking.status = Booking.Status.CONFIRMED
-                    booking.is_paid = True
-                    booking.save()
-
-                    return Response(
-                        {
-                            "status": "success",
-                            "message": "Payment confirmed automatically.",
-                            "booking_id": booking.id,
-                        },
-                        status=200,
-                    )
-                else:
-                    return Response(
-                        {"error": f"Auto-payment failed. Status: {intent.status}"},
-                        status=400,
-                    )
-            # --- #
+    def checkout_response(self, booking_id):
+        checkout = get_checkout_status(booking_id)
+        if checkout is None:
+            return Response({"error": "No checkout in progress."}, status=404)
 
+        if checkout["status"] == CheckoutStatus.READY:
             return Response(
                 {
-                    "client_secret": client_secret,
+                    "status": checkout["status"],
+                    "client_secret": checkout["client_secret"],
                     "stripe_public_key": settings.STRIPE_PUBLIC_KEY,
                 }
             )
+        if checkout["status"] == CheckoutStatus.FAILED:
+            return Response(
+                {"status": checkout["status"], "error": checkout["error"]}, status=400
+            )
+        return Response({"status": checkout["status"]}, status=202)
+
+    def auto_confirm(self, booking):
+        try:
+            create_payment_intent(booking)
+            intent = get_stripe_client().confirm_payment_intent(
+                booking.stripe_payment_intent_id,
+                payment_method="pm_card_visa",  # Force Visa Card
+                return_url="http://localhost:8000/payment-complete",  # Required by Stripe
+            )
         except Exception as e:
             return Response({"error": str(e)}, status=400)
 
+        if intent.status != "succeeded":
+            return Response(
+                {"error": f"Auto-payment failed. Status: {intent.status}"},
+                status=400,
+            )
+
+        # Update DB immediately
+        old_status = booking.status
+        booking.status = Booking.Status.CONFIRMED
+        with transaction.atomic():
+            booking.save(update_fields=["status", "updated_at"])
+            record_status_change(booking, old_status)
 
-class BookingListAPIView(ListAPIView):
+        return Response(
+            {
+                "status": "success",
+                "message": "Payment confirmed automatically.",
+                "booking_id": booking.id,
+            },
+            status=200,
+        )
+
+
+def _booking_history_state(request):
+    # computed once per request and shared by the ETag and Last-Modified checks
+    if not hasattr(request, "_booking_history_state"):
+        request._booking_history_state = get_booking_history_state(request.user)
+    return request._booking_history_state
+
+
+def booking_history_etag(request, *args, **kwargs):
+    state = _booking_history_state(request)
+    # the cursor/page size are part of the key, every page has its own ETag
+    raw = f"{request.user.pk}:{state['count']}:{state['last_modified']}:{request.GET.urlencode()}"
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def booking_history_last_modified(request, *args, **kwargs):
+    return _booking_history_state(request)["last_modified"]
+
+
+@method_decorator(
+    condition(
+        etag_func=booking_history_etag,
+        last_modified_func=booking_history_last_modified,
+    ),
+    name="get",
+)
+class BookingListAPIView(ReplicaReadMixin, ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = BookingDetailSerializer
+    pagination_class = BookingCursorPagination
 
     def get_queryset(self) -> BaseManager[Booking]:
-        return Booking.objects.filter(user=self.request.user).order_by("-id")
+        return (
+            Booking.objects.filter(user=self.request.user)
+            .select_related("room__room_type")
+            .order_by("-id")
+        )
 
 
-class BookingRetrieveAPIView(RetrieveAPIView):
+class BookingRetrieveAPIView(ReplicaReadMixin, RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = BookingDetailSerializer
     lookup_field = "id"
     lookup_url_kwarg = "booking_id"
 
     def get_queryset(self) -> BaseManager[Booking]:
-        return Booking.objects.filter(user=self.request.user)
+        return Booking.objects.filter(user=self.request.user).select_related(
+            "room__room_type"
+        )
 
 
 class BookingCancelAPIView(APIView):
@@ -194,3 +282,23 @@ class BookingCancelAPIView(APIView):
             )
         except ValueError as e:
             return Response({"error": str(e)}, status=400)
+
+
+class OutboxLagAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        request=None,
+        responses={
+            200: inline_serializer(
+                name="OutboxLag",
+                fields={
+                    "pending": serializers.IntegerField(),
+                    "oldest_pending_seconds": serializers.FloatField(),
+                },
+            )
+        },
+        description="Booking status events not yet delivered to the outbox consumers.",
+    )
+    def get(self, request):
+        return Response(get_outbox_lag())
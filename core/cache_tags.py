@@ -0,0 +1,242 @@
+"""
+Tag-based invalidation of cached model data.
+
+Every tag ("pricing:42", "pricing:global"...) has a version number in the
+cache. A cached entry is stored under a key that embeds the versions of the
+tags it depends on, so bumping one tag (a single INCR) makes every entry
+depending on it unreachable, whatever their number. Stale entries simply
+expire.
+
+Saving or deleting a registered model bumps its tags (see
+`invalidate_on_change`). `.update()` and `bulk_create()` fire no signals,
+their call sites bump the tags themselves with `invalidate_tags`.
+"""
+
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+STATS_FLUSH_SECONDS = 10
+STATS_FAMILIES_KEY = "cachetag:families"
+
+
+# the tags of model data
+
+
+def pricing_tag(room_type_id=None):
+    # global rules apply to every room type
+    return f"pricing:{room_type_id}" if room_type_id else "pricing:global"
+
+
+def reviews_tag(room_type_id):
+    return f"reviews:{room_type_id}"
+
+
+# versions
+
+
+def _version_key(tag):
+    return f"cachetag:v:{tag}"
+
+
+def get_tag_versions(tags):
+    """{tag: version}, one round trip when every tag already has a version."""
+    keys = {_version_key(tag): tag for tag in tags}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        # start from the clock, not 1: an evicted tag must not come back with
+        # a version that old entries were stored under
+        cache.add(key, time.time_ns(), None)
+        versions[key] = cache.get(key)
+    return {tag: versions[key] for key, tag in keys.items()}
+
+
+def bump_tags(*tags):
+    """Never raises: a model save must not fail because Redis is unreachable."""
+    for tag in set(tags):
+        try:
+            cache.incr(_version_key(tag))
+        except ValueError:
+            # no version yet, nothing cached depends on it
+            pass
+        except RedisError as e:
+            # the entries of the tag stay readable until they expire
+            logger.warning("Cache unavailable, %s not invalidated: %s", tag, e)
+
+
+def invalidate_tags(*tags):
+    """
+    Bumps the tags now (readers in this transaction) and again after commit:
+    a reader that cached the old data meanwhile has stored it under the
+    in-between version.
+    """
+    bump_tags(*tags)
+    transaction.on_commit(lambda: bump_tags(*tags))
+
+
+def versioned_key(key, tags, versions=None):
+    """
+    `key` with the current versions of its tags embedded. Pass `versions`
+    read with get_tag_versions() to build many keys in one round trip.
+    """
+    if versions is None:
+        versions = get_tag_versions(tags)
+    digest = hashlib.md5(
+        ",".join(f"{tag}={versions[tag]}" for tag in sorted(tags)).encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    return f"{key}:{digest}"
+
+
+_MISSING = object()
+
+
+def cached(key, tags, compute, timeout=None):
+    """
+    compute() cached under `key` until `timeout` or until any of `tags` is bumped.
+    Computed every time while Redis is unreachable.
+    """
+    try:
+        full_key = versioned_key(key, tags)
+        value = cache.get(full_key, _MISSING)
+        record_lookup(tags, hit=value is not _MISSING)
+    except RedisError as e:
+        logger.warning("Cache unavailable, computing %s: %s", key, e)
+        return compute()
+
+    if value is _MISSING:
+        value = compute()
+        try:
+            cache.set(full_key, value, timeout)
+        except RedisError:
+            pass
+    return value
+
+
+def _field_values(instance, attnames):
+    # from __dict__: a deferred field must not be loaded
+    values = instance.__dict__
+    return {name: values[name] for name in attnames if name in values}
+
+
+def invalidate_on_change(model, tags_for, fields=()):
+    """
+    Registers `tags_for(instance)` to be bumped when an instance is saved or
+    deleted.
+
+    `fields` are the attnames the tags depend on. A save with update_fields
+    touching none of them bumps nothing, and when one of them changed since
+    the instance was loaded the tags of the loaded values are bumped too:
+    a rule moved to another room type invalidates both of them.
+    """
+    fields = tuple(fields)
+
+    def remember(sender, instance, **kwargs):
+        instance._cache_tag_fields = _field_values(instance, fields)
+
+    def invalidate(sender, instance, update_fields=None, **kwargs):
+        if fields and update_fields is not None and not set(fields) & update_fields:
+            return
+
+        tags = set(tags_for(instance))
+        loaded = getattr(instance, "_cache_tag_fields", None)
+        current = _field_values(instance, fields)
+        if loaded:
+            changed = {
+                name: value
+                for name, value in loaded.items()
+                if name in current and value != current[name]
+            }
+            if changed:
+                previous = copy.copy(instance)
+                previous._state = copy.copy(instance._state)
+                # related objects cached on the instance are the new ones
+                previous._state.fields_cache = {}
+                previous.__dict__.update(changed)
+                tags.update(tags_for(previous))
+            instance._cache_tag_fields = current
+
+        invalidate_tags(*tags)
+
+    uid = f"cache_tags:{model._meta.label}"
+    if fields:
+        post_init.connect(remember, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(invalidate, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(invalidate, sender=model, weak=False, dispatch_uid=uid)
+
+
+# hit/miss stats, per tag family ("roomtype", "pricing"...): counted in the
+# process and added to the shared counters every STATS_FLUSH_SECONDS
+
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+_stats_flushed_at = time.monotonic()
+
+
+def _stats_key(family, outcome):
+    return f"cachetag:stats:{family}:{outcome}"
+
+
+def record_lookup(tags, hit):
+    outcome = "hits" if hit else "misses"
+    with _stats_lock:
+        for family in {tag.split(":", 1)[0] for tag in tags}:
+            _stats[family, outcome] += 1
+        if time.monotonic() - _stats_flushed_at < STATS_FLUSH_SECONDS:
+            return
+    flush_stats()
+
+
+def flush_stats():
+    global _stats_flushed_at
+
+    with _stats_lock:
+        pending = dict(_stats)
+        _stats.clear()
+        _stats_flushed_at = time.monotonic()
+    if not pending:
+        return
+
+    for (family, outcome), count in pending.items():
+        key = _stats_key(family, outcome)
+        if not cache.add(key, count, None):
+            cache.incr(key, count)
+    families = cache.get(STATS_FAMILIES_KEY, set())
+    new_families = {family for family, _ in pending} - families
+    if new_families:
+        cache.set(STATS_FAMILIES_KEY, families | new_families, None)
+
+
+def get_tag_stats():
+    """{family: {"hits", "misses", "hit_ratio"}} over every worker."""
+    flush_stats()
+    families = sorted(cache.get(STATS_FAMILIES_KEY, set()))
+    counts = cache.get_many(
+        [
+            _stats_key(family, outcome)
+            for family in families
+            for outcome in ("hits", "misses")
+        ]
+    )
+
+    stats = {}
+    for family in families:
+        hits = counts.get(_stats_key(family, "hits"), 0)
+        misses = counts.get(_stats_key(family, "misses"), 0)
+        stats[family] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+    return stats
@@ -1,9 +1,85 @@
 from celery import Celery
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_shutdown,
+    worker_ready,
+)
 
 import os
+import shutil
+import time
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
 app = Celery("core")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+
+# task metrics (core/metrics.py) and tracing (core/tracing.py)
+
+# task id -> start time, per worker process
+_task_started = {}
+
+
+@before_task_publish.connect
+def propagate_trace(headers, **kwargs):
+    from core.tracing import inject_task_headers
+
+    inject_task_headers(headers)
+
+
+@task_prerun.connect
+def start_task_timer(task_id, task, **kwargs):
+    from core.tracing import start_task_span
+
+    _task_started[task_id] = time.perf_counter()
+    start_task_span(task_id, task)
+
+
+@task_postrun.connect
+def record_task_duration(task_id, task, state, **kwargs):
+    from core.metrics import TASK_SECONDS
+    from core.tracing import end_task_span
+
+    end_task_span(task_id, state)
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_SECONDS.labels(task.name, state or "UNKNOWN").observe(
+            time.perf_counter() - started
+        )
+
+
+@worker_init.connect
+def reset_metrics_dir(**kwargs):
+    from core.tracing import configure_tracing
+
+    configure_tracing()
+    # before the pool starts: samples of a previous run would be added up
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+@worker_ready.connect
+def serve_metrics(**kwargs):
+    # the worker's own /metrics, summing its pool processes
+    port = os.getenv("CELERY_METRICS_PORT")
+    if port:
+        from prometheus_client import start_http_server
+
+        from core.metrics import get_registry
+
+        start_http_server(int(port), registry=get_registry())
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid, **kwargs):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+import weakref
+
+from django.db.backends.postgresql import base
+
+from core.tracing import trace_query
+
+_lock = threading.Lock()
+# alias -> counters, per worker process
+_stats = {}
+_wrappers = weakref.WeakSet()
+
+
+def _record(alias, **values):
+    with _lock:
+        stats = _stats.setdefault(
+            alias,
+            {
+                "connects": 0,
+                "connect_seconds": 0.0,
+                "checkouts": 0,
+                "reused": 0,
+                "wait_seconds": 0.0,
+                "max_wait_seconds": 0.0,
+            },
+        )
+        for key, value in values.items():
+            if key == "max_wait_seconds":
+                stats[key] = max(stats[key], value)
+            else:
+                stats[key] += value
+
+
+def get_connection_stats():
+    """
+    Connection counters of this worker process, per database alias:
+      - connects / connect_seconds: new connections and the time spent opening them
+      - checkouts / reused: requests or tasks that used the database, and how
+        many of them got an already open connection
+      - wait_seconds / max_wait_seconds: time spent getting a usable connection
+        (health check + connect) on checkout
+      - open_connections / max_connection_age_seconds
+    """
+    now = time.monotonic()
+    with _lock:
+        stats = {alias: dict(values) for alias, values in _stats.items()}
+
+    for wrapper in list(_wrappers):
+        if wrapper.connection is None or wrapper.connected_at is None:
+            continue
+        alias_stats = stats.setdefault(wrapper.alias, {})
+        alias_stats["open_connections"] = alias_stats.get("open_connections", 0) + 1
+        alias_stats["max_connection_age_seconds"] = max(
+            alias_stats.get("max_connection_age_seconds", 0.0),
+            now - wrapper.connected_at,
+        )
+
+    for alias_stats in stats.values():
+        checkouts = alias_stats.get("checkouts", 0)
+        alias_stats["avg_wait_seconds"] = (
+            alias_stats["wait_seconds"] / checkouts if checkouts else 0.0
+        )
+
+    return {"pid": os.getpid(), "databases": stats}
+
+
+def reset_connection_stats():
+    with _lock:
+        _stats.clear()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Postgres backend that records how connections are used by this worker.
+
+    A "checkout" is the first database access of a request or Celery task,
+    both end with close_if_unusable_or_obsolete(). With CONN_MAX_AGE set the
+    connection opened by the first checkout is reused by the next ones.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connected_at = None
+        self.checked_out = False
+        # a span per query when tracing (no-op otherwise)
+        self.execute_wrappers.append(trace_query)
+        _wrappers.add(self)
+
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        self.connected_at = time.monotonic()
+        _record(self.alias, connects=1, connect_seconds=time.perf_counter() - started)
+        return connection
+
+    def checkout(self):
+        # set first, connect() runs queries through this wrapper too
+        self.checked_out = True
+        started = time.perf_counter()
+        try:
+            self.close_if_health_check_failed()
+            reused = self.connection is not None
+            self.ensure_connection()
+        except Exception:
+            self.checked_out = False
+            raise
+
+        waited = time.perf_counter() - started
+        _record(
+            self.alias,
+            checkouts=1,
+            reused=int(reused),
+            wait_seconds=waited,
+            max_wait_seconds=waited,
+        )
+
+    def _cursor(self, name=None):
+        if not self.checked_out:
+            self.checkout()
+        return super()._cursor(name)
+
+    def set_autocommit(self, *args, **kwargs):
+        # transaction.atomic() can be the first thing to touch the connection
+        if not self.checked_out:
+            self.checkout()
+        return super().set_autocommit(*args, **kwargs)
+
+    def close_if_unusable_or_obsolete(self):
+        self.checked_out = False
+        super().close_if_unusable_or_obsolete()
@@ -0,0 +1,135 @@
+"""
+Resized WebP/JPEG variants of uploaded images (room images, avatars).
+
+render_variants() only works on bytes and doesn't touch Django, so batches
+can be rendered in a process pool (see the backfill_image_variants command).
+The variants JSON stored on the model records the original it was made from,
+a replaced original is processed again.
+
+Pillow is imported where images are resized: models and serializers import
+this module, web workers never load it.
+"""
+
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+# name: bounding box, largest first (each one is resized from the previous)
+VARIANT_SIZES = {
+    "full": (1600, 1200),
+    "card": (640, 480),
+    "thumb": (160, 160),
+}
+VARIANT_FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+QUALITY = 80
+
+
+def render_variants(data):
+    """
+    Resizes an original image (bytes) into every variant, in both formats.
+    Returns {variant: {"width": ..., "height": ..., "webp": bytes, "jpeg": bytes}}.
+    Smaller images are never upscaled.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as original:
+        # let the JPEG decoder skip straight to a smaller scale
+        original.draft("RGB", VARIANT_SIZES["full"])
+        image = ImageOps.exif_transpose(original).convert("RGB")
+
+    rendered = {}
+    for name, size in VARIANT_SIZES.items():
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        variant = {"width": image.width, "height": image.height}
+        for ext, image_format in VARIANT_FORMATS.items():
+            out = io.BytesIO()
+            image.save(out, image_format, quality=QUALITY)
+            variant[ext] = out.getvalue()
+        rendered[name] = variant
+    return rendered
+
+
+def variant_path(name, variant, ext):
+    # room_images/pool.png -> room_images/variants/pool_card.webp
+    directory, filename = os.path.split(os.path.splitext(name)[0])
+    return os.path.join(directory, "variants", f"{filename}_{variant}.{ext}")
+
+
+def save_variants(field_file, rendered):
+    """
+    Writes the rendered variants next to the original.
+    Returns the JSON to store on the model.
+    """
+    storage = field_file.storage
+    variants = {"source": field_file.name}
+    for name, variant in rendered.items():
+        stored = {"width": variant["width"], "height": variant["height"]}
+        for ext in VARIANT_FORMATS:
+            path = variant_path(field_file.name, name, ext)
+            if storage.exists(path):
+                storage.delete(path)
+            stored[ext] = storage.save(path, ContentFile(variant[ext]))
+        variants[name] = stored
+    return variants
+
+
+def generate_variants(field_file):
+    with field_file.open("rb") as f:
+        data = f.read()
+    return save_variants(field_file, render_variants(data))
+
+
+def update_variants(model, pk, file_field, variants_field):
+    """
+    Generates the variants of one row's image. Stored with an UPDATE guarded on
+    the original's name, a newer upload is never overwritten (and post_save
+    doesn't fire again). Returns False when there was nothing to do.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    obj = model.objects.filter(pk=pk).only(file_field, variants_field).first()
+    if obj is None:
+        return False
+
+    field_file = getattr(obj, file_field)
+    if not needs_variants(field_file, getattr(obj, variants_field)):
+        return False
+
+    try:
+        variants = generate_variants(field_file)
+    except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+        logger.warning("Can't resize %s: %s", field_file.name, e)
+        return False
+
+    model.objects.filter(pk=pk, **{file_field: field_file.name}).update(
+        **{variants_field: variants}
+    )
+    return True
+
+
+def needs_variants(field_file, variants):
+    return bool(field_file) and (variants or {}).get("source") != field_file.name
+
+
+def variant_urls(field_file, variants):
+    """
+    {variant: {"width", "height", "webp", "jpeg"}} with URLs.
+    Empty until the variants of the current original are generated.
+    """
+    if needs_variants(field_file, variants) or not field_file:
+        return {}
+
+    storage = field_file.storage
+    return {
+        name: {
+            "width": variants[name]["width"],
+            "height": variants[name]["height"],
+            **{ext: storage.url(variants[name][ext]) for ext in VARIANT_FORMATS},
+        }
+        for name in VARIANT_SIZES
+        if name in variants
+    }
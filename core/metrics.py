@@ -0,0 +1,192 @@
+"""
+Prometheus metrics of the API, the database and Celery, served at /metrics.
+
+gunicorn and Celery run several worker processes: with PROMETHEUS_MULTIPROC_DIR
+set (see gunicorn.conf.py) every process writes its samples to files in that
+directory and /metrics adds them up. Without it (runserver, tests) the
+metrics of the current process are served.
+
+Only counters and histograms are recorded, they are summed over processes.
+The Celery queue depth is read from the broker when /metrics is scraped.
+"""
+
+import logging
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from kombu.exceptions import ChannelError, OperationalError
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# API
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling a request, per route.",
+    ["method", "route"],
+)
+REQUESTS = Counter(
+    "http_requests",
+    "Handled requests, per route and status code.",
+    ["method", "route", "status"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries run by a request.",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in database queries by a request.",
+    ["route"],
+)
+
+# bookings and payments
+
+BOOKINGS = Counter(
+    "bookings",
+    "Booking attempts: created, no_availability or conflict (exclusion constraint).",
+    ["outcome"],
+)
+EXPIRED_BOOKINGS_BATCH = Histogram(
+    "expired_bookings_batch_size",
+    "Pending bookings expired by one run of cancel_expired_bookings.",
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+STRIPE_CALL_SECONDS = Histogram(
+    "stripe_call_duration_seconds",
+    "Latency of Stripe API calls.",
+    ["operation", "outcome"],
+)
+
+# Celery
+
+TASK_SECONDS = Histogram(
+    "celery_task_duration_seconds",
+    "Run time of Celery tasks.",
+    ["task", "state"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+
+
+def get_registry():
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(CeleryQueueCollector())
+    return registry
+
+
+class CeleryQueueCollector:
+    """Messages waiting in the Celery queues, read from the broker on scrape."""
+
+    def describe(self):
+        # otherwise registering it calls collect(), a broker round trip
+        return []
+
+    def collect(self):
+        from core.celery import app
+
+        gauge = GaugeMetricFamily(
+            "celery_queue_length",
+            "Messages waiting in a Celery queue.",
+            labels=["queue"],
+        )
+        if not settings.METRICS_CELERY_QUEUES:
+            return
+        try:
+            with app.connection_for_read() as conn:
+                # a scrape must not hang on an unreachable broker
+                conn.ensure_connection(max_retries=1)
+                channel = conn.default_channel
+                for queue in settings.METRICS_CELERY_QUEUES:
+                    try:
+                        # passive: only look, never create the queue
+                        _, count, _ = channel.queue_declare(queue=queue, passive=True)
+                    except ChannelError:
+                        # never declared by a worker, nothing was sent to it
+                        count = 0
+                    gauge.add_metric([queue], count)
+        except OperationalError as e:
+            logger.warning("Can't read the Celery queue length: %s", e)
+            return
+        yield gauge
+
+
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    # in multiprocess mode it is added to the registry of each scrape
+    REGISTRY.register(CeleryQueueCollector())
+
+
+def metrics_view(request):
+    """
+    Prometheus exposition. When METRICS_TOKEN is set, scrapes must send it as
+    a bearer token.
+    """
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
+
+
+class QueryStats:
+    """execute_wrapper counting the queries of a request and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """
+    Latency, status and database usage of every request, labelled by URL
+    route ("api/room-types/<slug:slug>/reviews/") to keep the label set small.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        if match and match.url_name == "metrics":
+            return response
+        route = match.route if match else "unmatched"
+        REQUEST_SECONDS.labels(request.method, route).observe(elapsed)
+        REQUESTS.labels(request.method, route, response.status_code).inc()
+        REQUEST_DB_QUERIES.labels(route).observe(queries.count)
+        REQUEST_DB_SECONDS.labels(route).observe(queries.seconds)
+        return response
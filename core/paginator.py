@@ -0,0 +1,52 @@
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset: QuerySet) -> int:
+    """
+    Row estimate from Postgres statistics instead of an exact COUNT(*).
+    Unfiltered querysets use pg_class.reltuples, filtered ones the planner's estimate.
+    Returns -1 when the table has never been analyzed.
+    """
+    connection = connections[queryset.db]
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            return row[0] if row else -1
+
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for very big tables (admin changelists).
+    Small results are counted exactly, above `exact_count_threshold` rows
+    the Postgres estimate is used, which costs a catalog lookup instead of
+    a full scan.
+    """
+
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+
+        estimate = estimate_count(self.object_list)
+        if estimate < self.exact_count_threshold:
+            return super().count
+        return estimate
@@ -0,0 +1,143 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+# alias -> (checked_at, healthy), per worker process
+_replica_health = {}
+
+REPLICA_LAG_SQL = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
+
+def get_replicas():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+def replica_is_healthy(alias):
+    """
+    True when the replica is reachable and not lagging more than REPLICA_MAX_LAG_SECONDS.
+    The answer is cached for REPLICA_HEALTH_CHECK_SECONDS.
+    """
+    checked_at, healthy = _replica_health.get(alias, (0.0, False))
+    if time.monotonic() - checked_at < settings.REPLICA_HEALTH_CHECK_SECONDS:
+        return healthy
+
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(REPLICA_LAG_SQL)
+            lag = cursor.fetchone()[0]
+        healthy = lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+        if not healthy:
+            logger.warning("Replica %s is %s s behind, using primary.", alias, lag)
+    except DatabaseError:
+        logger.warning("Replica %s is unreachable, using primary.", alias)
+        healthy = False
+
+    _replica_health[alias] = (time.monotonic(), healthy)
+    return healthy
+
+
+@contextmanager
+def replica_reads():
+    """Reads inside this block may be served by a replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def pin_to_primary(user):
+    # read-your-writes: this user reads from the primary for a few seconds
+    cache.set(f"db:primary-pin:{user.pk}", 1, settings.READ_YOUR_WRITES_SECONDS)
+
+
+def is_pinned_to_primary(user):
+    return user.is_authenticated and bool(cache.get(f"db:primary-pin:{user.pk}"))
+
+
+class ReplicaRouter:
+    """
+    Everything goes to the primary ('default') unless the code runs inside
+    `replica_reads()` (see ReplicaReadMixin). Then reads are spread over the
+    healthy replicas, falling back to the primary when none is available.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get():
+            return None
+
+        # never read stale rows in the middle of a write transaction
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+
+        healthy = [alias for alias in get_replicas() if replica_is_healthy(alias)]
+        return random.choice(healthy) if healthy else None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas are copies of the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    """
+    DRF view mixin: safe requests read from a replica, unless the user
+    wrote something in the last READ_YOUR_WRITES_SECONDS.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        # authentication ran in super().initial(), request.user is known here
+        if request.method in SAFE_METHODS and not is_pinned_to_primary(request.user):
+            self._replica_token = _replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_replica_token", None)
+        if token is not None:
+            _replica_reads.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class PrimaryPinMiddleware:
+    """Pins users to the primary after every successful write request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        # DRF copies the authenticated (JWT) user back onto the django request
+        user = getattr(request, "user", None)
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user)
+
+        return response
@@ -33,7 +33,7 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 SECRET_KEY = os.getenv('SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DEBUG', '1').lower() in ('1', 'true', 'yes')
 
 # Allow specific hosts or everything (*) if DEBUG is True
 ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS", "localhost 127.0.0.1").split(" ")
@@ -51,25 +51,34 @@ INSTALLED_APPS = [
     'bookings',
     'authentication',
     'user',
+    'payments',
+    'reports',
     'rest_framework',
     'rest_framework_simplejwt',
     'drf_spectacular',
     'django_celery_beat',
     'django_filters',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    # first, so it times the whole request
+    'core.metrics.MetricsMiddleware',
+    'core.tracing.TracingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.routers.PrimaryPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
 ]
 
+# development only, workers with DEBUG off never import the toolbar
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -93,9 +102,16 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DB_POOL_MODE:
+#   persistent - every worker keeps its connections open for DB_CONN_MAX_AGE seconds
+#   pgbouncer  - SQL_HOST/SQL_PORT point to pgbouncer in transaction pooling mode
+#   none       - a new connection for every request
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "persistent")
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        # postgresql backend + per worker connection stats (see /api/health/db/)
+        "ENGINE": "core.db_backend",
         "NAME": os.getenv("POSTGRES_DB", "booking_db"),
         "USER": os.getenv("POSTGRES_USER", "postgres"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", "Mohamed@237"),  # Fallback for local
@@ -103,10 +119,47 @@ DATABASES = {
             "SQL_HOST", "localhost"
         ),  # Docker uses 'db', Local uses 'localhost'
         "PORT": os.getenv("SQL_PORT", "5432"),
+        "CONN_MAX_AGE": (
+            0 if DB_POOL_MODE == "none" else int(os.getenv("DB_CONN_MAX_AGE", 60))
+        ),
+        # reused connections are checked before the first query of a request
+        "CONN_HEALTH_CHECKS": True,
+        # server-side cursors don't survive transaction pooling
+        "DISABLE_SERVER_SIDE_CURSORS": DB_POOL_MODE == "pgbouncer",
     }
 }
 
 
+# Read replicas, e.g. SQL_REPLICA_HOSTS="replica1:5432 replica2:5432"
+# Only views using core.routers.ReplicaReadMixin read from them.
+for index, replica in enumerate(os.getenv("SQL_REPLICA_HOSTS", "").split()):
+    replica_host, _, replica_port = replica.partition(":")
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        "HOST": replica_host,
+        "PORT": replica_port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+
+# fall back to the primary when a replica is further behind than this
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 5))
+REPLICA_HEALTH_CHECK_SECONDS = float(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", 10))
+# users read from the primary for this long after a write (read-your-writes)
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+
+
+# limits the password hashes in flight and remembers recent logins
+AUTHENTICATION_BACKENDS = ['authentication.backends.CachedModelBackend']
+# hashes running at once across every worker process, more logins get a 503.
+# Keep it well below the total number of gunicorn workers.
+PASSWORD_HASHING_CONCURRENCY = int(os.getenv("PASSWORD_HASHING_CONCURRENCY", 4))
+# a hashing slot of a crashed worker is freed after this many seconds
+PASSWORD_HASHING_TIMEOUT = 5
+VERIFIED_LOGIN_CACHE_SECONDS = int(os.getenv("VERIFIED_LOGIN_CACHE_SECONDS", 300))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -152,22 +205,29 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle', # For guests (login/register)
-        'rest_framework.throttling.UserRateThrottle', # For logged-in users
+        # shared by all workers through Redis, see core/throttling.py
+        'core.throttling.GCRAThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '5/minute',   # Max 5 tries per minute for anonymous users
-        'user': '100/day',   # Max 100 requests per day for real users
+        'anon': '60/minute',   # guests, views without a throttle_scope
+        'user': '300/minute',   # logged-in users, views without a throttle_scope
+        'search': '60/minute',   # room search, bursts of 60 then 1/s
+        'book': '10/minute',   # creating bookings
+        'auth': '5/minute',   # login/register/refresh, per IP
     }
 }
 
+# generated at build time (Dockerfile) and served as is by /api/schema/
+OPENAPI_SCHEMA_FILE = os.getenv('OPENAPI_SCHEMA_FILE', str(BASE_DIR / 'openapi.yaml'))
+OPENAPI_JSON_SCHEMA_FILE = os.getenv('OPENAPI_JSON_SCHEMA_FILE', str(BASE_DIR / 'openapi.json'))
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Booking Engine API',
     'DESCRIPTION': 'Advanced Concurrency & Inventory System',
@@ -188,9 +248,42 @@ CELERY_BEAT_SCHEDULE = {
     "cleanup-expired-bookings-every-10-minute": {
         "task": "bookings.tasks.cancel_expired_bookings",
         "schedule": crontab(minute="*/10"),
-    }
+    },
+    "relay-booking-outbox-every-10-seconds": {
+        "task": "bookings.tasks.relay_outbox_events",
+        "schedule": 10.0,
+    },
+    "prune-booking-outbox-daily": {
+        "task": "bookings.tasks.prune_outbox_events",
+        "schedule": crontab(hour=4, minute=0),
+    },
+    "process-stripe-events-every-30-seconds": {
+        "task": "payments.tasks.process_stripe_events",
+        "schedule": 30.0,
+    },
+    "process-refunds-every-minute": {
+        "task": "payments.tasks.process_refunds",
+        "schedule": 60.0,
+    },
+    "reconcile-stripe-payments-daily": {
+        "task": "payments.tasks.reconcile_stripe_payments",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "occupancy-rollup-every-5-minutes": {
+        "task": "reports.tasks.rollup_occupancy",
+        "schedule": crontab(minute="*/5"),
+    },
 }
 
+# Callables (dotted paths) receiving every batch of booking status events
+# from the outbox, see bookings/outbox.py. Must be idempotent.
+BOOKING_OUTBOX_CONSUMERS = []
+# delivered outbox events are deleted after this many days
+BOOKING_OUTBOX_RETENTION_DAYS = int(os.getenv("BOOKING_OUTBOX_RETENTION_DAYS", 7))
+
+# Admin exports bigger than this run as a background Celery job
+BOOKING_EXPORT_STREAMING_LIMIT = int(os.getenv("BOOKING_EXPORT_STREAMING_LIMIT", 50000))
+
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
@@ -199,11 +292,68 @@ INTERNAL_IPS = [
 STRIPE_PUBLIC_KEY = os.getenv("STRIPE_PUBLIC_KEY")
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_WEBHOOK_KEY = os.getenv("STRIPE_WEBHOOK_SECRET")
+STRIPE_TIMEOUT = 10  # seconds
+STRIPE_MAX_NETWORK_RETRIES = 2
+
+# "stripe" or "fake" (local stand-in, no network, see payments/clients.py)
+PAYMENTS_BACKEND = os.getenv("PAYMENTS_BACKEND", "stripe")
+# simulated Stripe round trip of the fake backend, in seconds
+FAKE_STRIPE_LATENCY = float(os.getenv("FAKE_STRIPE_LATENCY", 0))
+# how long a checkout status (and its client secret) can be polled
+CHECKOUT_STATUS_TIMEOUT = 30 * 60
+# a checkout still processing after this long (lost task, dead worker) can be
+# started again, well above the task's retries
+CHECKOUT_PROCESSING_TIMEOUT = 2 * 60
+# refund worker: stay below Stripe's rate limit (100/s live, 25/s test mode)
+STRIPE_REFUNDS_PER_SECOND = int(os.getenv("STRIPE_REFUNDS_PER_SECOND", 20))
+REFUND_MAX_ATTEMPTS = 8
+REFUND_MAX_RETRY_DELAY_SECONDS = 15 * 60
+# window of the daily payment reconciliation, 0 = every PaymentIntent
+PAYMENT_RECONCILIATION_DAYS = int(os.getenv("PAYMENT_RECONCILIATION_DAYS", 7))
+
+# Cache: rate limits, authenticated users, checkout status... must be shared
+# by all workers in production. Without REDIS_URL each process has its own.
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                # fail fast, the rate limiter lets requests through when down
+                'socket_connect_timeout': 0.5,
+                'socket_timeout': 0.5,
+            },
+        }
+    }
+
+# Prometheus metrics (/metrics, see core/metrics.py). With several worker
+# processes set PROMETHEUS_MULTIPROC_DIR in the environment (gunicorn.conf.py).
+# bearer token required to scrape, open when empty
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Celery queues whose length is read from the broker on every scrape
+METRICS_CELERY_QUEUES = os.getenv("METRICS_CELERY_QUEUES", "celery").split()
+
+# OpenTelemetry tracing (see core/tracing.py). Off when TRACING_EXPORTER is
+# empty, otherwise console | file | otlp | dotted path of a SpanExporter class.
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "")
+TRACING_FILE = os.getenv("TRACING_FILE", str(BASE_DIR / "traces.jsonl"))
+# share of the traces recorded, keep it low under load
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", 0.05))
+# callers whose traceparent header is followed, e.g. "10.0.0.0/8 172.16.0.0/12",
+# the traces of anyone else start here
+TRACING_TRUSTED_NETWORKS = os.getenv("TRACING_TRUSTED_NETWORKS", "").split()
+TRACING_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "booking-engine")
 
 # JWT
+# how long an authenticated user is served from the cache, it is dropped on save
+AUTH_USER_CACHE_SECONDS = int(os.getenv("AUTH_USER_CACHE_SECONDS", 60))
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
+    # revoked refresh tokens are kept in the cache until they expire
+    "TOKEN_REFRESH_SERIALIZER": "authentication.serializers.BlacklistingTokenRefreshSerializer",
+    "TOKEN_BLACKLIST_SERIALIZER": "authentication.serializers.LogoutSerializer",
 }
@@ -0,0 +1,190 @@
+"""
+Rate limits shared by every worker: GCRA (generic cell rate algorithm) in Redis.
+
+A caller's whole state is one key, its "theoretical arrival time" (TAT). Each
+request pushes the TAT one `interval` (duration / num_requests) further, a
+request is rejected while the TAT is more than a full window ahead of now.
+That allows bursts of up to num_requests and then a steady rate, with no
+fixed window to reset. Check and update are a single Lua script, atomic
+across workers.
+
+Two local shortcuts save Redis round trips: a caller far below its limit is
+granted a small lease of requests spent in-process, and a rejected caller is
+refused locally until it may retry. A lease isn't charged when granted, the
+requests actually spent on it are added to the TAT on the worker's next call
+for that caller: nothing is lost when a caller moves on to other workers, at
+worst each worker lets one lease through ahead of the charge.
+
+Only the limiter fails open when Redis is down. The features keeping state
+in Redis (checkout status, refresh token blacklist) fail with it, cached
+reads fall back to the database and invalidations are skipped (logged).
+"""
+
+import logging
+import math
+import threading
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from redis.exceptions import RedisError
+from rest_framework.throttling import SimpleRateThrottle
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]: TAT key. ARGV: interval (ms), burst tolerance (ms), wanted lease,
+# requests spent on the previous lease. Charges the spent requests and this
+# one. Returns {granted, retry after (ms)}: granted is this request plus the
+# (uncharged) lease, only given when at least twice as many requests are
+# still available.
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local wanted = tonumber(ARGV[3])
+local spent = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now)
+tat = tat + spent * interval
+local available = math.floor((now + tolerance - tat) / interval) + 1
+if available < 1 then
+    if spent > 0 then
+        redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil(tat - now))
+    end
+    return {0, math.ceil(tat - tolerance - now)}
+end
+local granted = 1
+if available >= 2 * wanted then
+    granted = wanted
+end
+tat = tat + interval
+redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil(tat - now))
+return {granted, 0}
+"""
+
+_gcra_script = None
+
+# throttle key: (leased requests left, lease expiry, blocked until,
+# requests spent on the lease and not charged yet)
+_local = {}
+_local_lock = threading.Lock()
+MAX_LOCAL_KEYS = 10000
+
+
+def _gcra_redis(key, interval, tolerance, wanted, spent):
+    global _gcra_script
+
+    client = caches["default"]._cache.get_client(key, write=True)
+    if _gcra_script is None:
+        _gcra_script = client.register_script(GCRA_SCRIPT)
+    granted, retry_ms = _gcra_script(
+        keys=[cache.make_and_validate_key(key)],
+        args=[interval, tolerance, wanted, spent],
+        client=client,
+    )
+    return granted, retry_ms
+
+
+def _gcra_cache(key, interval, tolerance, wanted, spent):
+    # same algorithm on a non-Redis cache (per-process memory in development
+    # and tests), only atomic within the process
+    with _local_lock:
+        now = time.time() * 1000
+        tat = max(cache.get(key) or now, now) + spent * interval
+        available = math.floor((now + tolerance - tat) / interval) + 1
+        if available < 1:
+            if spent:
+                cache.set(key, tat, math.ceil((tat - now) / 1000))
+            return 0, math.ceil(tat - tolerance - now)
+
+        granted = wanted if available >= 2 * wanted else 1
+        tat += interval
+        cache.set(key, tat, math.ceil((tat - now) / 1000))
+        return granted, 0
+
+
+def gcra_take(key, interval, tolerance, wanted=1, spent=0):
+    """
+    Takes one request from a key's allowance (ms units), after charging the
+    `spent` requests of a previous lease. Returns (granted, retry after ms):
+    granted - 1 requests are leased uncharged, (0, retry) when rejected.
+    """
+    if isinstance(caches["default"], RedisCache):
+        return _gcra_redis(key, interval, tolerance, wanted, spent)
+    return _gcra_cache(key, interval, tolerance, wanted, spent)
+
+
+class GCRAThrottle(SimpleRateThrottle):
+    """
+    One throttle for every view. The rate comes from the view's
+    `throttle_scope` (search, book, auth...) or, without one, "user" or "anon".
+    Users are limited by id, anonymous callers by IP. Fails open: requests
+    are allowed when Redis is unreachable (the limiter only, see above).
+    """
+
+    cache_format = "throttle:%(scope)s:%(ident)s"
+    # seconds a leased allowance may be spent locally
+    lease_seconds = 1
+
+    def __init__(self):
+        # the rate depends on the view, see allow_request
+        pass
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, "throttle_scope", None)
+        if not self.scope:
+            authenticated = request.user and request.user.is_authenticated
+            self.scope = "user" if authenticated else "anon"
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.get_cache_key(request, view)
+        self.retry_after = None
+
+        now = time.monotonic()
+        with _local_lock:
+            leased, lease_expires, blocked_until, spent = _local.get(
+                self.key, (0, 0, 0, 0)
+            )
+            if now < blocked_until:
+                self.retry_after = blocked_until - now
+                return False
+            if leased and now < lease_expires:
+                _local[self.key] = (leased - 1, lease_expires, 0, spent + 1)
+                return True
+            # this call charges them, not a concurrent one
+            _local.pop(self.key, None)
+
+        interval = self.duration * 1000 / self.num_requests
+        try:
+            granted, retry_ms = gcra_take(
+                self.key,
+                interval,
+                interval * (self.num_requests - 1),
+                wanted=max(1, self.num_requests // 20),
+                spent=spent,
+            )
+        except RedisError as e:
+            logger.warning("Rate limiter unavailable, request allowed: %s", e)
+            return True
+
+        with _local_lock:
+            if len(_local) >= MAX_LOCAL_KEYS:
+                _local.clear()
+            if not granted:
+                self.retry_after = retry_ms / 1000
+                _local[self.key] = (0, 0, now + self.retry_after, 0)
+                return False
+            _local[self.key] = (granted - 1, now + self.lease_seconds, 0, 0)
+        return True
+
+    def wait(self):
+        return self.retry_after
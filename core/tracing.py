@@ -0,0 +1,216 @@
+"""
+OpenTelemetry tracing of a request or task: view -> services -> SQL -> Stripe,
+continued in the Celery tasks it queues.
+
+Off unless TRACING_EXPORTER is set. Until then every span is a no-op.
+TRACING_SAMPLE_RATIO of the traces are recorded, and a trace started upstream
+keeps its parent's decision: Celery task headers, and the `traceparent`
+header of callers in TRACING_TRUSTED_NETWORKS. Any other caller starts a new
+trace (linked to its own) so it can't force the recording of its requests.
+SQL spans are only created inside a recorded trace. The SDK is only imported
+when tracing is on.
+
+Exporters: "console" (stdout), "file" (one JSON span per line in TRACING_FILE),
+"otlp" (needs opentelemetry-exporter-otlp-proto-http, configured with the
+standard OTEL_EXPORTER_OTLP_* variables), or the dotted path of a SpanExporter
+class.
+"""
+
+import functools
+import ipaddress
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from opentelemetry import context as otel_context
+from opentelemetry import propagate, trace
+
+# a proxy until configure_tracing() installs the provider
+tracer = trace.get_tracer("booking-engine")
+
+_configured = False
+_configure_lock = threading.Lock()
+
+# longer statements (bulk inserts) are cut
+MAX_STATEMENT_LENGTH = 1000
+
+
+def build_exporter(name):
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "file":
+        return ConsoleSpanExporter(
+            out=open(settings.TRACING_FILE, "a"),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    if name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+        except ImportError:
+            raise ImproperlyConfigured(
+                "TRACING_EXPORTER=otlp needs opentelemetry-exporter-otlp-proto-http."
+            )
+        return OTLPSpanExporter()
+    return import_string(name)()
+
+
+def configure_tracing(exporter=None):
+    """
+    Installs the tracer provider of this process, once. Called when the
+    middleware is loaded and when a Celery worker starts. `exporter`
+    overrides TRACING_EXPORTER.
+    """
+    global _configured
+
+    if exporter is None and not settings.TRACING_EXPORTER:
+        return
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    with _configure_lock:
+        if _configured:
+            return
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}),
+            sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO)),
+        )
+        provider.add_span_processor(
+            BatchSpanProcessor(exporter or build_exporter(settings.TRACING_EXPORTER))
+        )
+        trace.set_tracer_provider(provider)
+        _configured = True
+
+
+def traced(name):
+    """Runs the decorated function in a span."""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_query(execute, sql, params, many, context):
+    """Execute wrapper of every database connection (see core.db_backend)."""
+    if not trace.get_current_span().is_recording():
+        return execute(sql, params, many, context)
+
+    operation = sql.split(None, 1)[0].upper() if sql else "SQL"
+    with tracer.start_as_current_span(
+        f"db {operation}",
+        kind=trace.SpanKind.CLIENT,
+        attributes={
+            "db.system": "postgresql",
+            "db.namespace": context["connection"].settings_dict["NAME"],
+            "db.query.text": sql[:MAX_STATEMENT_LENGTH],
+        },
+    ):
+        return execute(sql, params, many, context)
+
+
+@functools.lru_cache(maxsize=8)
+def _trusted_networks(networks):
+    return [ipaddress.ip_network(network) for network in networks]
+
+
+def is_trusted_caller(request):
+    networks = _trusted_networks(tuple(settings.TRACING_TRUSTED_NETWORKS))
+    if not networks:
+        return False
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+class TracingMiddleware:
+    """
+    A server span per request, named after the URL route like the metrics.
+    It continues the caller's trace (`traceparent` header) only for trusted
+    callers, the others are linked to it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        configure_tracing()
+
+    def __call__(self, request):
+        caller = propagate.extract(request.headers)
+        links = []
+        if not is_trusted_caller(request):
+            caller_span = trace.get_current_span(caller).get_span_context()
+            if caller_span.is_valid:
+                links.append(trace.Link(caller_span))
+            # a new root, sampled by TRACING_SAMPLE_RATIO only
+            caller = otel_context.Context()
+
+        with tracer.start_as_current_span(
+            request.method,
+            context=caller,
+            links=links,
+            kind=trace.SpanKind.SERVER,
+            attributes={"http.request.method": request.method},
+        ) as span:
+            response = self.get_response(request)
+            if span.is_recording():
+                match = request.resolver_match
+                if match:
+                    span.update_name(f"{request.method} {match.route}")
+                    span.set_attribute("http.route", match.route)
+                span.set_attribute("http.response.status_code", response.status_code)
+                if response.status_code >= 500:
+                    span.set_status(trace.StatusCode.ERROR)
+            return response
+
+
+# Celery: the publisher's context travels in the task headers, the task runs
+# in a consumer span child of it
+
+TRACE_HEADERS = ("traceparent", "tracestate")
+
+# task id -> (span, context token), per worker process
+_task_spans = {}
+
+
+def inject_task_headers(headers):
+    propagate.inject(headers)
+
+
+def start_task_span(task_id, task):
+    carrier = {
+        header: getattr(task.request, header)
+        for header in TRACE_HEADERS
+        if getattr(task.request, header, None)
+    }
+    span = tracer.start_span(
+        f"celery {task.name}",
+        context=propagate.extract(carrier),
+        kind=trace.SpanKind.CONSUMER,
+        attributes={"messaging.system": "celery", "celery.task_id": task_id},
+    )
+    token = otel_context.attach(trace.set_span_in_context(span))
+    _task_spans[task_id] = (span, token)
+
+
+def end_task_span(task_id, state):
+    span, token = _task_spans.pop(task_id, (None, None))
+    if span is None:
+        return
+    span.set_attribute("celery.state", state or "UNKNOWN")
+    if state == "FAILURE":
+        span.set_status(trace.StatusCode.ERROR)
+    span.end()
+    otel_context.detach(token)
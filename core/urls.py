@@ -19,8 +19,14 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from drf_spectacular.views import SpectacularSwaggerView, SpectacularAPIView
-from debug_toolbar.toolbar import debug_toolbar_urls
+
+from .metrics import metrics_view
+from .views import (
+    CacheHealthAPIView,
+    DatabaseHealthAPIView,
+    schema_view,
+    swagger_view,
+)
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -28,14 +34,18 @@ urlpatterns = [
     path("api/", include("inventory.urls")),
     path("api/", include("authentication.urls")),
     path("api/", include("user.urls")),
+    path("api/", include("reports.urls")),
+    path("api/", include("payments.urls")),
+    path("api/health/db/", DatabaseHealthAPIView.as_view(), name="db-health"),
+    path("api/health/cache/", CacheHealthAPIView.as_view(), name="cache-health"),
+    path("metrics", metrics_view, name="metrics"),
     # Swagger
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
-    path(
-        "api/docs/",
-        SpectacularSwaggerView.as_view(url_name="schema"),
-        name="swagger-ui",
-    ),
-] + debug_toolbar_urls()
+    path("api/schema/", schema_view, name="schema"),
+    path("api/docs/", swagger_view, name="swagger-ui"),
+]
 
 if settings.DEBUG:
+    from debug_toolbar.toolbar import debug_toolbar_urls
+
+    urlpatterns += debug_toolbar_urls()
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
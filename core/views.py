@@ -0,0 +1,84 @@
+import os
+
+from django.conf import settings
+from django.http import FileResponse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.types import OpenApiTypes
+
+from .cache_tags import get_tag_stats
+from .db_backend.base import get_connection_stats
+
+
+class DatabaseHealthAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        request=None,
+        responses={200: OpenApiTypes.OBJECT},
+        description=(
+            "Connection stats of the worker process that served the request: "
+            "checkouts, connection reuse, wait time and connection age per database."
+        ),
+    )
+    def get(self, request):
+        return Response(get_connection_stats())
+
+
+class CacheHealthAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        request=None,
+        responses={200: OpenApiTypes.OBJECT},
+        description=(
+            "Hits, misses and hit ratio of tagged cache entries per tag family "
+            "(roomtype, pricing, reviews...), over every worker."
+        ),
+    )
+    def get(self, request):
+        return Response(get_tag_stats())
+
+
+# drf_spectacular.views (the schema generator) is imported on first use only,
+# production serves the file generated at build time
+
+
+def requested_schema_format(request):
+    # same choice as SpectacularAPIView: ?format= first, then the Accept header
+    requested = request.GET.get("format")
+    if requested:
+        return requested
+    accept = request.headers.get("Accept", "")
+    if "json" in accept and "yaml" not in accept:
+        return "json"
+    return "yaml"
+
+
+def schema_view(request):
+    """
+    The OpenAPI document, YAML or JSON (`?format=json`), generated at build
+    time by `manage.py spectacular` (see the Dockerfile). Generated on each
+    request when the file is missing, in development, or for another format.
+    """
+    schema_files = {
+        "yaml": (settings.OPENAPI_SCHEMA_FILE, "application/vnd.oai.openapi"),
+        "json": (settings.OPENAPI_JSON_SCHEMA_FILE, "application/vnd.oai.openapi+json"),
+    }
+    path, content_type = schema_files.get(
+        requested_schema_format(request), (None, None)
+    )
+    if path and os.path.exists(path):
+        return FileResponse(open(path, "rb"), content_type=content_type)
+
+    from drf_spectacular.views import SpectacularAPIView
+
+    return SpectacularAPIView.as_view()(request)
+
+
+def swagger_view(request):
+    from drf_spectacular.views import SpectacularSwaggerView
+
+    return SpectacularSwaggerView.as_view(url_name="schema")(request)
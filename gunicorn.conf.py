@@ -0,0 +1,51 @@
+"""
+gunicorn settings, loaded automatically from the working directory.
+
+Prometheus metrics of the worker processes are written to
+PROMETHEUS_MULTIPROC_DIR and summed by /metrics (see core/metrics.py).
+
+The app is loaded once in the master and the workers are forked from it:
+they start without importing anything and share the imported code
+(copy-on-write) instead of each holding a copy.
+"""
+
+import os
+import shutil
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", 2 * os.cpu_count() + 1))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus")
+
+
+def reset_metrics_dir():
+    """
+    Samples left by a previous run would be added to the new ones. Runs when
+    this file is read, before a preloaded app opens its metric files (the
+    master loads it before on_starting). Only once per master: a HUP reload
+    reads this file again while the workers are writing to the directory.
+    """
+    if os.environ.get("GUNICORN_METRICS_DIR_RESET"):
+        return
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+    os.environ["GUNICORN_METRICS_DIR_RESET"] = "1"
+
+
+reset_metrics_dir()
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        # the views too, otherwise each worker imports them on its first request
+        from django.urls import get_resolver
+
+        get_resolver().url_patterns
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,5 +1,12 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 
+import io
+
+from .importers import InventoryImporter, read_records
 from .models import PricingRule, Property, RoomImage, RoomType, Room
 
 
@@ -23,7 +30,58 @@ class RoomTypeAdmin(admin.ModelAdmin):
     ]
 
 
-admin.site.register(Property)
+class InventoryImportForm(forms.Form):
+    file = forms.FileField(help_text="csv, ndjson/jsonl or json inventory file")
+
+
+@admin.register(Property)
+class PropertyAdmin(admin.ModelAdmin):
+    change_list_template = "admin/inventory/property/change_list.html"
+
+    def get_urls(self):
+        return [
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_view),
+                name="inventory_property_import",
+            ),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect("admin:inventory_property_changelist")
+
+        form = InventoryImportForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            upload = form.cleaned_data["file"]
+            file_format = upload.name.rsplit(".", 1)[-1].lower()
+
+            # read the upload as a text stream, row by row
+            fh = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+            try:
+                report = InventoryImporter().run(read_records(fh, file_format))
+            except ValueError as e:
+                self.message_user(request, str(e), messages.ERROR)
+            else:
+                self.message_user(request, str(report), messages.SUCCESS)
+                for line, errors in report.errors[:20]:
+                    self.message_user(
+                        request, f"Row {line}: {errors}", messages.WARNING
+                    )
+                return redirect("admin:inventory_property_changelist")
+
+        return TemplateResponse(
+            request,
+            "admin/inventory/property/import_inventory.html",
+            {
+                **self.admin_site.each_context(request),
+                "title": "Import inventory",
+                "form": form,
+                "opts": self.model._meta,
+            },
+        )
+
+
 # admin.site.register(RoomType)
 admin.site.register(Room)
 admin.site.register(PricingRule)
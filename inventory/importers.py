@@ -0,0 +1,401 @@
+import csv
+import io
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from core.cache_tags import invalidate_tags, pricing_tag
+from .models import PricingRule, Property, Room, RoomType
+from .serializers import InventoryRecordSerializer
+
+LIST_COLUMNS = ("amenities", "days_of_week")
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    created: dict = field(
+        default_factory=lambda: {
+            "properties": 0,
+            "room_types": 0,
+            "rooms": 0,
+            "pricing_rules": 0,
+        }
+    )
+    errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        created = ", ".join(f"{count} {name}" for name, count in self.created.items())
+        return (
+            f"{self.rows} rows in {self.elapsed:.2f}s "
+            f"({self.rows_per_second:.0f} rows/sec). Created {created}. "
+            f"{len(self.errors)} invalid rows."
+        )
+
+
+def _normalize_csv_row(row):
+    # empty cells mean "not given", list cells are pipe separated (wifi|tv)
+    record = {}
+    for key, value in row.items():
+        if key is None or value is None or value.strip() == "":
+            continue
+        value = value.strip()
+        record[key] = value.split("|") if key in LIST_COLUMNS else value
+    return record
+
+
+def read_records(fh, file_format):
+    """
+    Lazily yields raw records from an inventory file.
+    Supports csv, ndjson/jsonl (streamed line by line) and a plain json array.
+    """
+    if file_format == "csv":
+        for row in csv.DictReader(fh):
+            yield _normalize_csv_row(row)
+    elif file_format in ("ndjson", "jsonl"):
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+    elif file_format == "json":
+        # a json array can't be parsed incrementally with the stdlib
+        yield from json.load(fh)
+    else:
+        raise ValueError(f"Unsupported inventory file format: {file_format}")
+
+
+def _pg_array(values):
+    items = (
+        '"' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"' for v in values
+    )
+    return "{" + ",".join(items) + "}"
+
+
+def _copy_rows(table, columns, rows):
+    """Loads rows into a table with a single COPY ... FROM STDIN."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["\\N" if value is None else value for value in row])
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer,
+        )
+
+
+class InventoryImporter:
+    """
+    Bulk loads Property/RoomType/Room/PricingRule rows from a stream of records.
+
+    Every entity is identified by a natural key, rows that already exist are
+    skipped, so re-running the same file is a no-op:
+      - Property: (name, city)
+      - RoomType: (property, name)
+      - Room: (room type, number)
+      - PricingRule: (name, room type or global)
+    """
+
+    def __init__(self, batch_size=1000, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.report = ImportReport()
+
+        # natural key -> id, kept for the whole run
+        self.properties = {}
+        self.room_types = {}
+        self.rooms = set()
+        self.loaded_room_types = set()
+        self.pricing_rules = None
+        # pricing rules whose room type hasn't been seen yet, (line, record)
+        self.pending_rules = []
+
+        slug_field = RoomType._meta.get_field("slug")
+        self.slugify = slug_field.slugify
+        self.slug_sep = slug_field.index_sep
+        self.slug_indexes = {}
+
+    def run(self, records):
+        started = time.monotonic()
+        records = enumerate(records, start=1)
+
+        while batch := list(islice(records, self.batch_size)):
+            valid = self.validate_batch(batch)
+            with transaction.atomic():
+                self.load_batch(valid)
+
+            self.report.rows += len(batch)
+            self.report.elapsed = time.monotonic() - started
+            if self.progress:
+                self.progress(self.report)
+
+        # the room rows of a rule's room type may come after the rule
+        if self.pending_rules:
+            pending, self.pending_rules = self.pending_rules, []
+            with transaction.atomic():
+                self.load_pricing_rules(pending, final=True)
+
+        self.report.elapsed = time.monotonic() - started
+        return self.report
+
+    def validate_batch(self, batch):
+        valid = []
+        for line, record in batch:
+            serializer = InventoryRecordSerializer(data=record)
+            if serializer.is_valid():
+                valid.append((line, serializer.validated_data))
+            else:
+                self.report.errors.append((line, serializer.errors))
+        return valid
+
+    def load_batch(self, records):
+        # only room rows create properties and room types, a pricing rule
+        # carries none of their fields
+        rooms = [
+            r for _, r in records if r["kind"] == InventoryRecordSerializer.KIND_ROOM
+        ]
+        self.load_properties(rooms)
+        self.load_room_types(rooms)
+        self.load_rooms(rooms)
+        self.load_pricing_rules(
+            [
+                (line, r)
+                for line, r in records
+                if r["kind"] == InventoryRecordSerializer.KIND_PRICING_RULE
+            ]
+        )
+
+    # keys
+    def property_key(self, record):
+        return (record["property_name"], record["property_city"])
+
+    def room_type_key(self, record):
+        return (self.properties[self.property_key(record)], record["room_type"])
+
+    def find_room_type(self, record):
+        property_id = self.properties.get(self.property_key(record))
+        return self.room_types.get((property_id, record["room_type"]))
+
+    # loaders
+    def load_properties(self, records):
+        missing = {}
+        for record in records:
+            key = self.property_key(record)
+            if key not in self.properties:
+                missing.setdefault(key, record)
+        if not missing:
+            return
+
+        # one lookup for every property of the batch we haven't seen yet
+        lookup = Q()
+        for name, city in missing:
+            lookup |= Q(name=name, city=city)
+        for prop_id, name, city in Property.objects.filter(lookup).values_list(
+            "id", "name", "city"
+        ):
+            self.properties[(name, city)] = prop_id
+            missing.pop((name, city), None)
+
+        created = Property.objects.bulk_create(
+            [
+                Property(
+                    name=name,
+                    city=city,
+                    address=record["property_address"],
+                    description=record["property_description"],
+                    phone_number=record["property_phone"],
+                )
+                for (name, city), record in missing.items()
+            ]
+        )
+        for prop in created:
+            self.properties[(prop.name, prop.city)] = prop.id
+        self.report.created["properties"] += len(created)
+
+    def load_room_types(self, records):
+        missing = {}
+        for record in records:
+            key = self.room_type_key(record)
+            if key not in self.room_types:
+                missing.setdefault(key, record)
+        if not missing:
+            return
+
+        lookup = Q()
+        for property_id, name in missing:
+            lookup |= Q(property_id=property_id, name=name)
+        for type_id, property_id, name in RoomType.objects.filter(lookup).values_list(
+            "id", "property_id", "name"
+        ):
+            self.room_types[(property_id, name)] = type_id
+            missing.pop((property_id, name), None)
+        if not missing:
+            return
+
+        slugs = self.generate_slugs([name for _, name in missing])
+        _copy_rows(
+            RoomType._meta.db_table,
+            [
+                "property_id",
+                "name",
+                "base_price",
+                "capacity",
+                "view_type",
+                "is_smoking",
+                "amenities",
+                "slug",
+            ],
+            [
+                [
+                    property_id,
+                    name,
+                    record["base_price"],
+                    record["capacity"],
+                    record["view_type"],
+                    record["is_smoking"],
+                    _pg_array(record["amenities"]),
+                    slug,
+                ]
+                for ((property_id, name), record), slug in zip(missing.items(), slugs)
+            ],
+        )
+
+        for type_id, property_id, name in RoomType.objects.filter(
+            slug__in=slugs
+        ).values_list("id", "property_id", "name"):
+            self.room_types[(property_id, name)] = type_id
+        self.report.created["room_types"] += len(slugs)
+
+    def generate_slugs(self, names):
+        """
+        Unique slugs for a whole batch of new room types, in one query.
+        Same scheme as AutoSlugField: deluxe, deluxe-2, deluxe-3...
+        """
+        bases = [self.slugify(name) for name in names]
+
+        unseen = {base for base in bases if base not in self.slug_indexes}
+        if unseen:
+            pattern = "^({})({}[0-9]+)?$".format(
+                "|".join(re.escape(base) for base in unseen),
+                re.escape(self.slug_sep),
+            )
+            for base in unseen:
+                self.slug_indexes[base] = 0
+            for slug in RoomType.objects.filter(slug__regex=pattern).values_list(
+                "slug", flat=True
+            ):
+                base, _, index = slug.rpartition(self.slug_sep)
+                if base in unseen and index.isdigit():
+                    self.slug_indexes[base] = max(self.slug_indexes[base], int(index))
+                else:
+                    self.slug_indexes[slug] = max(self.slug_indexes[slug], 1)
+
+        slugs = []
+        for base in bases:
+            self.slug_indexes[base] += 1
+            index = self.slug_indexes[base]
+            slugs.append(base if index == 1 else f"{base}{self.slug_sep}{index}")
+        return slugs
+
+    def load_rooms(self, records):
+        type_ids = {self.room_types[self.room_type_key(r)] for r in records}
+
+        # existing room numbers of every room type touched for the first time
+        unseen = type_ids - self.loaded_room_types
+        if unseen:
+            self.rooms.update(
+                Room.objects.filter(room_type_id__in=unseen).values_list(
+                    "room_type_id", "number"
+                )
+            )
+            self.loaded_room_types |= unseen
+
+        new_rooms = []
+        for record in records:
+            key = (self.room_types[self.room_type_key(record)], record["room_number"])
+            if key not in self.rooms:
+                self.rooms.add(key)
+                new_rooms.append([key[1], key[0]])
+
+        if new_rooms:
+            _copy_rows(Room._meta.db_table, ["number", "room_type_id"], new_rooms)
+            self.report.created["rooms"] += len(new_rooms)
+
+    def lookup_room_types(self, records):
+        """Resolves room types that exist in the database but not in the file."""
+        unknown = {
+            (r["property_name"], r["property_city"], r["room_type"])
+            for r in records
+            if self.find_room_type(r) is None
+        }
+        if not unknown:
+            return
+
+        lookup = Q()
+        for name, city, room_type in unknown:
+            lookup |= Q(property__name=name, property__city=city, name=room_type)
+        for type_id, property_id, name, city, room_type in RoomType.objects.filter(
+            lookup
+        ).values_list("id", "property_id", "property__name", "property__city", "name"):
+            self.properties[(name, city)] = property_id
+            self.room_types[(property_id, room_type)] = type_id
+
+    def load_pricing_rules(self, records, final=False):
+        """
+        Creates the rules of (line, record) pairs. A rule whose room type is
+        neither in the file so far nor in the database waits for the rest of
+        the file, and is reported as invalid on the final pass.
+        """
+        if not records:
+            return
+
+        if self.pricing_rules is None:
+            self.pricing_rules = set(
+                PricingRule.objects.values_list("name", "room_type_id")
+            )
+
+        if not final:
+            self.lookup_room_types([r for _, r in records if r.get("room_type")])
+
+        new_rules = []
+        for line, record in records:
+            type_id = None
+            if record.get("room_type"):
+                type_id = self.find_room_type(record)
+                if type_id is None:
+                    if final:
+                        error = {"room_type": "Unknown room type for this property."}
+                        self.report.errors.append((line, error))
+                    else:
+                        self.pending_rules.append((line, record))
+                    continue
+
+            key = (record["rule_name"], type_id)
+            if key in self.pricing_rules:
+                continue
+            self.pricing_rules.add(key)
+            new_rules.append(
+                PricingRule(
+                    name=record["rule_name"],
+                    room_type_id=type_id,
+                    start_date=record["start_date"],
+                    end_date=record["end_date"],
+                    days_of_week=record["days_of_week"],
+                    price_multiplier=record["price_multiplier"],
+                )
+            )
+
+        PricingRule.objects.bulk_create(new_rules)
+        self.report.created["pricing_rules"] += len(new_rules)
+        invalidate_tags(*[pricing_tag(rule.room_type_id) for rule in new_rules])
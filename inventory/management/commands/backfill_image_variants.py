@@ -0,0 +1,96 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from PIL import Image, UnidentifiedImageError
+
+from core.images import needs_variants, render_variants, save_variants
+from inventory.models import RoomImage
+from user.models import UserProfile
+
+# model, image field, variants field
+TARGETS = [
+    (RoomImage, "image", "variants"),
+    (UserProfile, "avatar", "avatar_variants"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the missing thumb/card/full variants of the existing room "
+        "images and avatars. Images are resized in parallel in a process pool, "
+        "a batch at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--force", action="store_true", help="Regenerate existing variants too"
+        )
+
+    def handle(self, *args, **options):
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            for model, file_field, variants_field in TARGETS:
+                done, failed = self.backfill(
+                    pool, model, file_field, variants_field, options
+                )
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"{model.__name__}: {done} processed, {failed} failed."
+                    )
+                )
+
+    def backfill(self, pool, model, file_field, variants_field, options):
+        rows = (
+            model.objects.exclude(**{f"{file_field}__isnull": True})
+            .exclude(**{file_field: ""})
+            .only("pk", file_field, variants_field)
+            .order_by("pk")
+            .iterator(chunk_size=options["batch_size"])
+        )
+        done = failed = 0
+        batch = []
+        for obj in rows:
+            if options["force"] or needs_variants(
+                getattr(obj, file_field), getattr(obj, variants_field)
+            ):
+                batch.append(obj)
+            if len(batch) == options["batch_size"]:
+                batch_done, batch_failed = self.process_batch(
+                    pool, model, batch, file_field, variants_field
+                )
+                done, failed = done + batch_done, failed + batch_failed
+                batch = []
+
+        if batch:
+            batch_done, batch_failed = self.process_batch(
+                pool, model, batch, file_field, variants_field
+            )
+            done, failed = done + batch_done, failed + batch_failed
+        return done, failed
+
+    def process_batch(self, pool, model, batch, file_field, variants_field):
+        # originals are read here, only bytes go to the worker processes
+        futures = {}
+        for obj in batch:
+            field_file = getattr(obj, file_field)
+            try:
+                with field_file.open("rb") as f:
+                    futures[obj] = pool.submit(render_variants, f.read())
+            except OSError as e:
+                self.stderr.write(f"{field_file.name}: {e}")
+
+        processed = []
+        for obj, future in futures.items():
+            field_file = getattr(obj, file_field)
+            try:
+                rendered = future.result()
+            except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+                self.stderr.write(f"{field_file.name}: {e}")
+                continue
+            setattr(obj, variants_field, save_variants(field_file, rendered))
+            processed.append(obj)
+
+        model.objects.bulk_update(processed, [variants_field])
+        return len(processed), len(batch) - len(processed)
@@ -0,0 +1,92 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.test import APIRequestFactory
+
+from core.db_backend.base import get_connection_stats, reset_connection_stats
+from inventory.views import RoomSearchAPIView
+
+
+class BenchRoomSearchAPIView(RoomSearchAPIView):
+    # measure the database, not the rate limiter
+    throttle_classes = []
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the room search endpoint with a new database connection per "
+        "request (CONN_MAX_AGE=0) and with persistent connections. "
+        "Prints requests/sec, p50/p99 latency and connections opened."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--city", default="")
+        parser.add_argument("--conn-max-age", type=int, default=60)
+
+    def handle(self, *args, **options):
+        check_in = date.today() + timedelta(days=30)
+        params = {
+            "check_in": check_in.isoformat(),
+            "check_out": (check_in + timedelta(days=2)).isoformat(),
+        }
+        if options["city"]:
+            params["city"] = options["city"]
+
+        db_settings = connections.settings[DEFAULT_DB_ALIAS]
+        original_max_age = db_settings["CONN_MAX_AGE"]
+        try:
+            for label, max_age in (
+                ("no pooling", 0),
+                ("persistent", options["conn_max_age"]),
+            ):
+                db_settings["CONN_MAX_AGE"] = max_age
+                self.run_mode(label, params, options)
+        finally:
+            db_settings["CONN_MAX_AGE"] = original_max_age
+
+    def run_mode(self, label, params, options):
+        view = BenchRoomSearchAPIView.as_view()
+        factory = APIRequestFactory()
+        per_worker = max(options["requests"] // options["concurrency"], 1)
+
+        def worker():
+            latencies = []
+            try:
+                for _ in range(per_worker):
+                    # same lifecycle as a request in a gunicorn worker
+                    started = time.perf_counter()
+                    request_started.send(sender=self.__class__)
+                    try:
+                        view(factory.get("/api/search/", params)).render()
+                    finally:
+                        request_finished.send(sender=self.__class__)
+                    latencies.append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+            return latencies
+
+        connections.close_all()
+        reset_connection_stats()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            futures = [executor.submit(worker) for _ in range(options["concurrency"])]
+            latencies = sorted(l for future in futures for l in future.result())
+        elapsed = time.perf_counter() - started
+
+        stats = get_connection_stats()["databases"].get(DEFAULT_DB_ALIAS, {})
+        p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+        self.stdout.write(
+            f"{label:>12}: {len(latencies) / elapsed:8.1f} req/s  "
+            f"p50 {statistics.median(latencies) * 1000:6.1f} ms  "
+            f"p99 {p99 * 1000:6.1f} ms  "
+            f"connections opened {stats.get('connects', 0)}  "
+            f"avg wait {stats.get('avg_wait_seconds', 0.0) * 1000:.2f} ms"
+        )
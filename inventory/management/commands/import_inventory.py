@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.importers import InventoryImporter, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import properties, room types, rooms and pricing rules "
+        "from a csv, ndjson/jsonl or json file. Safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Inventory file to import")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "ndjson", "jsonl", "json"],
+            help="File format, guessed from the extension by default",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+
+        file_format = options["format"] or path.suffix.lstrip(".").lower()
+
+        importer = InventoryImporter(
+            batch_size=options["batch_size"],
+            progress=lambda report: self.stdout.write(
+                f"{report.rows} rows ({report.rows_per_second:.0f} rows/sec)"
+            ),
+        )
+
+        with path.open(newline="", encoding="utf-8") as fh:
+            try:
+                report = importer.run(read_records(fh, file_format))
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        for line, errors in report.errors[:20]:
+            self.stderr.write(f"Row {line}: {errors}")
+
+        self.stdout.write(self.style.SUCCESS(str(report)))
@@ -0,0 +1,91 @@
+import json
+import re
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+# run in a fresh interpreter: what a new worker does before serving
+PROFILE_SCRIPT = """
+import json, os, resource, time
+started = time.perf_counter()
+import django
+django.setup()
+{boot}
+print(json.dumps({{
+    "seconds": time.perf_counter() - started,
+    "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}}))
+"""
+
+BOOT = {
+    # the WSGI app and every view, as after a gunicorn worker's first request
+    "web": (
+        "from django.core.wsgi import get_wsgi_application\n"
+        "from django.urls import get_resolver\n"
+        "get_wsgi_application()\n"
+        "get_resolver().url_patterns"
+    ),
+    # the Celery app and every tasks module
+    "celery": "from core.celery import app\napp.loader.import_default_modules()",
+}
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile the boot of a web or Celery worker in fresh interpreters: "
+        "median boot time and peak memory, then the slowest imports "
+        "(python -X importtime) by module and by package."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("target", nargs="?", choices=BOOT, default="web")
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--top", type=int, default=20)
+
+    def handle(self, *args, **options):
+        script = PROFILE_SCRIPT.format(boot=BOOT[options["target"]])
+
+        runs = [json.loads(self.run(script).stdout) for _ in range(options["runs"])]
+        seconds = statistics.median(run["seconds"] for run in runs)
+        maxrss_kb = statistics.median(run["maxrss_kb"] for run in runs)
+        self.stdout.write(
+            f"{options['target']}: boot {seconds * 1000:.0f} ms, "
+            f"peak RSS {maxrss_kb / 1024:.1f} MB "
+            f"(median of {options['runs']} runs)"
+        )
+
+        # one more run for the breakdown, -X importtime slows imports down
+        modules = []
+        for line in self.run(script, "-X", "importtime").stderr.splitlines():
+            match = IMPORT_TIME_LINE.match(line)
+            if match:
+                modules.append((int(match[1]), int(match[2]), match[3]))
+
+        self.stdout.write(
+            "\nSlowest imports, cumulative ms (the first importer of a "
+            "dependency pays for it):"
+        )
+        for _, cumulative, name in sorted(modules, key=lambda m: -m[1])[
+            : options["top"]
+        ]:
+            self.stdout.write(f"{cumulative / 1000:8.1f}  {name}")
+
+        packages = Counter()
+        for self_us, _, name in modules:
+            packages[name.split(".")[0]] += self_us
+        self.stdout.write("\nBy package, own ms:")
+        for package, self_us in packages.most_common(options["top"]):
+            self.stdout.write(f"{self_us / 1000:8.1f}  {package}")
+
+    def run(self, script, *flags):
+        return subprocess.run(
+            [sys.executable, *flags, "-c", script],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0007_property_phone_number"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="roomimage",
+            name="variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
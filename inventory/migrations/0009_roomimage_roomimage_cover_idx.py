@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-19 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0008_roomimage_variants"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="roomimage",
+            index=models.Index(
+                condition=models.Q(("is_cover", True)),
+                fields=["room_type"],
+                name="roomimage_cover_idx",
+            ),
+        ),
+    ]
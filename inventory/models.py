@@ -1,9 +1,12 @@
-from django.db import models
-from django.db.models import Model, TextChoices, Avg
+from django.db import models, transaction
+from django.db.models import Model, TextChoices
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from autoslug import AutoSlugField
 from django.contrib.postgres.fields import ArrayField
 
-import builtins
+from core.cache_tags import invalidate_on_change, pricing_tag
+from core.images import needs_variants
 
 
 # Create your models here.
@@ -57,21 +60,6 @@ class RoomType(Model):
     def __str__(self) -> str:
         return f"{self.name} at {self.property.name}"
 
-    @builtins.property
-    def average_rating(self):
-        # Joins Room -> Booking -> Review -> Calculates Average
-        # Returns None if no reviews exist
-
-        avg = self.rooms.aggregate(avg_score=Avg("bookings__review__rating"))[
-            "avg_score"
-        ]
-
-        return round(avg, 1) if avg else 0.0
-
-    @builtins.property
-    def review_count(self):
-        return self.rooms.filter(bookings__review__isnull=False).count()
-
 
 class Room(Model):
     number = models.CharField(max_length=10)
@@ -92,11 +80,31 @@ class RoomImage(Model):
         default=False, help_text="Is this the main image shown in search?"
     )
     caption = models.CharField(max_length=100, blank=True)
+    # resized thumb/card/full variants, see core.images
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # the search results' cover images
+            models.Index(
+                fields=["room_type"],
+                condition=models.Q(is_cover=True),
+                name="roomimage_cover_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Image for {self.room_type.name}"
 
 
+@receiver(post_save, sender=RoomImage)
+def queue_room_image_variants(sender, instance, **kwargs):
+    if needs_variants(instance.image, instance.variants):
+        from .tasks import generate_room_image_variants
+
+        transaction.on_commit(lambda: generate_room_image_variants.delay(instance.id))
+
+
 class PricingRule(Model):
     name = models.CharField(max_length=100)
     room_type = models.ForeignKey(
@@ -123,3 +131,10 @@ class PricingRule(Model):
 
     def __str__(self):
         return f"{self.name} (x{self.price_multiplier})"
+
+
+invalidate_on_change(
+    PricingRule,
+    lambda rule: [pricing_tag(rule.room_type_id)],
+    fields=["room_type_id"],
+)
@@ -1,23 +1,34 @@
+from decimal import Decimal
 from rest_framework import serializers
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import ModelSerializer, Serializer
 
 
+from core.images import variant_urls
 from .models import RoomType, RoomImage
 
 
 class RoomImageSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = RoomImage
-        fields = ["image", "is_cover", "caption"]
+        fields = ["image", "is_cover", "caption", "variants"]
+
+    def get_variants(self, obj):
+        return variant_urls(obj.image, obj.variants)
 
 
 class RoomTypeSerializer(ModelSerializer):
     hotel_name = serializers.CharField(source="property.name", read_only=True)
     city = serializers.CharField(source="property.city", read_only=True)
-    average_rating = serializers.FloatField(read_only=True)
-    review_count = serializers.FloatField(read_only=True)
+    # from the "ratings" context, {room type id: rating summary}
+    average_rating = serializers.SerializerMethodField()
+    review_count = serializers.SerializerMethodField()
     # total_inventory = serializers.IntegerField(read_only=True)
     rooms_left = serializers.IntegerField(read_only=True)
+    cover_image = serializers.SerializerMethodField()
+    # only set on search results (see inventory.services.with_cover_images)
+    image_count = serializers.IntegerField(read_only=True, default=None)
 
     class Meta:
         model = RoomType
@@ -32,8 +43,126 @@ class RoomTypeSerializer(ModelSerializer):
             "view_type",
             "amenities",
             "is_smoking",
-            "images",
+            "cover_image",
+            "image_count",
             "average_rating",
             "review_count",
             "rooms_left",
         ]
+
+    def get_average_rating(self, obj) -> float | None:
+        rating = self.context.get("ratings", {}).get(obj.id)
+        return rating["average"] if rating else None
+
+    def get_review_count(self, obj) -> int | None:
+        rating = self.context.get("ratings", {}).get(obj.id)
+        return rating["count"] if rating else None
+
+    def get_cover_image(self, obj):
+        """
+        Only the card variant of the cover image, the original's URL until
+        its variants are generated.
+        """
+        covers = getattr(obj, "cover_images", None)
+        if covers is None:
+            covers = obj.images.filter(is_cover=True).order_by("id")[:1]
+        cover = covers[0] if covers else None
+        if cover is None:
+            return None
+
+        card = variant_urls(cover.image, cover.variants).get("card")
+        if card is None:
+            card = {
+                "jpeg": cover.image.url,
+                "webp": None,
+                "width": None,
+                "height": None,
+            }
+        return {
+            "url": card["jpeg"],
+            "webp_url": card["webp"],
+            "width": card["width"],
+            "height": card["height"],
+            "caption": cover.caption,
+        }
+
+
+class InventoryRecordSerializer(Serializer):
+    """Input validation for one row of a bulk inventory import file"""
+
+    KIND_ROOM = "room"
+    KIND_PRICING_RULE = "pricing_rule"
+
+    kind = serializers.ChoiceField(
+        choices=[KIND_ROOM, KIND_PRICING_RULE], default=KIND_ROOM
+    )
+
+    # property
+    property_name = serializers.CharField(max_length=255, required=False)
+    property_city = serializers.CharField(max_length=100, required=False)
+    property_address = serializers.CharField(allow_blank=True, default="")
+    property_description = serializers.CharField(allow_blank=True, default="")
+    property_phone = serializers.CharField(max_length=20, allow_blank=True, default="")
+
+    # room type
+    room_type = serializers.ChoiceField(
+        choices=RoomType.RoomKind.choices, required=False
+    )
+    base_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, required=False
+    )
+    capacity = serializers.IntegerField(min_value=1, required=False)
+    view_type = serializers.ChoiceField(
+        choices=RoomType.ViewType.choices, default=RoomType.ViewType.CITY
+    )
+    is_smoking = serializers.BooleanField(default=False)
+    amenities = serializers.ListField(
+        child=serializers.CharField(max_length=50), default=list
+    )
+
+    # room
+    room_number = serializers.CharField(max_length=10, required=False)
+
+    # pricing rule
+    rule_name = serializers.CharField(max_length=100, required=False)
+    start_date = serializers.DateField(required=False, default=None)
+    end_date = serializers.DateField(required=False, default=None)
+    days_of_week = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6),
+        required=False,
+        default=None,
+    )
+    price_multiplier = serializers.DecimalField(
+        max_digits=4, decimal_places=2, default=Decimal("1.00")
+    )
+
+    def validate(self, attrs):
+        if attrs["kind"] == self.KIND_ROOM:
+            required = [
+                "property_name",
+                "property_city",
+                "room_type",
+                "base_price",
+                "capacity",
+                "room_number",
+            ]
+        else:
+            required = ["rule_name"]
+            # a pricing rule without room type is a global rule
+            if attrs.get("room_type"):
+                required += ["property_name", "property_city"]
+
+        missing = [field for field in required if attrs.get(field) in (None, "")]
+        if missing:
+            raise serializers.ValidationError(
+                {field: "This field is required." for field in missing}
+            )
+
+        if bool(attrs["start_date"]) != bool(attrs["end_date"]):
+            raise serializers.ValidationError(
+                "Both start_date and end_date are required for a date range."
+            )
+        if attrs["start_date"] and attrs["start_date"] > attrs["end_date"]:
+            raise serializers.ValidationError("start_date must be before end_date.")
+
+        return attrs
@@ -1,9 +1,11 @@
+from django.db.models import Count, Exists, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from psycopg2.extras import DateRange
 from datetime import date
 
 
 from bookings.models import Booking
-from .models import RoomType, Room
+from .models import RoomImage, RoomType, Room
 
 
 def find_available_room_types(check_in: date, check_out: date):
@@ -26,28 +28,61 @@ def find_available_room_types(check_in: date, check_out: date):
     return available_room_types
 
 
-def get_inventory_status(room_types_list, check_in, check_out):
+def get_rooms_left(room_type_ids, check_in, check_out):
+    """
+    Free rooms of every given room type for the dates, in one query.
+    Returns {room_type_id: rooms_left}.
+    """
     search_range = DateRange(check_in, check_out)
 
-    for room_type in room_types_list:
-        # count total physical rooms for every type
-        total_rooms = room_type.rooms.count()
-
-        # count rooms calculate busy rooms
-        busy_rooms = (
-            Room.objects.filter(
-                room_type=room_type,
-                bookings__stay_range__overlap=search_range,
-                bookings__status__in=[Booking.Status.PENDING, Booking.Status.CONFIRMED],
-            )
-            .distinct()
-            .count()
-        )
+    busy = Booking.objects.filter(
+        room=OuterRef("pk"),
+        status__in=[Booking.Status.PENDING, Booking.Status.CONFIRMED],
+        stay_range__overlap=search_range,
+    )
+    rows = (
+        Room.objects.filter(room_type_id__in=room_type_ids)
+        .values("room_type_id")
+        .annotate(rooms_left=Count("id", filter=~Exists(busy)))
+        .values_list("room_type_id", "rooms_left")
+    )
 
-        # calculate available rooms
-        available_rooms = total_rooms - busy_rooms
+    rooms_left = dict.fromkeys(room_type_ids, 0)
+    rooms_left.update(rows)
+    return rooms_left
 
-        # room_type.total_inventory = total_rooms
-        room_type.rooms_left = max(0, available_rooms)
+
+def get_inventory_status(room_types_list, check_in, check_out):
+    room_types_list = list(room_types_list)
+    rooms_left = get_rooms_left(
+        [room_type.id for room_type in room_types_list], check_in, check_out
+    )
+
+    for room_type in room_types_list:
+        room_type.rooms_left = rooms_left[room_type.id]
 
     return room_types_list
+
+
+def with_cover_images(room_types):
+    """
+    Loads the cover image of every room type with one prefetch query
+    (`cover_images`) and annotates how many images each one has (`image_count`).
+    The full gallery is served separately.
+    """
+    image_count = (
+        RoomImage.objects.filter(room_type=OuterRef("pk"))
+        .order_by()
+        .values("room_type")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    return room_types.annotate(
+        image_count=Coalesce(Subquery(image_count), 0)
+    ).prefetch_related(
+        Prefetch(
+            "images",
+            queryset=RoomImage.objects.filter(is_cover=True).order_by("id"),
+            to_attr="cover_images",
+        )
+    )
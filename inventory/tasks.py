@@ -0,0 +1,10 @@
+from celery import shared_task
+
+from core.images import update_variants
+from .models import RoomImage
+
+
+@shared_task
+def generate_room_image_variants(image_id):
+    """Resized variants of a newly uploaded room image."""
+    update_variants(RoomImage, image_id, "image", "variants")
@@ -1,3 +1,187 @@
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from decimal import Decimal
+from PIL import Image
+
+import io
+import tempfile
+
+from inventory.importers import InventoryImporter, read_records
+from inventory.models import PricingRule, Property, Room, RoomImage, RoomType
+from inventory.serializers import RoomTypeSerializer
+from inventory.tasks import generate_room_image_variants
+
+INVENTORY_CSV = """kind,property_name,property_city,room_type,base_price,capacity,amenities,room_number,rule_name,days_of_week,price_multiplier
+room,Nile Hotel,Cairo,DELUXE,150.00,2,wifi|tv,101,,,
+room,Nile Hotel,Cairo,DELUXE,150.00,2,wifi|tv,102,,,
+room,Nile Hotel,Cairo,SINGLE,80.00,1,,103,,,
+room,Sea Hotel,Alexandria,DELUXE,120.00,2,,201,,,
+pricing_rule,Nile Hotel,Cairo,DELUXE,,,,,Weekend,4|5,1.20
+room,Sea Hotel,Alexandria,,120.00,2,,202,,,
+"""
+
 
 # Create your tests here.
+class InventoryImportTest(TestCase):
+    def setUp(self):
+        # an existing room type already owns the "deluxe" slug
+        self.property = Property.objects.create(name="Old Hotel", city="Giza")
+        RoomType.objects.create(
+            property=self.property,
+            name=RoomType.RoomKind.DELUXE,
+            base_price=Decimal("100.00"),
+            capacity=2,
+        )
+
+    def run_import(self):
+        return InventoryImporter(batch_size=2).run(
+            read_records(io.StringIO(INVENTORY_CSV), "csv")
+        )
+
+    def test_import_creates_inventory_with_unique_slugs(self):
+        report = self.run_import()
+
+        self.assertEqual(report.rows, 6)
+        self.assertEqual(len(report.errors), 1)  # row 6 has no room type
+        self.assertEqual(
+            report.created,
+            {"properties": 2, "room_types": 3, "rooms": 4, "pricing_rules": 1},
+        )
+
+        slugs = set(RoomType.objects.values_list("slug", flat=True))
+        self.assertEqual(slugs, {"deluxe", "deluxe-2", "deluxe-3", "single"})
+
+        deluxe = RoomType.objects.get(
+            property__name="Nile Hotel", name=RoomType.RoomKind.DELUXE
+        )
+        self.assertEqual(deluxe.amenities, ["wifi", "tv"])
+        self.assertEqual(deluxe.rooms.count(), 2)
+
+        rule = PricingRule.objects.get(name="Weekend")
+        self.assertEqual(rule.room_type, deluxe)
+        self.assertEqual(rule.days_of_week, [4, 5])
+
+    def test_import_is_idempotent(self):
+        self.run_import()
+        report = self.run_import()
+
+        self.assertEqual(
+            report.created,
+            {"properties": 0, "room_types": 0, "rooms": 0, "pricing_rules": 0},
+        )
+        self.assertEqual(Room.objects.count(), 4)
+
+    def test_pricing_rule_before_its_room_type(self):
+        csv_data = """kind,property_name,property_city,room_type,base_price,capacity,room_number,rule_name,price_multiplier
+pricing_rule,Nile Hotel,Cairo,FAMILY,,,,Family Weekend,1.50
+pricing_rule,Old Hotel,Giza,DELUXE,,,,Old Weekend,1.10
+pricing_rule,Nowhere Hotel,Cairo,FAMILY,,,,Lost Rule,1.10
+room,Nile Hotel,Cairo,FAMILY,300.00,4,501,,
+"""
+        report = InventoryImporter(batch_size=2).run(
+            read_records(io.StringIO(csv_data), "csv")
+        )
+
+        self.assertEqual(
+            report.created,
+            {"properties": 1, "room_types": 1, "rooms": 1, "pricing_rules": 2},
+        )
+        self.assertEqual([line for line, _ in report.errors], [3])
+        self.assertFalse(Property.objects.filter(name="Nowhere Hotel").exists())
+
+        family = RoomType.objects.get(name=RoomType.RoomKind.FAMILY)
+        self.assertEqual(family.base_price, Decimal("300.00"))
+        rule = PricingRule.objects.get(name="Family Weekend")
+        self.assertEqual(rule.room_type, family)
+        self.assertEqual(
+            PricingRule.objects.get(name="Old Weekend").room_type.property,
+            self.property,
+        )
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ImageVariantsTest(TestCase):
+    def setUp(self):
+        property = Property.objects.create(name="Test Hotel", city="Cairo")
+        self.room_type = RoomType.objects.create(
+            property=property,
+            name=RoomType.RoomKind.DELUXE,
+            base_price=Decimal("100.00"),
+            capacity=2,
+        )
+
+    def upload(self, size):
+        data = io.BytesIO()
+        Image.new("RGBA", size, "red").save(data, "PNG")
+        return SimpleUploadedFile("pool.png", data.getvalue())
+
+    def test_variants_generated_after_upload(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            image = RoomImage.objects.create(
+                room_type=self.room_type, image=self.upload((3200, 2000)), is_cover=True
+            )
+        self.assertEqual(len(callbacks), 1)
+
+        # the original is served until the variants exist
+        cover = RoomTypeSerializer(self.room_type).data["cover_image"]
+        self.assertEqual(cover["url"], image.image.url)
+
+        generate_room_image_variants(image.id)
+        image.refresh_from_db()
+        self.assertEqual(image.variants["source"], image.image.name)
+        self.assertEqual(
+            (image.variants["full"]["width"], image.variants["full"]["height"]),
+            (1600, 1000),
+        )
+        self.assertEqual(image.variants["thumb"]["width"], 160)
+        with Image.open(
+            image.image.storage.path(image.variants["card"]["webp"])
+        ) as card:
+            self.assertEqual((card.format, card.size), ("WEBP", (640, 400)))
+
+        cover = RoomTypeSerializer(self.room_type).data["cover_image"]
+        self.assertTrue(cover["webp_url"].endswith("pool_card.webp"))
+        self.assertEqual(cover["width"], 640)
+
+        # nothing left to do, saving again doesn't queue it
+        with self.captureOnCommitCallbacks() as callbacks:
+            image.save()
+        self.assertEqual(callbacks, [])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SearchCoverImageTest(TestCase):
+    def setUp(self):
+        property = Property.objects.create(name="Test Hotel", city="Cairo")
+        self.room_types = []
+        for kind in (RoomType.RoomKind.DELUXE, RoomType.RoomKind.SINGLE):
+            room_type = RoomType.objects.create(
+                property=property, name=kind, base_price=Decimal("100.00"), capacity=2
+            )
+            Room.objects.create(number=f"{kind}-1", room_type=room_type)
+            for i in range(3):
+                RoomImage.objects.create(
+                    room_type=room_type,
+                    image=SimpleUploadedFile(f"{kind}-{i}.jpg", b"jpeg"),
+                    is_cover=i == 1,
+                )
+            self.room_types.append(room_type)
+
+    def test_search_embeds_cover_only(self):
+        params = {"check_in": "2030-07-01", "check_out": "2030-07-03"}
+        self.client.get("/api/search/", params)
+
+        # room types (with hotels and image counts), covers, availability;
+        # the pricing rules are cached since the first search
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/search/", params)
+        self.assertEqual(response.status_code, 200)
+        for result in response.json():
+            self.assertEqual(result["image_count"], 3)
+            self.assertIn("-1", result["cover_image"]["url"])
+
+        deluxe = self.room_types[0]
+        response = self.client.get(f"/api/room-types/{deluxe.slug}/images/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+        self.assertTrue(response.json()[0]["is_cover"])
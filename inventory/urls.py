@@ -1,8 +1,12 @@
 from django.urls import path
 
-from .views import RoomSearchAPIView
-
+from .views import RoomSearchAPIView, RoomTypeImagesAPIView
 
 urlpatterns = [
     path("search/", RoomSearchAPIView.as_view(), name="rooms-search"),
+    path(
+        "room-types/<slug:slug>/images/",
+        RoomTypeImagesAPIView.as_view(),
+        name="room-type-images",
+    ),
 ]
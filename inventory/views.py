@@ -1,25 +1,30 @@
 from django.utils.dateparse import parse_date
 from rest_framework import status
 from rest_framework.response import Response
+from rest_framework.generics import ListAPIView
 from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
 
-from .models import RoomType
-from .serializers import RoomTypeSerializer
+from core.routers import ReplicaReadMixin
+from .models import RoomImage, RoomType
+from .serializers import RoomImageSerializer, RoomTypeSerializer
 from .services import (
     find_available_room_types,
     get_inventory_status,
+    with_cover_images,
 )
-from bookings.services import calculate_total_price
+from bookings.services import calculate_total_price, get_pricing_rules
+from user.services import get_rating_summaries
 from .filters import RoomTypeFilter
 
 
 # Create your views here.
-class RoomSearchAPIView(APIView):
+class RoomSearchAPIView(ReplicaReadMixin, APIView):
     permission_classes = [AllowAny]
+    throttle_scope = "search"
 
     @extend_schema(
         parameters=[
@@ -82,17 +87,24 @@ class RoomSearchAPIView(APIView):
             return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
 
         # get counts of filtered room types
-        room_types = get_inventory_status(filterset.qs, check_in_date, check_out_date)
+        room_types = get_inventory_status(
+            with_cover_images(filterset.qs.select_related("property")),
+            check_in_date,
+            check_out_date,
+        )
 
-        # calculate total price for each result
+        # calculate total price for each result, rules are loaded once
+        rules = get_pricing_rules([room_type.id for room_type in room_types])
+        # the rating summaries of every result from the cache at once
+        ratings = get_rating_summaries([room_type.id for room_type in room_types])
         results = []
         for room_type in room_types:
             total_price = calculate_total_price(
-                room_type, check_in_date, check_out_date
+                room_type, check_in_date, check_out_date, rules=rules
             )
 
             # convert model to dictionary
-            data = RoomTypeSerializer(room_type).data
+            data = RoomTypeSerializer(room_type, context={"ratings": ratings}).data
             # inject new field in the model
             data["total_price_for_stay"] = total_price
             results.append(data)
@@ -101,3 +113,20 @@ class RoomSearchAPIView(APIView):
         results.sort(key=lambda x: x["rooms_left"], reverse=True)
 
         return Response(results)
+
+
+class RoomTypeImagesAPIView(ReplicaReadMixin, ListAPIView):
+    permission_classes = [AllowAny]
+    serializer_class = RoomImageSerializer
+    pagination_class = None
+
+    @extend_schema(
+        description="The full image gallery of a room type, cover image first.",
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return RoomImage.objects.filter(room_type__slug=self.kwargs["slug"]).order_by(
+            "-is_cover", "id"
+        )
@@ -1,3 +1,87 @@
 from django.contrib import admin
+from django.utils import timezone
+
+from .models import PaymentDiscrepancy, ReconciliationRun, RefundJob, StripeEvent
+from .tasks import process_refunds, reconcile_stripe_payments
+
 
 # Register your models here.
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ("event_id", "type", "received_at", "processed_at")
+    list_filter = ("type", ("processed_at", admin.EmptyFieldListFilter))
+    search_fields = ("event_id",)
+    readonly_fields = ("event_id", "type", "payload", "received_at", "processed_at")
+
+
+@admin.register(ReconciliationRun)
+class ReconciliationRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "status",
+        "created_gte",
+        "intents_seen",
+        "bookings_confirmed",
+        "discrepancy_count",
+        "started_at",
+        "finished_at",
+    )
+    list_filter = ("status",)
+    readonly_fields = [field.name for field in ReconciliationRun._meta.fields]
+    actions = ["resume_runs"]
+
+    @admin.action(description="Resume selected failed runs")
+    def resume_runs(self, request, queryset):
+        failed = queryset.filter(status=ReconciliationRun.Status.FAILED)
+        for run_id in failed.values_list("id", flat=True):
+            reconcile_stripe_payments.delay(run_id=run_id)
+        self.message_user(request, f"{failed.count()} runs queued.")
+
+
+@admin.register(PaymentDiscrepancy)
+class PaymentDiscrepancyAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "kind",
+        "booking",
+        "payment_intent_id",
+        "booking_status",
+        "intent_status",
+        "expected_amount",
+        "intent_amount",
+        "resolved",
+        "run",
+    )
+    list_filter = ("kind", "resolved")
+    list_select_related = ("booking__room__room_type", "run")
+    search_fields = ("payment_intent_id",)
+    raw_id_fields = ("booking", "run")
+
+
+@admin.register(RefundJob)
+class RefundJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "booking",
+        "amount",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "stripe_refund_id",
+    )
+    list_filter = ("status",)
+    list_select_related = ("booking__room__room_type",)
+    search_fields = ("payment_intent_id", "stripe_refund_id")
+    raw_id_fields = ("booking",)
+    actions = ["retry_refunds"]
+
+    @admin.action(description="Retry selected failed refunds")
+    def retry_refunds(self, request, queryset):
+        updated = queryset.filter(status=RefundJob.Status.FAILED).update(
+            status=RefundJob.Status.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        process_refunds.delay()
+        self.message_user(request, f"{updated} refunds queued again.")
@@ -0,0 +1,193 @@
+import functools
+import time
+import uuid
+
+from django.conf import settings
+from opentelemetry.trace import SpanKind
+
+from core.metrics import STRIPE_CALL_SECONDS
+from core.tracing import tracer
+
+# backend name -> client, one per worker process
+_clients = {}
+
+
+def timed(method):
+    """
+    Records the latency of a Stripe call, labelled by method and outcome,
+    and traces it.
+    """
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            with tracer.start_as_current_span(
+                f"stripe.{method.__name__}", kind=SpanKind.CLIENT
+            ):
+                result = method(*args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            STRIPE_CALL_SECONDS.labels(method.__name__, outcome).observe(
+                time.perf_counter() - started
+            )
+
+    return wrapper
+
+
+class StripeClient:
+    """
+    Stripe API client shared by the whole worker process.
+    Keeps one keep-alive HTTP session instead of a new connection per call
+    and never touches the global `stripe.api_key`.
+    """
+
+    def __init__(self):
+        # imported on first use (like requests), workers that never call
+        # Stripe don't load them
+        import requests
+        import stripe
+
+        self.client = stripe.StripeClient(
+            settings.STRIPE_SECRET_KEY,
+            http_client=stripe.RequestsClient(
+                session=requests.Session(), timeout=settings.STRIPE_TIMEOUT
+            ),
+            max_network_retries=settings.STRIPE_MAX_NETWORK_RETRIES,
+        )
+
+    @timed
+    def create_payment_intent(self, amount, currency, metadata, idempotency_key):
+        return self.client.v1.payment_intents.create(
+            params={"amount": amount, "currency": currency, "metadata": metadata},
+            options={"idempotency_key": idempotency_key},
+        )
+
+    @timed
+    def retrieve_payment_intent(self, intent_id):
+        return self.client.v1.payment_intents.retrieve(intent_id)
+
+    @timed
+    def confirm_payment_intent(self, intent_id, **params):
+        return self.client.v1.payment_intents.confirm(intent_id, params=params)
+
+    @timed
+    def list_payment_intents(self, limit=100, starting_after=None, created_gte=None):
+        """One page of PaymentIntents, newest first (`.data`, `.has_more`)."""
+        params = {"limit": limit}
+        if starting_after:
+            params["starting_after"] = starting_after
+        if created_gte is not None:
+            params["created"] = {"gte": created_gte}
+        return self.client.v1.payment_intents.list(params=params)
+
+    @timed
+    def create_refund(self, payment_intent, amount, idempotency_key):
+        return self.client.v1.refunds.create(
+            params={"payment_intent": payment_intent, "amount": amount},
+            options={"idempotency_key": idempotency_key},
+        )
+
+
+class FakeStripeClient:
+    """
+    Local stand-in for Stripe (PAYMENTS_BACKEND = "fake"), for tests and load
+    testing without network. Every call succeeds after FAKE_STRIPE_LATENCY seconds.
+    Payment intents are kept in memory so they can be listed (reconciliation).
+    """
+
+    def __init__(self):
+        self.intents = {}
+        self.order = []  # intent ids, oldest first
+        self.positions = {}
+
+    def _respond(self, resource, values):
+        """A `stripe.<resource>` object ("PaymentIntent", "Refund"...)."""
+        import stripe
+
+        if settings.FAKE_STRIPE_LATENCY:
+            time.sleep(settings.FAKE_STRIPE_LATENCY)
+        return getattr(stripe, resource).construct_from(
+            values, settings.STRIPE_SECRET_KEY
+        )
+
+    def add_payment_intent(self, amount, status, metadata=None, created=None):
+        intent_id = f"pi_fake_{uuid.uuid4().hex[:24]}"
+        self.intents[intent_id] = {
+            "id": intent_id,
+            "object": "payment_intent",
+            "amount": amount,
+            "currency": "usd",
+            "metadata": metadata or {},
+            "client_secret": f"{intent_id}_secret_fake",
+            "status": status,
+            "created": created or int(time.time()),
+        }
+        self.positions[intent_id] = len(self.order)
+        self.order.append(intent_id)
+        return self.intents[intent_id]
+
+    def create_payment_intent(self, amount, currency, metadata, idempotency_key):
+        intent = self.add_payment_intent(amount, "requires_payment_method", metadata)
+        return self._respond("PaymentIntent", intent)
+
+    def retrieve_payment_intent(self, intent_id):
+        intent = self.intents.get(intent_id) or {
+            "id": intent_id,
+            "object": "payment_intent",
+            "client_secret": f"{intent_id}_secret_fake",
+            "status": "requires_payment_method",
+        }
+        return self._respond("PaymentIntent", intent)
+
+    def confirm_payment_intent(self, intent_id, **params):
+        if intent_id in self.intents:
+            self.intents[intent_id]["status"] = "succeeded"
+        return self._respond(
+            "PaymentIntent",
+            {"id": intent_id, "object": "payment_intent", "status": "succeeded"},
+        )
+
+    def list_payment_intents(self, limit=100, starting_after=None, created_gte=None):
+        position = self.positions[starting_after] if starting_after else len(self.order)
+        data = []
+        while position > 0 and len(data) < limit:
+            intent = self.intents[self.order[position - 1]]
+            if created_gte is not None and intent["created"] < created_gte:
+                # everything older is out of the window too
+                position = 0
+                break
+            data.append(intent)
+            position -= 1
+        return self._respond(
+            "ListObject",
+            {"object": "list", "data": data, "has_more": position > 0},
+        )
+
+    def create_refund(self, payment_intent, amount, idempotency_key):
+        return self._respond(
+            "Refund",
+            {
+                "id": f"re_fake_{uuid.uuid4().hex[:24]}",
+                "object": "refund",
+                "payment_intent": payment_intent,
+                "amount": amount,
+                "status": "succeeded",
+            },
+        )
+
+
+BACKENDS = {
+    "stripe": StripeClient,
+    "fake": FakeStripeClient,
+}
+
+
+def get_stripe_client():
+    """The payments client selected by the PAYMENTS_BACKEND setting."""
+    backend = settings.PAYMENTS_BACKEND
+    if backend not in _clients:
+        _clients[backend] = BACKENDS[backend]()
+    return _clients[backend]
@@ -0,0 +1,103 @@
+# Generated by Django 5.2.9 on 2026-10-19 09:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0013_booking_stripe_payment_intent_index"),
+        ("payments", "0001_stripe_event"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReconciliationRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("RUNNING", "Running"),
+                            ("DONE", "Done"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="RUNNING",
+                        max_length=10,
+                    ),
+                ),
+                ("created_gte", models.DateTimeField(blank=True, null=True)),
+                ("cursor", models.CharField(blank=True, max_length=255)),
+                ("intents_seen", models.PositiveIntegerField(default=0)),
+                ("bookings_confirmed", models.PositiveIntegerField(default=0)),
+                ("discrepancy_count", models.PositiveIntegerField(default=0)),
+                ("error", models.TextField(blank=True)),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="PaymentDiscrepancy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("PAID_NOT_CONFIRMED", "Paid, booking not confirmed"),
+                            ("CONFIRMED_NOT_PAID", "Confirmed, not paid"),
+                            ("AMOUNT_MISMATCH", "Amount mismatch"),
+                            ("UNKNOWN_INTENT", "Paid, no booking"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("payment_intent_id", models.CharField(blank=True, max_length=255)),
+                ("booking_status", models.CharField(blank=True, max_length=20)),
+                ("intent_status", models.CharField(blank=True, max_length=50)),
+                ("expected_amount", models.PositiveIntegerField(blank=True, null=True)),
+                ("intent_amount", models.PositiveIntegerField(blank=True, null=True)),
+                ("resolved", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "booking",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="payment_discrepancies",
+                        to="bookings.booking",
+                    ),
+                ),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="discrepancies",
+                        to="payments.reconciliationrun",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "payment discrepancies",
+            },
+        ),
+    ]
@@ -1,3 +1,133 @@
 from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
 
 # Create your models here.
+class StripeEvent(models.Model):
+    """
+    A verified Stripe webhook event, stored as received.
+    Stripe retries deliveries, the unique event_id keeps each event once.
+    Processed in batches by `payments.tasks.process_stripe_events`.
+    """
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(processed_at__isnull=True),
+                name="stripe_event_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} ({self.type})"
+
+
+class ReconciliationRun(models.Model):
+    """One pass of `payments.tasks.reconcile_stripe_payments` over Stripe's PaymentIntents."""
+
+    class Status(models.TextChoices):
+        RUNNING = "RUNNING", _("Running")
+        DONE = "DONE", _("Done")
+        FAILED = "FAILED", _("Failed")
+
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.RUNNING
+    )
+    # only intents created after this are checked, empty = all of them
+    created_gte = models.DateTimeField(null=True, blank=True)
+    # last processed intent, a failed run can be resumed from here
+    cursor = models.CharField(max_length=255, blank=True)
+    intents_seen = models.PositiveIntegerField(default=0)
+    bookings_confirmed = models.PositiveIntegerField(default=0)
+    discrepancy_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Reconciliation ({self.id}) {self.status}"
+
+
+class PaymentDiscrepancy(models.Model):
+    """A booking and its PaymentIntent that don't agree."""
+
+    class Kind(models.TextChoices):
+        PAID_NOT_CONFIRMED = "PAID_NOT_CONFIRMED", _("Paid, booking not confirmed")
+        CONFIRMED_NOT_PAID = "CONFIRMED_NOT_PAID", _("Confirmed, not paid")
+        AMOUNT_MISMATCH = "AMOUNT_MISMATCH", _("Amount mismatch")
+        UNKNOWN_INTENT = "UNKNOWN_INTENT", _("Paid, no booking")
+
+    run = models.ForeignKey(
+        ReconciliationRun, on_delete=models.CASCADE, related_name="discrepancies"
+    )
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    booking = models.ForeignKey(
+        "bookings.Booking",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="payment_discrepancies",
+    )
+    payment_intent_id = models.CharField(max_length=255, blank=True)
+    booking_status = models.CharField(max_length=20, blank=True)
+    intent_status = models.CharField(max_length=50, blank=True)
+    # in cents
+    expected_amount = models.PositiveIntegerField(null=True, blank=True)
+    intent_amount = models.PositiveIntegerField(null=True, blank=True)
+    # corrected automatically by the run
+    resolved = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "payment discrepancies"
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.payment_intent_id or self.booking_id}"
+
+
+class RefundJob(models.Model):
+    """
+    A refund to issue for a cancelled booking, created in the cancellation's
+    transaction and drained by `payments.tasks.process_refunds`.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", _("Pending")
+        SUCCEEDED = "SUCCEEDED", _("Succeeded")
+        FAILED = "FAILED", _("Failed")
+
+    booking = models.OneToOneField(
+        "bookings.Booking", on_delete=models.CASCADE, related_name="refund_job"
+    )
+    payment_intent_id = models.CharField(max_length=255)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    stripe_refund_id = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # the worker only reads due pending jobs
+            models.Index(
+                fields=["next_attempt_at", "id"],
+                condition=models.Q(status="PENDING"),
+                name="refund_job_due_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Refund of booking ({self.booking_id}): {self.amount} {self.status}"
@@ -0,0 +1,193 @@
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from bookings.models import Booking
+from bookings.outbox import record_status_changes
+from .clients import get_stripe_client
+from .models import PaymentDiscrepancy, ReconciliationRun
+
+PAID = "succeeded"
+
+
+def iter_payment_intents(client, created_gte=None, starting_after=None, page_size=100):
+    """Every PaymentIntent, newest first. Only one page is held in memory."""
+    while True:
+        page = client.list_payment_intents(
+            limit=page_size, starting_after=starting_after, created_gte=created_gte
+        )
+        yield from page.data
+        if not page.has_more or not page.data:
+            return
+        starting_after = page.data[-1].id
+
+
+def _confirm_bookings(rows):
+    """
+    Confirms the (id, user_id, room_id, status) rows, in one UPDATE.
+    An EXPIRED booking whose room was sold again violates the overlap
+    constraint, then the rows are retried one by one and the conflicting ones
+    are left as they are. Returns the ids of the confirmed bookings.
+    """
+    if not rows:
+        return set()
+
+    try:
+        with transaction.atomic():
+            Booking.objects.filter(id__in=[row[0] for row in rows]).update(
+                status=Booking.Status.CONFIRMED, updated_at=timezone.now()
+            )
+        confirmed = rows
+    except IntegrityError:
+        confirmed = []
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    Booking.objects.filter(id=row[0]).update(
+                        status=Booking.Status.CONFIRMED, updated_at=timezone.now()
+                    )
+                confirmed.append(row)
+            except IntegrityError:
+                pass
+
+    record_status_changes(confirmed, Booking.Status.CONFIRMED)
+    return {row[0] for row in confirmed}
+
+
+def reconcile_batch(run, intents):
+    """
+    Matches a batch of PaymentIntents against the bookings with one query,
+    confirms the paid PENDING/EXPIRED bookings with one UPDATE and records
+    every discrepancy. Must run inside a transaction.
+    """
+    intents = {intent.id: intent for intent in intents}
+    bookings = (
+        Booking.objects.select_for_update()
+        .filter(stripe_payment_intent_id__in=intents)
+        .values_list(
+            "id",
+            "user_id",
+            "room_id",
+            "status",
+            "total_price",
+            "stripe_payment_intent_id",
+        )
+    )
+
+    discrepancies = []
+    matched = set()
+    unconfirmed = []
+
+    for booking_id, user_id, room_id, status, total_price, intent_id in bookings:
+        intent = intents[intent_id]
+        matched.add(intent_id)
+        expected_amount = int(total_price * 100) if total_price is not None else None
+        discrepancy = PaymentDiscrepancy(
+            run=run,
+            booking_id=booking_id,
+            payment_intent_id=intent_id,
+            booking_status=status,
+            intent_status=intent.status,
+            expected_amount=expected_amount,
+            intent_amount=intent.amount,
+        )
+
+        if intent.status == PAID:
+            if intent.amount != expected_amount:
+                discrepancy.kind = PaymentDiscrepancy.Kind.AMOUNT_MISMATCH
+            elif status in (Booking.Status.PENDING, Booking.Status.EXPIRED):
+                # the webhook was lost
+                discrepancy.kind = PaymentDiscrepancy.Kind.PAID_NOT_CONFIRMED
+                unconfirmed.append((booking_id, user_id, room_id, status))
+            else:
+                continue
+        elif status == Booking.Status.CONFIRMED:
+            discrepancy.kind = PaymentDiscrepancy.Kind.CONFIRMED_NOT_PAID
+        else:
+            continue
+        discrepancies.append(discrepancy)
+
+    for intent_id, intent in intents.items():
+        if intent.status == PAID and intent_id not in matched:
+            discrepancies.append(
+                PaymentDiscrepancy(
+                    run=run,
+                    kind=PaymentDiscrepancy.Kind.UNKNOWN_INTENT,
+                    payment_intent_id=intent_id,
+                    intent_status=intent.status,
+                    intent_amount=intent.amount,
+                )
+            )
+
+    confirmed = _confirm_bookings(unconfirmed)
+    for discrepancy in discrepancies:
+        discrepancy.resolved = discrepancy.booking_id in confirmed
+
+    PaymentDiscrepancy.objects.bulk_create(discrepancies)
+
+    run.intents_seen += len(intents)
+    run.bookings_confirmed += len(confirmed)
+    run.discrepancy_count += len(discrepancies)
+
+
+def report_uncharged_bookings(run, batch_size=1000):
+    """CONFIRMED bookings that never got a PaymentIntent at all."""
+    bookings = Booking.objects.filter(
+        status=Booking.Status.CONFIRMED, stripe_payment_intent_id__isnull=True
+    )
+    if run.created_gte:
+        bookings = bookings.filter(created_at__gte=run.created_gte)
+
+    rows = bookings.values_list("id", "total_price").iterator(chunk_size=batch_size)
+    while batch := list(islice(rows, batch_size)):
+        PaymentDiscrepancy.objects.bulk_create(
+            [
+                PaymentDiscrepancy(
+                    run=run,
+                    kind=PaymentDiscrepancy.Kind.CONFIRMED_NOT_PAID,
+                    booking_id=booking_id,
+                    booking_status=Booking.Status.CONFIRMED,
+                    expected_amount=(
+                        int(total_price * 100) if total_price is not None else None
+                    ),
+                )
+                for booking_id, total_price in batch
+            ]
+        )
+        run.discrepancy_count += len(batch)
+
+
+def reconcile_payments(run, client=None, batch_size=1000):
+    """
+    Pages through Stripe's PaymentIntents and reconciles them with the
+    bookings, `batch_size` intents per transaction. Memory stays bounded by
+    the batch size whatever the number of intents. Progress is saved after
+    every batch, running it again for a failed run resumes from its cursor.
+    """
+    client = client or get_stripe_client()
+    intents = iter_payment_intents(
+        client,
+        created_gte=int(run.created_gte.timestamp()) if run.created_gte else None,
+        starting_after=run.cursor or None,
+    )
+
+    while batch := list(islice(intents, batch_size)):
+        with transaction.atomic():
+            reconcile_batch(run, batch)
+            run.cursor = batch[-1].id
+            run.save(
+                update_fields=[
+                    "cursor",
+                    "intents_seen",
+                    "bookings_confirmed",
+                    "discrepancy_count",
+                ]
+            )
+
+    report_uncharged_bookings(run, batch_size)
+
+    run.status = ReconciliationRun.Status.DONE
+    run.finished_at = timezone.now()
+    run.save()
+    return run
@@ -0,0 +1,166 @@
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from bookings.models import Booking
+from .clients import get_stripe_client
+from .models import RefundJob
+
+logger = logging.getLogger(__name__)
+
+
+def retryable_stripe_errors():
+    # worth another attempt later, anything else is a permanent failure.
+    # stripe is imported by the payment paths only, not at worker boot
+    import stripe
+
+    return (stripe.APIConnectionError, stripe.RateLimitError, stripe.APIError)
+
+
+class TokenBucket:
+    """
+    Allows `rate` calls per second on average, with bursts up to `capacity`.
+    Only one drainer runs at a time (see payments.tasks.process_refunds),
+    so a local bucket is enough to stay under Stripe's limit.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated_at = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def take(self):
+        """Blocks until a call is allowed."""
+        self._refill()
+        if self.tokens < 1:
+            self.sleep((1 - self.tokens) / self.rate)
+            self._refill()
+        self.tokens -= 1
+
+    def pause(self, seconds):
+        """Stripe said slow down: no calls for `seconds`."""
+        self.tokens = -seconds * self.rate
+
+
+def queue_refunds(refunds):
+    """
+    Creates the refund jobs of cancelled bookings.
+    refunds: iterable of (booking_id, payment_intent_id, amount).
+    Call inside the cancellation's transaction and run process_refunds on commit.
+    A booking is never queued twice.
+    """
+    RefundJob.objects.bulk_create(
+        [
+            RefundJob(booking_id=booking_id, payment_intent_id=intent_id, amount=amount)
+            for booking_id, intent_id, amount in refunds
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def retry_delay(attempts):
+    # 2s, 4s, 8s... capped
+    return timedelta(seconds=min(2**attempts, settings.REFUND_MAX_RETRY_DELAY_SECONDS))
+
+
+@dataclass
+class RefundDrainReport:
+    succeeded: int = 0
+    retried: int = 0
+    failed: int = 0
+
+    def __str__(self):
+        return (
+            f"{self.succeeded} refunds issued, {self.retried} to retry, "
+            f"{self.failed} failed."
+        )
+
+
+def drain_refunds(client=None, bucket=None, batch_size=100, max_seconds=50):
+    """
+    Issues the due refunds, oldest first, at most STRIPE_REFUNDS_PER_SECOND
+    calls per second. The idempotency key makes a retried refund safe, Stripe
+    never refunds twice. Job and booking statuses are written with a couple of
+    UPDATEs per batch. Stops after `max_seconds`, the next run picks up the rest.
+    """
+    import stripe
+
+    client = client or get_stripe_client()
+    bucket = bucket or TokenBucket(settings.STRIPE_REFUNDS_PER_SECOND)
+    report = RefundDrainReport()
+    started = time.monotonic()
+
+    while time.monotonic() - started < max_seconds:
+        jobs = list(
+            RefundJob.objects.filter(
+                status=RefundJob.Status.PENDING, next_attempt_at__lte=timezone.now()
+            ).order_by("next_attempt_at", "id")[:batch_size]
+        )
+        if not jobs:
+            break
+
+        refunded_booking_ids = []
+        for job in jobs:
+            bucket.take()
+            job.attempts += 1
+            try:
+                refund = client.create_refund(
+                    payment_intent=job.payment_intent_id,
+                    amount=int(job.amount * 100),
+                    idempotency_key=f"refund-booking-{job.booking_id}",
+                )
+            except retryable_stripe_errors() as e:
+                if isinstance(e, stripe.RateLimitError):
+                    bucket.pause(1)
+                job.last_error = str(e)
+                if job.attempts >= settings.REFUND_MAX_ATTEMPTS:
+                    job.status = RefundJob.Status.FAILED
+                    report.failed += 1
+                else:
+                    job.next_attempt_at = timezone.now() + retry_delay(job.attempts)
+                    report.retried += 1
+            except stripe.StripeError as e:
+                logger.warning("Refund of booking %s failed: %s", job.booking_id, e)
+                job.status = RefundJob.Status.FAILED
+                job.last_error = str(e)
+                report.failed += 1
+            else:
+                job.status = RefundJob.Status.SUCCEEDED
+                job.stripe_refund_id = refund.id
+                job.last_error = ""
+                refunded_booking_ids.append(job.booking_id)
+                report.succeeded += 1
+
+        now = timezone.now()
+        for job in jobs:
+            job.updated_at = now
+        RefundJob.objects.bulk_update(
+            jobs,
+            [
+                "status",
+                "attempts",
+                "next_attempt_at",
+                "stripe_refund_id",
+                "last_error",
+                "updated_at",
+            ],
+        )
+        Booking.objects.filter(id__in=refunded_booking_ids).update(
+            is_refunded=True, updated_at=now
+        )
+
+    return report
@@ -1,30 +1,165 @@
+import logging
+
 from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from bookings.models import Booking
+from bookings.outbox import record_status_changes
+from core.tracing import traced
+from .clients import get_stripe_client
+from .models import StripeEvent
+
+logger = logging.getLogger(__name__)
+
+
+class CheckoutStatus:
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+
+
+def _checkout_key(booking_id):
+    return f"payments:checkout:{booking_id}"
+
 
-import stripe
+def get_checkout_status(booking_id):
+    return cache.get(_checkout_key(booking_id))
 
 
+def set_checkout_status(booking_id, status, **values):
+    cache.set(
+        _checkout_key(booking_id),
+        {"status": status, **values},
+        settings.CHECKOUT_STATUS_TIMEOUT,
+    )
+
+
+def start_checkout(booking_id):
+    """
+    Marks the checkout of a booking as processing.
+    Returns False when a checkout is already running or done, so the payment
+    intent task is only queued once. A failed checkout is started again, as is
+    one processing for longer than CHECKOUT_PROCESSING_TIMEOUT (its mark expires).
+    """
+    key = _checkout_key(booking_id)
+    processing = {"status": CheckoutStatus.PROCESSING}
+    if cache.add(key, processing, settings.CHECKOUT_PROCESSING_TIMEOUT):
+        return True
+
+    checkout = cache.get(key)
+    if checkout is None or checkout["status"] != CheckoutStatus.FAILED:
+        return False
+    # two racing retries may both queue the task, the intent's idempotency
+    # key keeps that to a single PaymentIntent
+    cache.delete(key)
+    return cache.add(key, processing, settings.CHECKOUT_PROCESSING_TIMEOUT)
+
+
+@traced("payments.create_payment_intent")
 def create_payment_intent(booking):
-    stripe.api_key = settings.STRIPE_SECRET_KEY
     if booking.total_price <= 0:
         raise ValueError("Booking price must be greater than zero.")
 
-    try:
-        amount_in_cents = int(booking.total_price * 100)
-
-        # create intent
-        intent = stripe.PaymentIntent.create(
-            amount=amount_in_cents,
-            currency="usd",
-            metadata={
-                "booking_id": booking.id,
-                "user_email": booking.user.email,
-            },
-        )
-
-        # save intent ID
-        booking.stripe_payment_intent_id = intent.id
-        booking.save()
+    client = get_stripe_client()
 
+    # a retried checkout reuses the intent instead of charging twice
+    if booking.stripe_payment_intent_id:
+        intent = client.retrieve_payment_intent(booking.stripe_payment_intent_id)
         return intent["client_secret"]
-    except Exception as e:
-        raise Exception(f"Stript error {str(e)}")
+
+    intent = client.create_payment_intent(
+        amount=int(booking.total_price * 100),
+        currency="usd",
+        metadata={
+            "booking_id": booking.id,
+            "user_email": booking.user.email,
+        },
+        idempotency_key=f"payment-intent-booking-{booking.id}",
+    )
+
+    # save intent ID
+    booking.stripe_payment_intent_id = intent.id
+    booking.save(update_fields=["stripe_payment_intent_id", "updated_at"])
+
+    return intent["client_secret"]
+
+
+def store_stripe_event(event):
+    """
+    Saves a verified webhook event. Returns False for an event Stripe already
+    delivered before (retries), nothing is stored then.
+    """
+    try:
+        # the unique event_id rejects the duplicate, no lookup needed
+        with transaction.atomic():
+            StripeEvent.objects.create(
+                event_id=event["id"], type=event["type"], payload=event
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def confirm_paid_bookings(intent_ids):
+    """
+    Confirms the PENDING bookings paid by the given PaymentIntents, in one
+    UPDATE. Must run inside a transaction. Returns the number of confirmed bookings.
+    """
+    rows = list(
+        Booking.objects.select_for_update()
+        .filter(stripe_payment_intent_id__in=intent_ids, status=Booking.Status.PENDING)
+        .values_list("id", "user_id", "room_id", "status")
+    )
+    if not rows:
+        return 0
+
+    Booking.objects.filter(id__in=[row[0] for row in rows]).update(
+        status=Booking.Status.CONFIRMED,
+        is_refunded=False,
+        updated_at=timezone.now(),
+    )
+    record_status_changes(rows, Booking.Status.CONFIRMED)
+    return len(rows)
+
+
+@traced("payments.process_pending_events")
+def process_pending_events(batch_size=500, max_batches=20):
+    """
+    Handles stored webhook events, oldest first, a batch per transaction.
+    skip_locked lets several workers drain the table without double processing.
+    Returns the number of processed events.
+    """
+    processed = 0
+
+    for _ in range(max_batches):
+        with transaction.atomic():
+            events = list(
+                StripeEvent.objects.select_for_update(skip_locked=True)
+                .filter(processed_at__isnull=True)
+                .order_by("id")[:batch_size]
+            )
+            if not events:
+                break
+
+            intent_ids = {
+                event.payload["data"]["object"]["id"]
+                for event in events
+                if event.type == "payment_intent.succeeded"
+            }
+            if intent_ids:
+                confirmed = confirm_paid_bookings(intent_ids)
+                if confirmed < len(intent_ids):
+                    logger.info(
+                        "%s paid intents matched no pending booking.",
+                        len(intent_ids) - confirmed,
+                    )
+
+            StripeEvent.objects.filter(id__in=[event.id for event in events]).update(
+                processed_at=timezone.now()
+            )
+
+        processed += len(events)
+
+    return processed
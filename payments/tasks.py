@@ -0,0 +1,141 @@
+import logging
+
+from celery import Task, shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import timedelta
+
+from bookings.models import Booking
+from .models import ReconciliationRun
+from .reconciliation import reconcile_payments
+from .refunds import drain_refunds
+from .services import (
+    CheckoutStatus,
+    create_payment_intent,
+    process_pending_events,
+    set_checkout_status,
+)
+
+logger = logging.getLogger(__name__)
+
+# a drain stops after this long, the next run continues
+REFUND_DRAIN_SECONDS = 50
+
+
+class CheckoutTask(Task):
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        # an unexpected error (database, cache...): the client stops polling
+        # and can start the checkout again
+        booking_id = args[0] if args else kwargs["booking_id"]
+        set_checkout_status(
+            booking_id, CheckoutStatus.FAILED, error="Checkout failed, try again."
+        )
+
+
+@shared_task(bind=True, base=CheckoutTask, max_retries=3)
+def prepare_checkout(self, booking_id):
+    """
+    Creates the Stripe PaymentIntent of a booking and publishes the client
+    secret as the checkout status, polled by GET /api/bookings/<id>/checkout/.
+    """
+    import stripe
+
+    try:
+        booking = Booking.objects.select_related("user").get(
+            id=booking_id, status=Booking.Status.PENDING
+        )
+    except Booking.DoesNotExist:
+        set_checkout_status(
+            booking_id, CheckoutStatus.FAILED, error="Booking is no longer pending."
+        )
+        return
+
+    try:
+        client_secret = create_payment_intent(booking)
+    # network hiccups and rate limits are worth another try
+    except (stripe.APIConnectionError, stripe.RateLimitError) as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=2**self.request.retries)
+        set_checkout_status(booking_id, CheckoutStatus.FAILED, error=str(e))
+        return
+    except (ValueError, stripe.StripeError) as e:
+        set_checkout_status(booking_id, CheckoutStatus.FAILED, error=str(e))
+        return
+
+    set_checkout_status(booking_id, CheckoutStatus.READY, client_secret=client_secret)
+
+
+def queue_checkout(booking_id):
+    """
+    Queues prepare_checkout. When the broker is unreachable the checkout is
+    marked failed, so the client can start it again instead of polling.
+    """
+    try:
+        prepare_checkout.delay(booking_id)
+    except Exception:
+        logger.exception("Could not queue the checkout of booking %s", booking_id)
+        set_checkout_status(
+            booking_id,
+            CheckoutStatus.FAILED,
+            error="Checkout could not be started, try again.",
+        )
+
+
+@shared_task
+def process_refunds():
+    """
+    Issues the queued refunds (see payments.refunds.drain_refunds).
+    Queued after every cancellation and scheduled by beat for retries,
+    the cache lock keeps a single drainer so the rate limit holds globally.
+    """
+    if not cache.add("payments:refund-drainer", 1, REFUND_DRAIN_SECONDS + 60):
+        return "Another worker is draining refunds."
+    try:
+        report = drain_refunds(max_seconds=REFUND_DRAIN_SECONDS)
+    finally:
+        cache.delete("payments:refund-drainer")
+    return str(report)
+
+
+@shared_task
+def process_stripe_events():
+    """
+    Applies the stored Stripe webhook events, queued by the webhook and
+    scheduled by beat for anything left behind.
+    """
+    processed = process_pending_events()
+    return f"Processed {processed} Stripe events."
+
+
+@shared_task
+def reconcile_stripe_payments(run_id=None, days=None):
+    """
+    Reconciles the bookings with Stripe's PaymentIntents of the last `days`
+    days (PAYMENT_RECONCILIATION_DAYS by default, 0 = all of them).
+    Pass the `run_id` of a failed run to resume it.
+    """
+    if run_id:
+        run = ReconciliationRun.objects.get(id=run_id)
+        run.status = ReconciliationRun.Status.RUNNING
+        run.error = ""
+        run.save(update_fields=["status", "error"])
+    else:
+        days = settings.PAYMENT_RECONCILIATION_DAYS if days is None else days
+        run = ReconciliationRun.objects.create(
+            created_gte=timezone.now() - timedelta(days=days) if days else None
+        )
+
+    try:
+        reconcile_payments(run)
+    except Exception as e:
+        run.status = ReconciliationRun.Status.FAILED
+        run.error = str(e)
+        run.save(update_fields=["status", "error"])
+        raise
+
+    return (
+        f"Reconciled {run.intents_seen} payment intents: "
+        f"{run.bookings_confirmed} bookings confirmed, "
+        f"{run.discrepancy_count} discrepancies."
+    )
@@ -1,3 +1,148 @@
 from django.test import TestCase
+from django.contrib.auth.models import User
+from datetime import date
+import stripe
+from decimal import Decimal
+from psycopg2.extras import DateRange
+
+from bookings.models import Booking
+from inventory.models import Property, Room, RoomType
+from payments.clients import FakeStripeClient
+from payments.models import PaymentDiscrepancy, ReconciliationRun, RefundJob
+from payments.reconciliation import reconcile_payments
+from payments.refunds import TokenBucket, drain_refunds, queue_refunds
+
 
 # Create your tests here.
+class ReconciliationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass")
+        property = Property.objects.create(name="Test Hotel")
+        room_type = RoomType.objects.create(
+            name="Deluxe Suite",
+            base_price=Decimal("100.00"),
+            capacity=2,
+            property=property,
+        )
+        self.room = Room.objects.create(number="101", room_type=room_type)
+        self.stripe = FakeStripeClient()
+
+    def book(self, day, status, intent_status=None):
+        intent_id = None
+        if intent_status:
+            intent_id = self.stripe.add_payment_intent(20000, intent_status)["id"]
+        return Booking.objects.create(
+            user=self.user,
+            room=self.room,
+            stay_range=DateRange(date(2025, 6, day), date(2025, 6, day + 2)),
+            total_price=Decimal("200.00"),
+            status=status,
+            stripe_payment_intent_id=intent_id,
+        )
+
+    def test_paid_bookings_are_confirmed_and_discrepancies_reported(self):
+        lost_webhook = self.book(1, Booking.Status.PENDING, "succeeded")
+        # expired although paid, and the room was sold again meanwhile
+        resold = self.book(10, Booking.Status.EXPIRED, "succeeded")
+        uncharged = self.book(10, Booking.Status.CONFIRMED)
+        unpaid = self.book(20, Booking.Status.CONFIRMED, "requires_payment_method")
+        self.book(25, Booking.Status.CONFIRMED, "succeeded")
+        self.stripe.add_payment_intent(5000, "succeeded")
+
+        run = ReconciliationRun.objects.create()
+        reconcile_payments(run, client=self.stripe, batch_size=2)
+
+        self.assertEqual(run.status, ReconciliationRun.Status.DONE)
+        self.assertEqual(run.intents_seen, 5)
+        self.assertEqual(run.bookings_confirmed, 1)
+
+        lost_webhook.refresh_from_db()
+        resold.refresh_from_db()
+        self.assertEqual(lost_webhook.status, Booking.Status.CONFIRMED)
+        self.assertEqual(resold.status, Booking.Status.EXPIRED)
+
+        found = set(run.discrepancies.values_list("kind", "booking_id", "resolved"))
+        self.assertEqual(
+            found,
+            {
+                (PaymentDiscrepancy.Kind.PAID_NOT_CONFIRMED, lost_webhook.id, True),
+                (PaymentDiscrepancy.Kind.PAID_NOT_CONFIRMED, resold.id, False),
+                (PaymentDiscrepancy.Kind.CONFIRMED_NOT_PAID, unpaid.id, False),
+                (PaymentDiscrepancy.Kind.CONFIRMED_NOT_PAID, uncharged.id, False),
+                (PaymentDiscrepancy.Kind.UNKNOWN_INTENT, None, False),
+            },
+        )
+
+
+class RateLimitedStripeClient(FakeStripeClient):
+    # the first refund call is rejected with a 429
+    def __init__(self):
+        super().__init__()
+        self.refund_calls = 0
+
+    def create_refund(self, payment_intent, amount, idempotency_key):
+        self.refund_calls += 1
+        if self.refund_calls == 1:
+            raise stripe.RateLimitError("Too many requests")
+        return super().create_refund(payment_intent, amount, idempotency_key)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept += seconds
+        self.now += seconds
+
+
+class RefundWorkerTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="tester", password="pass")
+        property = Property.objects.create(name="Test Hotel")
+        room_type = RoomType.objects.create(
+            name="Deluxe Suite",
+            base_price=Decimal("100.00"),
+            capacity=2,
+            property=property,
+        )
+        room = Room.objects.create(number="101", room_type=room_type)
+        self.bookings = [
+            Booking.objects.create(
+                user=user,
+                room=room,
+                stay_range=DateRange(date(2025, 6, day), date(2025, 6, day + 1)),
+                total_price=Decimal("100.00"),
+                status=Booking.Status.CANCELLED,
+                refund_amount=Decimal("100.00"),
+                stripe_payment_intent_id=f"pi_{day}",
+            )
+            for day in range(1, 4)
+        ]
+        queue_refunds(
+            (b.id, b.stripe_payment_intent_id, b.refund_amount) for b in self.bookings
+        )
+        # queuing again is a no-op
+        queue_refunds([(self.bookings[0].id, "pi_1", Decimal("100.00"))])
+
+    def test_refunds_are_rate_limited_and_retried(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, clock=clock, sleep=clock.sleep)
+
+        report = drain_refunds(client=RateLimitedStripeClient(), bucket=bucket)
+
+        self.assertEqual((report.succeeded, report.retried, report.failed), (2, 1, 0))
+        # 1s pause after the 429, then 2 calls/sec
+        self.assertEqual(clock.slept, 2.0)
+
+        retried = RefundJob.objects.get(status=RefundJob.Status.PENDING)
+        self.assertEqual(retried.booking, self.bookings[0])
+        self.assertEqual(retried.attempts, 1)
+        self.assertEqual(
+            Booking.objects.filter(is_refunded=True).count(),
+            2,
+        )
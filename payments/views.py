@@ -1,12 +1,12 @@
+from django.db import transaction
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
 from rest_framework.views import APIView
 
-import stripe
-
 from core import settings
-from bookings.models import Booking
+from .services import store_stripe_event
+from .tasks import process_stripe_events
 
 
 # Create your views here.
@@ -15,7 +15,7 @@ class StripeWebhookAPIView(APIView):
     permission_classes = []
 
     def post(self, request):
-        stripe.api_key = settings.STRIPE_SECRET_KEY
+        import stripe
 
         payload = request.body
         sig_header = request.META.get("HTTP_STRIPE_SIGNATURE")
@@ -35,24 +35,9 @@ class StripeWebhookAPIView(APIView):
         except stripe.error.SignatureVerificationError:
             return HttpResponse(status=400)  # invalid signature
 
-        # handle event
-        if event["type"] == "payment_intent.succeeded":
-            payment_intent = event["data"]["object"]
-            stripe_id = payment_intent["id"]
-
-            # find and update booking
-            try:
-                booking = Booking.objects.get(
-                    stripe_payment_intent_id=stripe_id,
-                    status=Booking.Status.PENDING,  # to ensure that it is really waiting to be paid
-                )
-                booking.status = Booking.Status.CONFIRMED
-                booking.is_refunded = False  # reset just in case
-                booking.save()
-                print(
-                    f"✅ Booking ({booking.id}) for room (number: {booking.room.number}, name: {booking.room.room_type.slug}) for user {booking.user}."
-                )
-            except Booking.DoesNotExist:
-                print(f"⚠️ Payment succeeded for unknown booking: {stripe_id}")
+        # store and answer right away, a worker applies the event.
+        # Stripe retries of an already stored event are dropped here.
+        if store_stripe_event(event):
+            transaction.on_commit(process_stripe_events.delay)
 
         return HttpResponse(status=200)
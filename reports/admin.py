@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import DailyRoomTypeStats, RollupWatermark
+
+
+# Register your models here.
+@admin.register(DailyRoomTypeStats)
+class DailyRoomTypeStatsAdmin(admin.ModelAdmin):
+    list_display = [
+        "day",
+        "property",
+        "room_type",
+        "rooms_sold",
+        "revenue",
+    ]
+    list_filter = ["property"]
+    list_select_related = ["property", "room_type__property"]
+    date_hierarchy = "day"
+
+
+admin.site.register(RollupWatermark)
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="dailyroomtypestats",
+            name="rooms_available",
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import models
+from django.db.models import Model
+
+from inventory.models import Property, RoomType
+
+
+# Create your models here.
+class DailyRoomTypeStats(Model):
+    """
+    Daily occupancy & revenue facts for one room type.
+    Maintained incrementally by `reports.tasks.rollup_occupancy`, never edited by hand.
+    The available rooms are not stored, reports count them from the inventory.
+    """
+
+    day = models.DateField()
+    property = models.ForeignKey(
+        Property, on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    room_type = models.ForeignKey(
+        RoomType, on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    rooms_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["room_type", "day"], name="daily_stats_room_type_day_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["property", "day"], name="daily_stats_property_day_idx"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.room_type_id} on {self.day}: {self.rooms_sold} sold"
+
+
+class RollupWatermark(Model):
+    """Last booking change (updated_at) already folded into a rollup."""
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"{self.name} @ {self.value}"
@@ -0,0 +1,40 @@
+from rest_framework import serializers
+from rest_framework.serializers import Serializer
+
+
+class OccupancyReportQuerySerializer(Serializer):
+    """Input validation for the occupancy report filters"""
+
+    MAX_DAYS = 366
+
+    start = serializers.DateField()
+    end = serializers.DateField()
+    property = serializers.IntegerField(required=False)
+    group_by = serializers.ChoiceField(
+        choices=["property", "room_type"], default="property"
+    )
+
+    def validate(self, attrs):
+        if attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError("start must be before end.")
+        if (attrs["end"] - attrs["start"]).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(
+                f"Reports are limited to {self.MAX_DAYS} days."
+            )
+        return attrs
+
+
+class OccupancyReportRowSerializer(Serializer):
+    day = serializers.DateField()
+    property_id = serializers.IntegerField()
+    room_type_id = serializers.IntegerField(required=False)
+    rooms_available = serializers.IntegerField()
+    rooms_sold = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
+    occupancy = serializers.FloatField(help_text="Occupancy in percent")
+    adr = serializers.DecimalField(
+        max_digits=12, decimal_places=2, help_text="Average daily rate"
+    )
+    revpar = serializers.DecimalField(
+        max_digits=12, decimal_places=2, help_text="Revenue per available room"
+    )
@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from inventory.models import Room
+from .models import DailyRoomTypeStats, RollupWatermark
+
+OCCUPANCY_WATERMARK = "occupancy"
+# first run folds in every booking ever made
+ROLLUP_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# updated_at comes from the clocks of the app servers, every run re-reads
+# a small window to absorb their skew (the upsert makes it harmless)
+ROLLUP_OVERLAP = timedelta(minutes=5)
+
+# updated_at is set before the booking's transaction commits, so a row older
+# than "now" may still become visible later. The window stops at the start
+# of the oldest transaction still open, everything before it has committed.
+OLDEST_OPEN_TRANSACTION_SQL = """
+SELECT MIN(xact_start)
+FROM pg_stat_activity
+WHERE datname = current_database()
+    AND backend_type = 'client backend'
+    AND pid <> pg_backend_pid()
+    AND xact_start IS NOT NULL
+"""
+
+# recompute every (room type, night) touched by a booking changed since the watermark
+ROLLUP_SQL = """
+WITH changed AS (
+    SELECT DISTINCT r.room_type_id, night::date AS day
+    FROM bookings_booking b
+    JOIN inventory_room r ON r.id = b.room_id
+    CROSS JOIN LATERAL generate_series(
+        lower(b.stay_range), upper(b.stay_range) - 1, interval '1 day'
+    ) AS night
+    WHERE b.updated_at > %(since)s AND b.updated_at <= %(until)s
+),
+sold AS (
+    SELECT
+        c.room_type_id,
+        c.day,
+        COUNT(b.id) AS rooms_sold,
+        COALESCE(
+            SUM(b.total_price / (upper(b.stay_range) - lower(b.stay_range))), 0
+        ) AS revenue
+    FROM changed c
+    JOIN inventory_room r ON r.room_type_id = c.room_type_id
+    LEFT JOIN bookings_booking b
+        ON b.room_id = r.id
+        AND b.status = %(confirmed)s
+        AND b.stay_range @> c.day
+    GROUP BY c.room_type_id, c.day
+)
+INSERT INTO reports_dailyroomtypestats
+    (day, property_id, room_type_id, rooms_sold, revenue, updated_at)
+SELECT s.day, rt.property_id, s.room_type_id, s.rooms_sold, s.revenue, now()
+FROM sold s
+JOIN inventory_roomtype rt ON rt.id = s.room_type_id
+ON CONFLICT (room_type_id, day) DO UPDATE SET
+    property_id = EXCLUDED.property_id,
+    rooms_sold = EXCLUDED.rooms_sold,
+    revenue = EXCLUDED.revenue,
+    updated_at = EXCLUDED.updated_at
+"""
+
+
+def update_occupancy_stats(until=None):
+    """
+    Folds every booking change since the last watermark into DailyRoomTypeStats.
+    Only the nights of changed bookings are recomputed, never the whole table.
+    Returns the number of fact rows written.
+    """
+    # imported here to keep reports -> bookings a soft dependency
+    from bookings.models import Booking
+
+    until = until or timezone.now()
+
+    with transaction.atomic():
+        # the row lock keeps two rollups from running at the same time
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(
+            name=OCCUPANCY_WATERMARK,
+            defaults={"value": ROLLUP_EPOCH},
+        )
+        since = watermark.value - ROLLUP_OVERLAP
+
+        with connection.cursor() as cursor:
+            cursor.execute(OLDEST_OPEN_TRANSACTION_SQL)
+            oldest_open = cursor.fetchone()[0]
+            if oldest_open:
+                until = min(until, oldest_open)
+
+            cursor.execute(
+                ROLLUP_SQL,
+                {
+                    "since": since,
+                    "until": until,
+                    "confirmed": Booking.Status.CONFIRMED,
+                },
+            )
+            written = cursor.rowcount
+
+        watermark.value = max(watermark.value, until)
+        watermark.save(update_fields=["value"])
+
+    return written
+
+
+def get_occupancy_report(start, end, property_id=None, group_by="property"):
+    """
+    Occupancy %, ADR and RevPAR per day, for every day of the range.
+    Rooms sold and revenue are read from the rollup table, the available
+    rooms are counted from the current inventory, so room types and nights
+    without any booking still count.
+    """
+    fields = ["property_id"]
+    if group_by == "room_type":
+        fields.append("room_type_id")
+
+    rooms = Room.objects.annotate(property_id=F("room_type__property_id"))
+    stats = DailyRoomTypeStats.objects.filter(day__gte=start, day__lte=end)
+    if property_id:
+        rooms = rooms.filter(room_type__property_id=property_id)
+        stats = stats.filter(property_id=property_id)
+
+    available = {
+        tuple(row[field] for field in fields): row["total"]
+        for row in rooms.values(*fields).annotate(total=Count("id")).order_by()
+    }
+    sales = {
+        (row["day"], *(row[field] for field in fields)): (
+            row["rooms_sold"],
+            row["revenue"],
+        )
+        for row in stats.values("day", *fields)
+        .annotate(rooms_sold=Sum("rooms_sold"), revenue=Sum("revenue"))
+        .order_by()
+    }
+    # room types sold in the range but without rooms any more
+    groups = sorted(set(available) | {key[1:] for key in sales})
+
+    report = []
+    day = start
+    while day <= end:
+        for group in groups:
+            total = available.get(group, 0)
+            sold, revenue = sales.get((day, *group), (0, Decimal("0.00")))
+            report.append(
+                {
+                    "day": day,
+                    **dict(zip(fields, group)),
+                    "rooms_available": total,
+                    "rooms_sold": sold,
+                    "revenue": revenue,
+                    "occupancy": round(sold * 100 / total, 2) if total else 0.0,
+                    "adr": round(revenue / sold, 2) if sold else 0,
+                    "revpar": round(revenue / total, 2) if total else 0,
+                }
+            )
+        day += timedelta(days=1)
+
+    return report
@@ -0,0 +1,12 @@
+from celery import shared_task
+
+from .services import update_occupancy_stats
+
+
+@shared_task
+def rollup_occupancy():
+    """
+    Updates the daily occupancy / revenue facts from recent booking changes.
+    """
+    written = update_occupancy_stats()
+    return f"Updated {written} daily stats rows."
@@ -0,0 +1,123 @@
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from datetime import date
+from decimal import Decimal
+from psycopg2.extras import DateRange
+
+from inventory.models import Property, Room, RoomType
+from bookings.models import Booking
+from reports.models import DailyRoomTypeStats
+from reports.services import update_occupancy_stats
+
+
+# Create your tests here.
+class OccupancyReportTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="guest", password="password123")
+        self.admin = User.objects.create_superuser(
+            username="admin", password="password123"
+        )
+        self.property = Property.objects.create(name="Test Hotel", city="Cairo")
+        self.room_type = RoomType.objects.create(
+            property=self.property,
+            name=RoomType.RoomKind.DOUBLE,
+            base_price=Decimal("100.00"),
+            capacity=2,
+        )
+        self.rooms = [
+            Room.objects.create(number=str(n), room_type=self.room_type)
+            for n in range(1, 5)
+        ]
+
+    def book(self, room, check_in, check_out, price, status=Booking.Status.CONFIRMED):
+        return Booking.objects.create(
+            user=self.user,
+            room=room,
+            stay_range=DateRange(check_in, check_out),
+            total_price=Decimal(price),
+            status=status,
+        )
+
+    def test_rollup_is_incremental(self):
+        self.book(self.rooms[0], date(2025, 8, 1), date(2025, 8, 3), "200.00")
+        self.book(self.rooms[1], date(2025, 8, 2), date(2025, 8, 3), "150.00")
+        pending = self.book(
+            self.rooms[2],
+            date(2025, 8, 2),
+            date(2025, 8, 3),
+            "90.00",
+            status=Booking.Status.PENDING,
+        )
+
+        update_occupancy_stats()
+
+        second_night = DailyRoomTypeStats.objects.get(day=date(2025, 8, 2))
+        self.assertEqual(second_night.rooms_sold, 2)
+        self.assertEqual(second_night.revenue, Decimal("250.00"))
+
+        # the pending booking gets paid -> only its nights are recomputed
+        pending.status = Booking.Status.CONFIRMED
+        pending.save()
+        update_occupancy_stats()
+
+        second_night.refresh_from_db()
+        self.assertEqual(second_night.rooms_sold, 3)
+        self.assertEqual(DailyRoomTypeStats.objects.count(), 2)
+
+    def test_report_api(self):
+        self.book(self.rooms[0], date(2025, 8, 1), date(2025, 8, 3), "200.00")
+        update_occupancy_stats()
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(
+            "/api/reports/",
+            {"start": "2025-08-01", "end": "2025-08-31", "property": self.property.id},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        first_night = response.data[0]
+        self.assertEqual(first_night["occupancy"], 25.0)
+        self.assertEqual(first_night["adr"], "100.00")
+        self.assertEqual(first_night["revpar"], "25.00")
+
+    def test_report_counts_rooms_without_bookings(self):
+        suite = RoomType.objects.create(
+            property=self.property,
+            name=RoomType.RoomKind.FAMILY,
+            base_price=Decimal("300.00"),
+            capacity=4,
+        )
+        Room.objects.create(number="501", room_type=suite)
+        Room.objects.create(number="502", room_type=suite)
+        self.book(self.rooms[0], date(2025, 8, 1), date(2025, 8, 2), "120.00")
+        update_occupancy_stats()
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(
+            "/api/reports/", {"start": "2025-08-01", "end": "2025-08-03"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 3)
+        first_night, second_night = response.data[:2]
+        self.assertEqual(first_night["rooms_available"], 6)
+        self.assertEqual(first_night["occupancy"], 16.67)
+        self.assertEqual(first_night["revpar"], "20.00")
+        self.assertEqual(second_night["rooms_available"], 6)
+        self.assertEqual(second_night["occupancy"], 0.0)
+
+        response = self.client.get(
+            "/api/reports/",
+            {"start": "2025-08-01", "end": "2025-08-01", "group_by": "room_type"},
+        )
+        self.assertEqual(
+            [(row["room_type_id"], row["rooms_available"]) for row in response.data],
+            [(self.room_type.id, 4), (suite.id, 2)],
+        )
+
+    def test_report_requires_staff(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(
+            "/api/reports/", {"start": "2025-08-01", "end": "2025-08-31"}
+        )
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import OccupancyReportAPIView
+
+urlpatterns = [
+    path("reports/", OccupancyReportAPIView.as_view(), name="occupancy-report"),
+]
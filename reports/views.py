@@ -0,0 +1,34 @@
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from drf_spectacular.utils import extend_schema
+
+from core.routers import ReplicaReadMixin
+from .serializers import OccupancyReportQuerySerializer, OccupancyReportRowSerializer
+from .services import get_occupancy_report
+
+
+# Create your views here.
+class OccupancyReportAPIView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        parameters=[OccupancyReportQuerySerializer],
+        responses=OccupancyReportRowSerializer(many=True),
+        description="Daily occupancy %, ADR and RevPAR per property (or room type). Sales come from the rollup tables, available rooms from the inventory.",
+    )
+    def get(self, request):
+        query = OccupancyReportQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = query.validated_data
+        report = get_occupancy_report(
+            start=data["start"],
+            end=data["end"],
+            property_id=data.get("property"),
+            group_by=data["group_by"],
+        )
+
+        return Response(OccupancyReportRowSerializer(report, many=True).data)
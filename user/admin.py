@@ -3,6 +3,8 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.utils.safestring import SafeText
 
+from core.images import variant_urls
+from core.paginator import EstimatedCountPaginator
 from .models import Review, UserProfile, Wishlist
 
 
@@ -14,9 +16,10 @@ class UserProfileAdmin(admin.ModelAdmin):
 
     def avatar_thumbnail(self, obj) -> SafeText | Literal["No Image"]:
         if obj.avatar:
+            thumb = variant_urls(obj.avatar, obj.avatar_variants).get("thumb")
             return format_html(
                 '<img src="{}" style="width: 50px; height: 50px; border-radius: 50%;" />',
-                obj.avatar.url,
+                thumb["jpeg"] if thumb else obj.avatar.url,
             )
         return "No Image"
 
@@ -33,3 +36,8 @@ class WishlistAdmin(admin.ModelAdmin):
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ["id", "booking__user", "booking", "rating", "comment", "created_at"]
     list_filter = ["created_at", "rating"]
+    list_select_related = ["booking__user", "booking__room__room_type"]
+    date_hierarchy = "created_at"
+    ordering = ["-id"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-19 08:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0011_booking_booking_created_at_idx_and_more"),
+        ("user", "0003_review"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(fields=["-created_at"], name="review_created_at_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["rating", "-created_at"], name="review_rating_created_idx"
+            ),
+        ),
+    ]
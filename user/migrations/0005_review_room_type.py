@@ -0,0 +1,45 @@
+# Generated by Django 5.2.9 on 2026-10-19 09:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0013_booking_stripe_payment_intent_index"),
+        ("inventory", "0007_property_phone_number"),
+        ("user", "0004_review_review_created_at_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="review",
+            name="room_type",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="reviews",
+                to="inventory.roomtype",
+            ),
+        ),
+        # backfill existing reviews in one statement
+        migrations.RunSQL(
+            sql="""
+                UPDATE user_review AS review
+                SET room_type_id = room.room_type_id
+                FROM bookings_booking AS booking
+                JOIN inventory_room AS room ON room.id = booking.room_id
+                WHERE booking.id = review.booking_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["room_type", "-id"], name="review_room_type_id_idx"
+            ),
+        ),
+    ]
@@ -1,11 +1,13 @@
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.conf import settings
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from core.cache_tags import invalidate_tags, reviews_tag
+from core.images import needs_variants
 from inventory.models import RoomType
 from bookings.models import Booking
 
@@ -14,6 +16,8 @@ from bookings.models import Booking
 class UserProfile(Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     avatar = models.ImageField(upload_to="avatars/", null=True, blank=True)
+    # resized thumb/card/full variants, see core.images
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
     phone_number = models.CharField(max_length=20, blank=True)
     address = models.TextField(blank=True)
 
@@ -27,6 +31,14 @@ def create_user_profile(sender, instance, created, **kwargs):
         UserProfile.objects.create(user=instance)
 
 
+@receiver(post_save, sender=UserProfile)
+def queue_avatar_variants(sender, instance, **kwargs):
+    if needs_variants(instance.avatar, instance.avatar_variants):
+        from .tasks import generate_avatar_variants
+
+        transaction.on_commit(lambda: generate_avatar_variants.delay(instance.id))
+
+
 class Wishlist(Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="wishlist")
     room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE)
@@ -43,6 +55,16 @@ class Review(Model):
     booking = models.OneToOneField(
         Booking, on_delete=models.CASCADE, related_name="review"
     )
+    # copied from booking.room.room_type on save, lists a room type's reviews
+    # without joining through bookings and rooms
+    room_type = models.ForeignKey(
+        RoomType,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="reviews",
+    )
     rating = models.PositiveSmallIntegerField(
         validators=[MinValueValidator(1), MaxValueValidator(5)],
         help_text="Start rating 1-5",
@@ -50,5 +72,30 @@ class Review(Model):
     comment = models.TextField(blank=True)
     created_at = models.DateField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # admin changelist filters / date hierarchy
+            models.Index(fields=["-created_at"], name="review_created_at_idx"),
+            models.Index(
+                fields=["rating", "-created_at"], name="review_rating_created_idx"
+            ),
+            # keyset pagination of a room type's reviews
+            models.Index(fields=["room_type", "-id"], name="review_room_type_id_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.room_type_id is None:
+            self.room_type_id = self.booking.room.room_type_id
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return f"{self.rating} stars  by {self.booking.user.username} for room {self.booking.room.number} in {self.booking.room.room_type.property.name}"
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_rating_histogram(sender, instance, created=False, **kwargs):
+    # new reviews are added to the counters (user.services.record_review_rating),
+    # edited and deleted ones are counted again
+    if not created:
+        invalidate_tags(reviews_tag(instance.room_type_id))
@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ReviewCursorPagination(CursorPagination):
+    """
+    Keyset pagination over a room type's reviews, newest first.
+    Backed by the (room_type, -id) index, deep pages cost the same as the first.
+    """
+
+    ordering = "-id"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
@@ -1,8 +1,9 @@
 from rest_framework import serializers
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import ModelSerializer, Serializer
 
 from .models import UserProfile, Wishlist, Review
 from bookings.models import Booking
+from core.images import variant_urls
 
 
 class UserProfileSerializer(ModelSerializer):
@@ -10,6 +11,7 @@ class UserProfileSerializer(ModelSerializer):
     email = serializers.CharField(source="user.email", read_only=True, required=False)
     first_name = serializers.CharField(source="user.first_name", required=False)
     last_name = serializers.CharField(source="user.last_name", required=False)
+    avatar_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = UserProfile
@@ -19,10 +21,14 @@ class UserProfileSerializer(ModelSerializer):
             "first_name",
             "last_name",
             "avatar",
+            "avatar_variants",
             "phone_number",
             "address",
         ]
 
+    def get_avatar_variants(self, obj):
+        return variant_urls(obj.avatar, obj.avatar_variants)
+
     def update(self, instance, validated_data):
         # update user model manually
         user_data = validated_data.pop("user", {})
@@ -42,14 +48,47 @@ class UserProfileSerializer(ModelSerializer):
 
 class WishlistSerializer(ModelSerializer):
     room_type_name = serializers.CharField(source="room_type.name", read_only=True)
-    room_type_price = serializers.CharField(source="room_type.price", read_only=True)
+    room_type_slug = serializers.CharField(source="room_type.slug", read_only=True)
+    room_type_price = serializers.DecimalField(
+        source="room_type.base_price", max_digits=10, decimal_places=2, read_only=True
+    )
+    hotel_name = serializers.CharField(source="room_type.property.name", read_only=True)
+    city = serializers.CharField(source="room_type.property.city", read_only=True)
+    # only set when check_in/check_out are given (see user.services.attach_live_prices)
+    rooms_left = serializers.IntegerField(read_only=True, default=None)
+    total_price = serializers.FloatField(read_only=True, default=None)
 
     class Meta:
         model = Wishlist
-        fields = ["id", "room_type", "room_type_name", "room_type_price", "created_at"]
+        fields = [
+            "id",
+            "room_type",
+            "room_type_name",
+            "room_type_slug",
+            "room_type_price",
+            "hotel_name",
+            "city",
+            "rooms_left",
+            "total_price",
+            "created_at",
+        ]
         read_only_fields = ["id", "created_at"]
 
 
+class WishlistQuerySerializer(Serializer):
+    check_in = serializers.DateField(required=False)
+    check_out = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if bool(attrs.get("check_in")) != bool(attrs.get("check_out")):
+            raise serializers.ValidationError(
+                "Provide both 'check_in' and 'check_out', or neither."
+            )
+        if attrs.get("check_in") and attrs["check_out"] <= attrs["check_in"]:
+            raise serializers.ValidationError("check_out must be after check_in.")
+        return attrs
+
+
 class ReviewCreateSerializer(ModelSerializer):
     booking_id = serializers.IntegerField(write_only=True)
 
@@ -71,3 +110,11 @@ class ReviewCreateSerializer(ModelSerializer):
         if booking.status != Booking.Status.CONFIRMED:
             raise serializers.ValidationError("You can only review completed stays.")
         return value
+
+
+class ReviewSerializer(ModelSerializer):
+    username = serializers.CharField(source="booking.user.username", read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ["id", "username", "rating", "comment", "created_at"]
@@ -0,0 +1,171 @@
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+
+from bookings.services import calculate_total_price, get_pricing_rules
+from core.cache_tags import (
+    get_tag_versions,
+    record_lookup,
+    reviews_tag,
+    versioned_key,
+)
+from inventory.models import RoomType
+from inventory.services import get_rooms_left
+from .models import Review, Wishlist
+
+RATING_STARS = range(1, 6)
+# the counters are bumped on every new review, this only bounds any drift
+RATING_HISTOGRAM_TIMEOUT = 24 * 60 * 60
+
+# one statement and one round trip for the whole toggle: delete the row if it
+# is there, otherwise insert it (only for an existing room type).
+# ON CONFLICT covers two concurrent "add" toggles.
+TOGGLE_WISHLIST_SQL = f"""
+WITH deleted AS (
+    DELETE FROM {Wishlist._meta.db_table}
+    WHERE user_id = %(user_id)s AND room_type_id = %(room_type_id)s
+    RETURNING id
+), inserted AS (
+    INSERT INTO {Wishlist._meta.db_table} (user_id, room_type_id, created_at)
+    SELECT %(user_id)s, id, now() FROM {RoomType._meta.db_table}
+    WHERE id = %(room_type_id)s AND NOT EXISTS (SELECT 1 FROM deleted)
+    ON CONFLICT (user_id, room_type_id) DO NOTHING
+    RETURNING id, created_at
+)
+SELECT (SELECT count(*) FROM deleted), inserted.id, inserted.created_at
+FROM (SELECT 1) AS toggle LEFT JOIN inserted ON true
+"""
+
+
+def toggle_wishlist(user, room_type_id):
+    """
+    Adds the room type to the user's wishlist, or removes it when it is already there.
+    Returns (removed, item): the new Wishlist item when added, None otherwise.
+    Both are falsy when the room type doesn't exist.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            TOGGLE_WISHLIST_SQL, {"user_id": user.id, "room_type_id": room_type_id}
+        )
+        deleted, item_id, created_at = cursor.fetchone()
+
+    if item_id is None:
+        return bool(deleted), None
+
+    item = Wishlist(
+        id=item_id, user=user, room_type_id=room_type_id, created_at=created_at
+    )
+    return False, item
+
+
+def attach_live_prices(items, check_in, check_out):
+    """
+    Sets `rooms_left` and `total_price` on every wishlist item for the dates.
+    Availability is one query for all room types, pricing rules another one.
+    """
+    room_type_ids = {item.room_type_id for item in items}
+    rooms_left = get_rooms_left(room_type_ids, check_in, check_out)
+    rules = get_pricing_rules(room_type_ids)
+
+    for item in items:
+        item.rooms_left = rooms_left[item.room_type_id]
+        item.total_price = calculate_total_price(
+            item.room_type, check_in, check_out, rules=rules
+        )
+
+    return items
+
+
+def _stars_keys(room_type_id, versions=None):
+    # the counters of the current version of the room type's reviews tag,
+    # a deleted or edited review bumps it and they are counted again
+    tags = [reviews_tag(room_type_id)]
+    prefix = versioned_key(f"reviews:stars:{room_type_id}", tags, versions)
+    return tags, {f"{prefix}:{stars}": stars for stars in RATING_STARS}
+
+
+def get_rating_histograms(room_type_ids):
+    """
+    {room type id: {stars: review count}}, one cache counter per star.
+    Two cache round trips for any number of room types, the ones whose
+    counters aren't cached are counted with one GROUP BY query.
+    """
+    room_type_ids = set(room_type_ids)
+    versions = get_tag_versions(
+        [reviews_tag(room_type_id) for room_type_id in room_type_ids]
+    )
+    keys = {
+        room_type_id: _stars_keys(room_type_id, versions)
+        for room_type_id in room_type_ids
+    }
+    cached_counts = cache.get_many(
+        [key for _, stars_keys in keys.values() for key in stars_keys]
+    )
+
+    histograms = {}
+    for room_type_id, (tags, stars_keys) in keys.items():
+        hit = all(key in cached_counts for key in stars_keys)
+        record_lookup(tags, hit=hit)
+        if hit:
+            histograms[room_type_id] = {
+                stars: cached_counts[key] for key, stars in stars_keys.items()
+            }
+
+    missing = room_type_ids - histograms.keys()
+    if missing:
+        for room_type_id in missing:
+            histograms[room_type_id] = dict.fromkeys(RATING_STARS, 0)
+        for room_type_id, rating, count in (
+            Review.objects.filter(room_type_id__in=missing)
+            .values("room_type_id", "rating")
+            .annotate(count=Count("id"))
+            .values_list("room_type_id", "rating", "count")
+        ):
+            histograms[room_type_id][rating] = count
+        cache.set_many(
+            {
+                key: histograms[room_type_id][stars]
+                for room_type_id in missing
+                for key, stars in keys[room_type_id][1].items()
+            },
+            RATING_HISTOGRAM_TIMEOUT,
+        )
+
+    return histograms
+
+
+def get_rating_histogram(room_type_id):
+    return get_rating_histograms([room_type_id])[room_type_id]
+
+
+def _rating_summary(histogram):
+    count = sum(histogram.values())
+    total = sum(stars * reviews for stars, reviews in histogram.items())
+    return {
+        "average": round(total / count, 1) if count else 0.0,
+        "count": count,
+        "histogram": histogram,
+    }
+
+
+def get_rating_summaries(room_type_ids):
+    """{room type id: rating summary}, see get_rating_histograms."""
+    return {
+        room_type_id: _rating_summary(histogram)
+        for room_type_id, histogram in get_rating_histograms(room_type_ids).items()
+    }
+
+
+def get_rating_summary(room_type_id):
+    return _rating_summary(get_rating_histogram(room_type_id))
+
+
+def record_review_rating(review):
+    """Counts a new review in the cached histogram, run after the insert commits."""
+    _, keys = _stars_keys(review.room_type_id)
+    key = next(key for key, stars in keys.items() if stars == review.rating)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # not cached, the next read counts it from the table
+        pass
@@ -0,0 +1,10 @@
+from celery import shared_task
+
+from core.images import update_variants
+from .models import UserProfile
+
+
+@shared_task
+def generate_avatar_variants(profile_id):
+    """Resized variants of a newly uploaded avatar."""
+    update_variants(UserProfile, profile_id, "avatar", "avatar_variants")
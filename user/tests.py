@@ -1,3 +1,135 @@
-from django.test import TestCase
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from datetime import date
+from decimal import Decimal
+from psycopg2.extras import DateRange
+
+from bookings.models import Booking
+from inventory.models import PricingRule, Property, Room, RoomType
+from user.models import Review, Wishlist
+
 
 # Create your tests here.
+class WishlistTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass")
+        self.client.force_authenticate(user=self.user)
+
+        property = Property.objects.create(name="Test Hotel", city="Cairo")
+        self.deluxe = RoomType.objects.create(
+            name=RoomType.RoomKind.DELUXE,
+            base_price=Decimal("100.00"),
+            capacity=2,
+            property=property,
+        )
+        self.single = RoomType.objects.create(
+            name=RoomType.RoomKind.SINGLE,
+            base_price=Decimal("50.00"),
+            capacity=1,
+            property=property,
+        )
+        booked = Room.objects.create(number="101", room_type=self.deluxe)
+        Room.objects.create(number="102", room_type=self.deluxe)
+        Booking.objects.create(
+            user=self.user,
+            room=booked,
+            stay_range=DateRange(date(2025, 7, 1), date(2025, 7, 5)),
+            total_price=Decimal("400.00"),
+            status=Booking.Status.CONFIRMED,
+        )
+        PricingRule.objects.create(
+            name="Deluxe premium",
+            room_type=self.deluxe,
+            price_multiplier=Decimal("1.50"),
+        )
+        self.url = "/api/wishlist/"
+
+    def test_toggle_adds_and_removes(self):
+        response = self.client.post(self.url, {"room_type": self.deluxe.id})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["room_type"], self.deluxe.id)
+        self.assertEqual(response.data["room_type_slug"], self.deluxe.slug)
+        self.assertTrue(Wishlist.objects.filter(user=self.user).exists())
+
+        response = self.client.post(self.url, {"room_type": self.deluxe.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Wishlist.objects.filter(user=self.user).exists())
+
+        response = self.client.post(self.url, {"room_type": 999999})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_with_live_availability_and_price(self):
+        Wishlist.objects.create(user=self.user, room_type=self.deluxe)
+        Wishlist.objects.create(user=self.user, room_type=self.single)
+
+        # items, availability and pricing rules: one query each
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                self.url, {"check_in": "2025-07-02", "check_out": "2025-07-04"}
+            )
+        self.assertEqual(response.status_code, 200)
+
+        items = {item["room_type"]: item for item in response.data}
+        self.assertEqual(items[self.deluxe.id]["rooms_left"], 1)
+        self.assertEqual(items[self.deluxe.id]["total_price"], 300.0)
+        self.assertEqual(items[self.single.id]["rooms_left"], 0)
+        self.assertEqual(items[self.single.id]["total_price"], 100.0)
+
+        response = self.client.get(self.url)
+        self.assertIsNone(response.data[0]["rooms_left"])
+
+
+class RoomTypeReviewsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="pass")
+        property = Property.objects.create(name="Test Hotel", city="Cairo")
+        self.room_type = RoomType.objects.create(
+            name=RoomType.RoomKind.DELUXE,
+            base_price=Decimal("100.00"),
+            capacity=2,
+            property=property,
+        )
+        room = Room.objects.create(number="101", room_type=self.room_type)
+        self.bookings = [
+            Booking.objects.create(
+                user=self.user,
+                room=room,
+                stay_range=DateRange(date(2025, 7, day), date(2025, 7, day + 1)),
+                total_price=Decimal("100.00"),
+                status=Booking.Status.CONFIRMED,
+            )
+            for day in range(1, 5)
+        ]
+        for booking, rating in zip(self.bookings, [5, 4, 5]):
+            Review.objects.create(booking=booking, rating=rating)
+        self.url = f"/api/room-types/{self.room_type.slug}/reviews/"
+
+    def test_reviews_page_with_histogram(self):
+        response = self.client.get(self.url, {"page_size": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(response.data["results"][0]["username"], "tester")
+        self.assertIsNotNone(response.data["next"])
+        self.assertEqual(
+            response.data["rating"],
+            {
+                "average": 4.7,
+                "count": 3,
+                "histogram": {1: 0, 2: 0, 3: 0, 4: 1, 5: 2},
+            },
+        )
+
+        # the histogram is cached now, a new review bumps its counter
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/review/", {"booking_id": self.bookings[3].id, "rating": 3}
+            )
+        self.assertEqual(response.status_code, 201)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["rating"]["count"], 4)
+        self.assertEqual(response.data["rating"]["histogram"][3], 1)
@@ -1,9 +1,19 @@
 from django.urls import path
 
-from .views import UserProfileView, WishlistView, ReviewCreateAPIView
+from .views import (
+    UserProfileView,
+    WishlistView,
+    ReviewCreateAPIView,
+    RoomTypeReviewListAPIView,
+)
 
 urlpatterns = [
     path("profile/", UserProfileView.as_view(), name="user-profile"),
     path("wishlist/", WishlistView.as_view(), name="user-wishlist"),
     path("review/", ReviewCreateAPIView.as_view(), name="create-review"),
+    path(
+        "room-types/<slug:slug>/reviews/",
+        RoomTypeReviewListAPIView.as_view(),
+        name="room-type-reviews",
+    ),
 ]
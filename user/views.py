@@ -1,18 +1,34 @@
+from django.db import transaction
 from django.db.models.manager import BaseManager
+from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
-from rest_framework.generics import RetrieveUpdateAPIView, ListCreateAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.generics import (
+    ListAPIView,
+    ListCreateAPIView,
+    RetrieveUpdateAPIView,
+)
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework import status
-from drf_spectacular.utils import extend_schema
+from rest_framework import serializers, status
+from drf_spectacular.utils import extend_schema, inline_serializer
 
-from inventory.models import RoomType
 from bookings.models import Booking
+from core.routers import ReplicaReadMixin
+from inventory.models import RoomType
 from .models import UserProfile, Wishlist, Review
+from .pagination import ReviewCursorPagination
 from .serializers import (
     UserProfileSerializer,
     WishlistSerializer,
+    WishlistQuerySerializer,
     ReviewCreateSerializer,
+    ReviewSerializer,
+)
+from .services import (
+    attach_live_prices,
+    get_rating_summary,
+    record_review_rating,
+    toggle_wishlist,
 )
 
 
@@ -31,25 +47,64 @@ class WishlistView(ListCreateAPIView):
     serializer_class = WishlistSerializer
 
     def get_queryset(self) -> BaseManager[Wishlist]:
-        return Wishlist.objects.filter(user=self.request.user)
+        return Wishlist.objects.filter(user=self.request.user).select_related(
+            "room_type__property"
+        )
+
+    @extend_schema(
+        parameters=[WishlistQuerySerializer],
+        description=(
+            "Saved room types. With check_in/check_out every item also gets "
+            "its current rooms_left and total price for the stay."
+        ),
+    )
+    def list(self, request, *args, **kwargs):
+        query = WishlistQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        items = list(self.get_queryset())
+        if query.validated_data.get("check_in"):
+            attach_live_prices(
+                items,
+                query.validated_data["check_in"],
+                query.validated_data["check_out"],
+            )
 
+        return Response(self.get_serializer(items, many=True).data)
+
+    @extend_schema(
+        request=inline_serializer(
+            name="WishlistToggle", fields={"room_type": serializers.IntegerField()}
+        ),
+        responses={201: WishlistSerializer, 200: None},
+        description="Adds the room type to the wishlist, or removes it if already saved.",
+    )
     def create(self, request, *args, **kwargs):
         # Custom Logic: Toggle Behavior
-        room_type_id = request.data.get("room_type")
-        room_type = RoomType.objects.get(id=room_type_id)
+        try:
+            room_type_id = int(request.data.get("room_type"))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "room_type must be a room type id."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        wishlist_item, created = Wishlist.objects.get_or_create(
-            room_type=room_type,
-            user=request.user,
-        )
+        removed, wishlist_item = toggle_wishlist(request.user, room_type_id)
 
-        if not created:
+        if removed:
             # if is already exists then delete it
-            wishlist_item.delete()
             return Response(
                 {"message": "Removed from wishlist."}, status=status.HTTP_200_OK
             )
+        if wishlist_item is None:
+            return Response(
+                {"error": "Room type not found."}, status=status.HTTP_400_BAD_REQUEST
+            )
 
+        # the room type and its hotel for the serializer, in one query
+        wishlist_item.room_type = RoomType.objects.select_related("property").get(
+            id=room_type_id
+        )
         return Response(
             self.get_serializer(wishlist_item).data, status=status.HTTP_201_CREATED
         )
@@ -68,7 +123,9 @@ class ReviewCreateAPIView(APIView):
             data=request.data, context={"request": request}
         )
         if serializer.is_valid():
-            booking = Booking.objects.get(id=serializer.validated_data["booking_id"])
+            booking = Booking.objects.select_related("room").get(
+                id=serializer.validated_data["booking_id"]
+            )
 
             try:
                 review = Review.objects.create(
@@ -76,6 +133,7 @@ class ReviewCreateAPIView(APIView):
                     rating=serializer.validated_data["rating"],
                     comment=serializer.validated_data.get("comment", ""),
                 )
+                transaction.on_commit(lambda: record_review_rating(review))
                 return Response(
                     {
                         "message": "Review submitted!",
@@ -87,3 +145,31 @@ class ReviewCreateAPIView(APIView):
                 return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class RoomTypeReviewListAPIView(ReplicaReadMixin, ListAPIView):
+    permission_classes = [AllowAny]
+    serializer_class = ReviewSerializer
+    pagination_class = ReviewCursorPagination
+
+    def get_queryset(self) -> BaseManager[Review]:
+        return Review.objects.filter(room_type=self.room_type).select_related(
+            "booking__user"
+        )
+
+    @extend_schema(
+        description=(
+            "Reviews of a room type, newest first (cursor pagination), "
+            "with its rating average, count and 1-5 star histogram."
+        ),
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        self.room_type = get_object_or_404(
+            RoomType.objects.only("id"), slug=kwargs["slug"]
+        )
+        response = super().list(request, *args, **kwargs)
+        response.data["rating"] = get_rating_summary(self.room_type.id)
+        return response